@@ -0,0 +1,281 @@
+import os
+import pwd
+import signal
+import sys
+from PySide6.QtWidgets import *
+from PySide6.QtCore import *
+from PySide6.QtGui import *
+
+# The shell's modules live two directories up (apps/apps/ -> repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from modules.proc_scan import ProcessScanner, raise_fd_limit
+
+REFRESH_MS = 1000
+
+# (header, kind): kind picks formatting, alignment and sort key
+COLUMNS = [
+    ("Name", "text"),
+    ("PID", "int"),
+    ("User", "text"),
+    ("CPU %", "float"),
+    ("Memory", "bytes"),
+    ("Threads", "int"),
+    ("State", "text"),
+    ("Command", "text"),
+]
+COL_NAME, COL_PID, COL_USER, COL_CPU, COL_MEMORY, COL_THREADS, COL_STATE, COL_COMMAND = range(len(COLUMNS))
+# Columns whose values move every refresh; sorting by one of them re-sorts live, like top
+LIVE_COLUMNS = {COL_CPU, COL_MEMORY, COL_THREADS, COL_STATE}
+
+STATES = {"R": "Running", "S": "Sleeping", "D": "Disk wait", "Z": "Zombie", "T": "Stopped",
+          "t": "Traced", "I": "Idle", "X": "Dead"}
+
+
+def format_kb(kb):
+    for unit in ["KB", "MB", "GB"]:
+        if kb < 1024:
+            return f"{kb:.0f} {unit}" if unit == "KB" else f"{kb:.1f} {unit}"
+        kb /= 1024
+    return f"{kb:.1f} TB"
+
+
+class ProcessModel(QAbstractTableModel):
+    """
+    One row per process, backed directly by the scanner's columns. A
+    refresh only announces what moved: rows inserted/removed for started
+    and exited processes, dataChanged for rows whose values changed, and a
+    layout change only if a live sort order actually changed. The view is
+    virtualized, so it repaints just the visible rows among those.
+    """
+
+    def __init__(self, scanner):
+        super().__init__()
+        self.scanner = scanner
+        self.rows = []      # display order, as scanner slots
+        self.row_of = {}    # slot -> row
+        self.users = {}     # uid -> name
+        self.sort_column = COL_CPU
+        self.sort_order = Qt.DescendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section][0]
+        return None
+
+    def user_name(self, uid):
+        if uid not in self.users:
+            try:
+                self.users[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self.users[uid] = str(uid)
+        return self.users[uid]
+
+    def value(self, slot, column):
+        s = self.scanner
+        if column == COL_NAME:
+            return s.name[slot]
+        if column == COL_PID:
+            return s.pid[slot]
+        if column == COL_USER:
+            return self.user_name(s.uid[slot])
+        if column == COL_CPU:
+            return s.cpu[slot]
+        if column == COL_MEMORY:
+            return s.rss_kb[slot]
+        if column == COL_THREADS:
+            return s.threads[slot]
+        if column == COL_STATE:
+            return chr(s.state[slot]) if s.state[slot] else ""
+        return s.command[slot]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        slot = self.rows[index.row()]
+        column = index.column()
+        kind = COLUMNS[column][1]
+        if role == Qt.DisplayRole:
+            value = self.value(slot, column)
+            if kind == "float":
+                return f"{value:.1f}"
+            if kind == "bytes":
+                return format_kb(value)
+            if column == COL_STATE:
+                return STATES.get(value, value)
+            return str(value)
+        if role == Qt.TextAlignmentRole and kind != "text":
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ToolTipRole and column in (COL_NAME, COL_COMMAND):
+            return self.scanner.command[slot]
+        return None
+
+    def pid_at(self, row):
+        return self.scanner.pid[self.rows[row]]
+
+    def sort_key(self):
+        column, value, s = self.sort_column, self.value, self.scanner
+        # Numeric columns index the scanner's arrays directly: sorting 2000 rows stays well under a millisecond
+        arrays = {COL_PID: s.pid, COL_CPU: s.cpu, COL_MEMORY: s.rss_kb, COL_THREADS: s.threads}
+        if column in arrays:
+            return arrays[column].__getitem__
+        return lambda slot: value(slot, column).casefold()
+
+    def sorted_rows(self, rows):
+        return sorted(rows, key=self.sort_key(), reverse=self.sort_order == Qt.DescendingOrder)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column, self.sort_order = column, order
+        self.apply_order(self.sorted_rows(self.rows))
+
+    def apply_order(self, new_rows):
+        if new_rows == self.rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        old_slots = [(self.rows[i.row()], i.column()) for i in old_persistent]
+        self.rows = new_rows
+        self.row_of = {slot: row for row, slot in enumerate(new_rows)}
+        self.changePersistentIndexList(old_persistent,
+                                       [self.index(self.row_of[slot], column) for slot, column in old_slots])
+        self.layoutChanged.emit()
+
+    def refresh(self):
+        delta = self.scanner.refresh()
+
+        # Exited processes first: their slots may already be reused by the added ones
+        for row in sorted((self.row_of[s] for s in delta.removed if s in self.row_of), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+        if delta.removed:
+            self.row_of = {slot: row for row, slot in enumerate(self.rows)}
+
+        if delta.added:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(delta.added) - 1)
+            for slot in delta.added:
+                self.row_of[slot] = len(self.rows)
+                self.rows.append(slot)
+            self.endInsertRows()
+
+        # Contiguous runs of changed rows become one dataChanged each
+        changed = sorted(self.row_of[s] for s in delta.changed if s in self.row_of)
+        last_column = len(COLUMNS) - 1
+        start = previous = None
+        for row in changed + [None]:
+            if start is not None and (row is None or row != previous + 1):
+                self.dataChanged.emit(self.index(start, 0), self.index(previous, last_column), [Qt.DisplayRole])
+                start = None
+            if row is not None and start is None:
+                start = row
+            previous = row
+
+        if delta.added or (self.sort_column in LIVE_COLUMNS and delta.changed):
+            self.apply_order(self.sorted_rows(self.rows))
+        return delta
+
+
+class TaskManager(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Task Manager")
+        self.resize(900, 600)
+        self.setWindowIcon(QIcon.fromTheme("utilities-system-monitor",
+                           QApplication.style().standardIcon(QStyle.SP_ComputerIcon)))
+
+        # One descriptor per process is kept open; this process can afford the higher limit
+        raise_fd_limit()
+        self.scanner = ProcessScanner()
+        self.model = ProcessModel(self.scanner)
+
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(COL_CPU, Qt.DescendingOrder)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setAlternatingRowColors(True)
+        self.table.setShowGrid(False)
+        self.table.verticalHeader().hide()
+        # Fixed row heights and column widths: no per-row size queries while scrolling
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        for column, width in ((COL_NAME, 180), (COL_PID, 70), (COL_USER, 90), (COL_CPU, 70),
+                              (COL_MEMORY, 90), (COL_THREADS, 70), (COL_STATE, 80)):
+            self.table.setColumnWidth(column, width)
+        self.table.doubleClicked.connect(lambda index: self.end_task())
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        self.end_button = QPushButton("End Task")
+        self.end_button.clicked.connect(self.end_task)
+        buttons.addWidget(self.end_button)
+        layout.addLayout(buttons)
+
+        self.status = QLabel()
+        self.statusBar().addWidget(self.status)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.refresh()
+        self.timer.start(REFRESH_MS)
+
+    def refresh(self):
+        self.model.refresh()
+        own = self.scanner.slot_of(os.getpid())
+        own_cpu = f", Task Manager {self.scanner.cpu[own]:.1f}%" if own is not None else ""
+        self.status.setText(f"Processes: {len(self.scanner)}    CPU: {self.scanner.total_cpu:.0f}%    "
+                            f"Scan: {self.scanner.scan_ms:.1f} ms{own_cpu}")
+
+    def end_task(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        pid = self.model.pid_at(rows[0].row())
+        name = self.scanner.name[self.scanner.slot_of(pid)] if self.scanner.slot_of(pid) is not None else pid
+        answer = QMessageBox.question(self, "End Task", f"End {name} (PID {pid})?")
+        if answer != QMessageBox.Yes:
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            QMessageBox.warning(self, "End Task", f"Could not end {name}: {e.strerror}")
+
+    def changeEvent(self, event):
+        # Nothing to show while minimized: stop scanning until the window is restored
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.timer.stop()
+            elif not self.timer.isActive():
+                self.refresh()
+                self.timer.start(REFRESH_MS)
+        super().changeEvent(event)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.scanner.close()
+        super().closeEvent(event)
+
+
+def main():
+    app = QApplication(sys.argv)
+    app.setApplicationName("Task Manager")
+    window = TaskManager()
+    window.show()
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
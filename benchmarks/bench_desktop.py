@@ -0,0 +1,252 @@
+"""
+Headless microbenchmarks for the desktop.py hot paths.
+
+    python3 benchmarks/bench_desktop.py --sizes 10,100,1000,5000 --output bench.json
+    python3 benchmarks/bench_desktop.py --compare bench.json
+
+Each operation runs against a stub WebView (payloads are recorded, not
+executed), an in-memory window backend and synthetic applications/icon
+trees, and reports latency percentiles, allocations and bytes sent to JS.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from stubs import (BASE_DIR, StubIconTheme, StubScriptMessage, fake_windows, make_headless_shell)
+
+# 1x1 transparent PNG, enough for GTK's icon theme to index the file
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000005000155a2a0c70000000049454e44ae426082")
+
+
+def build_icon_theme(root, names):
+    """Synthetic hicolor theme with a 48x48 icon per name"""
+    icon_dir = os.path.join(root, "icons", "hicolor", "48x48", "apps")
+    os.makedirs(icon_dir, exist_ok=True)
+    with open(os.path.join(root, "icons", "hicolor", "index.theme"), "w") as f:
+        f.write("[Icon Theme]\nName=Hicolor\nDirectories=48x48/apps\n\n"
+                "[48x48/apps]\nSize=48\nContext=Applications\nType=Fixed\n")
+    for name in names:
+        with open(os.path.join(icon_dir, f"{name}.png"), "wb") as f:
+            f.write(_PNG)
+    return icon_dir
+
+
+def build_applications(root, count):
+    """count .desktop entries; every 10th is hidden, every 7th names a missing icon"""
+    app_dir = os.path.join(root, f"applications-{count}")
+    os.makedirs(app_dir, exist_ok=True)
+    icons = []
+    for i in range(count):
+        icon = f"synthetic-app-{i}" if i % 7 else f"missing-icon-{i}"
+        if i % 7:
+            icons.append(icon)
+        with open(os.path.join(app_dir, f"synthetic-{i}.desktop"), "w") as f:
+            f.write("[Desktop Entry]\nType=Application\n"
+                    f"Name=Synthetic App {i}\nExec=/usr/bin/synthetic-{i} %U\nIcon={icon}\n"
+                    f"{'NoDisplay=true' if i % 10 == 0 else ''}\n"
+                    "Categories=Utility;\n")
+    return app_dir, icons
+
+
+def make_icon_theme(root, use_gtk):
+    if use_gtk:
+        import gi
+        gi.require_version("Gtk", "3.0")
+        from gi.repository import Gtk
+        theme = Gtk.IconTheme.new()
+        theme.set_search_path([os.path.join(root, "icons")])
+        theme.set_custom_theme("hicolor")
+        return theme
+    return StubIconTheme(os.path.join(root, "icons", "hicolor", "48x48", "apps"))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure(name, size, fn, shell, iterations, min_time):
+    """Time fn() repeatedly, then once more under tracemalloc for allocations"""
+    fn()  # warm-up (imports, caches)
+    shell.webview.reset()
+
+    samples = []
+    started = time.perf_counter()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(samples) < iterations or (time.perf_counter() - started < min_time and len(samples) < iterations * 20):
+            t0 = time.perf_counter_ns()
+            fn()
+            samples.append((time.perf_counter_ns() - t0) / 1000.0)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    js_calls = len(shell.webview.calls) / len(samples)
+    js_bytes = shell.webview.bytes_sent / len(samples)
+
+    tracemalloc.start()
+    before_snapshot = tracemalloc.take_snapshot()
+    base_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    after_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(0, stat.count_diff) for stat in after_snapshot.compare_to(before_snapshot, "filename"))
+    shell.webview.reset()
+
+    samples.sort()
+    return {
+        "op": name,
+        "size": size,
+        "iterations": len(samples),
+        "mean_us": round(sum(samples) / len(samples), 2),
+        "p50_us": round(percentile(samples, 50), 2),
+        "p90_us": round(percentile(samples, 90), 2),
+        "p99_us": round(percentile(samples, 99), 2),
+        "max_us": round(samples[-1], 2),
+        "alloc_peak_bytes": max(0, peak - base_current),
+        "alloc_retained_bytes": current - base_current,
+        "alloc_blocks": blocks,
+        "js_calls": round(js_calls, 2),
+        "js_bytes": round(js_bytes, 1),
+    }
+
+
+def run_suite(args):
+    root = tempfile.mkdtemp(prefix="opendesktop-bench-")
+    results = []
+    try:
+        dock_icons = ["brave", "system-file-manager", "utilities-terminal", "preferences-system",
+                      "brave-browser", "nautilus", "gnome-terminal"]
+        trees = {size: build_applications(root, size) for size in args.sizes}
+        all_icons = set(dock_icons)
+        for _, icons in trees.values():
+            all_icons.update(icons)
+        build_icon_theme(root, sorted(all_icons))
+        theme = make_icon_theme(root, not args.stub_icons)
+
+        shell = make_headless_shell(icon_theme=theme)
+
+        def bench(name, size, fn, iterations=None):
+            result = measure(name, size, fn, shell, iterations or args.iterations, args.min_time)
+            results.append(result)
+            print(f"{name:<34}{size:>6}  p50 {result['p50_us']:>11.1f} us  p99 {result['p99_us']:>11.1f} us"
+                  f"  js {result['js_bytes']:>10.0f} B  alloc {result['alloc_peak_bytes']:>10} B")
+
+        bench("get_system_icon_path:hit", 1, lambda: shell.get_system_icon_path("utilities-terminal"),
+              args.iterations * 10)
+        bench("get_system_icon_path:fallback", 1, lambda: shell.get_system_icon_path("no-such-icon"),
+              args.iterations * 10)
+        def dock_cold():
+            shell.dock_apps = None
+            shell.handle_get_dock_apps()
+
+        bench("handle_get_dock_apps", 3, dock_cold)
+        bench("handle_get_dock_apps:cached", 3, shell.handle_get_dock_apps)
+
+        for size in args.sizes:
+            shell.app_dirs = [trees[size][0]]
+            iterations = max(3, min(args.iterations, 20000 // max(size, 1)))
+
+            def start_apps_cold():
+                shell.start_apps_stale = True
+                shell.handle_get_start_apps()
+
+            bench("handle_get_start_apps", size, start_apps_cold, iterations)
+            bench("handle_get_start_apps:cached", size, shell.handle_get_start_apps, iterations)
+
+        for size in args.window_counts:
+            shell.windows.cache = {w.xid: w for w in fake_windows(size)}
+
+            def changed():
+                shell.primary_view.last_running = None
+                shell.update_running_apps()
+
+            bench("update_running_apps", size, changed)
+            bench("update_running_apps:unchanged", size, shell.update_running_apps)
+
+        shell.windows.cache = {w.xid: w for w in fake_windows(50)}
+        focus = StubScriptMessage({"action": "focus_app", "xid": 0x1000000 + 7})
+        bench("bridge:focus_app", 50, lambda: shell.on_js_message(None, focus), args.iterations * 10)
+        by_command = StubScriptMessage({"action": "focus_app_by_command", "command": "gimp"})
+        bench("bridge:focus_app_by_command", 50, lambda: shell.on_js_message(None, by_command),
+              args.iterations * 10)
+        dock = StubScriptMessage({"action": "get_dock_apps"})
+        bench("bridge:get_dock_apps", 3, lambda: shell.on_js_message(None, dock))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = {(r["op"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\n{'op':<34}{'size':>6}{'p50 Δ':>10}{'p99 Δ':>10}{'js bytes Δ':>12}")
+    for result in current:
+        old = baseline.get((result["op"], result["size"]))
+        if not old:
+            continue
+
+        def delta(key):
+            return f"{(result[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+
+        print(f"{result['op']:<34}{result['size']:>6}{delta('p50_us'):>10}{delta('p99_us'):>10}{delta('js_bytes'):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,5000",
+                        help="synthetic /usr/share/applications sizes (comma separated)")
+    parser.add_argument("--window-counts", default="10,100,500", help="fake window counts for update_running_apps")
+    parser.add_argument("--iterations", type=int, default=200, help="minimum samples per operation")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum seconds spent per operation")
+    parser.add_argument("--stub-icons", action="store_true",
+                        help="use a pure-Python icon theme instead of Gtk.IconTheme")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to diff against")
+    args = parser.parse_args()
+    args.sizes = [int(x) for x in args.sizes.split(",") if x]
+    args.window_counts = [int(x) for x in args.window_counts.split(",") if x]
+
+    results = run_suite(args)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "icon_theme": "stub" if args.stub_icons else "gtk",
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Cold-boot benchmark: time from process start to a usable dock, under Xvfb.
+
+    python3 benchmarks/cold_boot.py --runs 10 --target desktop --output boot.json
+
+Each run starts a fresh Xvfb server, launches main.py (splash + desktop) or
+desktop.py directly with OPENDESKTOP_MILESTONES=1, and collects the
+"[milestone] name time pid" lines the shell prints:
+
+    splash-start, splash-paint      main.py only
+    desktop-start                   desktop.py imported
+    load-finished                   desktop.html finished loading
+    dock-render                     first dock render (reported by script.js)
+    start-apps-received             start menu app list delivered to the page
+    startup-services                last startup stage done (app index, background
+                                    services); startup-show and startup-windows mark
+                                    the earlier stages
+
+Peak RSS (VmHWM) is sampled for every process in the run's session, which
+covers the splash, desktop.py and WebKit's web and network processes.
+Everything runs offline and needs no GPU.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+MILESTONES = {
+    "main": ["splash-start", "splash-paint", "desktop-start", "load-finished", "dock-render", "start-apps-received",
+             "startup-services"],
+    "desktop": ["desktop-start", "load-finished", "dock-render", "start-apps-received", "startup-services"],
+}
+
+
+def free_display():
+    for n in range(99, 200):
+        if not os.path.exists(f"/tmp/.X{n}-lock") and not os.path.exists(f"/tmp/.X11-unix/X{n}"):
+            return n
+    raise RuntimeError("No free X display number")
+
+
+class Xvfb:
+    def __init__(self, geometry="1920x1080x24"):
+        self.geometry = geometry
+        self.display = None
+        self.process = None
+
+    def __enter__(self):
+        if not shutil.which("Xvfb"):
+            raise SystemExit("Xvfb not found (install xvfb)")
+        n = free_display()
+        self.display = f":{n}"
+        self.process = subprocess.Popen(["Xvfb", self.display, "-screen", "0", self.geometry, "-nolisten", "tcp"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket_path = f"/tmp/.X11-unix/X{n}"
+        deadline = time.time() + 10
+        while not os.path.exists(socket_path):
+            if time.time() > deadline or self.process.poll() is not None:
+                raise RuntimeError("Xvfb did not start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def session_processes(sid):
+    """(pid, comm, cmdline) for every live process in session sid"""
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            fields = stat[stat.rindex(")") + 2:].split()
+            if int(fields[3]) != sid:
+                continue
+            comm = stat[stat.index("(") + 1:stat.rindex(")")]
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+            result.append((int(entry), comm, cmdline))
+        except (OSError, ValueError, IndexError):
+            continue
+    return result
+
+
+def component_name(comm, cmdline):
+    for script in ("desktop.py", "main.py", "aboutpc.py"):
+        if script in cmdline:
+            return script
+    return comm
+
+
+def peak_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def run_once(target, display, timeout, home):
+    expected = MILESTONES[target]
+    env = os.environ.copy()
+    env.update({
+        "DISPLAY": display,
+        "OPENDESKTOP_MILESTONES": "1",
+        "OPENDESKTOP_NO_AUTOSTART": "1",
+        "LIBGL_ALWAYS_SOFTWARE": "1",
+        "NO_AT_BRIDGE": "1",
+        "PYTHONUNBUFFERED": "1",
+    })
+    if home:
+        env["XDG_CACHE_HOME"] = os.path.join(home, "cache")
+        env["XDG_DATA_HOME"] = os.path.join(home, "data")
+
+    script = "main.py" if target == "main" else "desktop.py"
+    launched_at = time.time()
+    process = subprocess.Popen([sys.executable, script], cwd=BASE_DIR, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, start_new_session=True)
+    marks = {}
+    done = threading.Event()
+
+    def reader():
+        for line in process.stdout:
+            if line.startswith("[milestone] "):
+                parts = line.split()
+                if len(parts) >= 3 and parts[1] not in marks:
+                    marks[parts[1]] = float(parts[2])
+                    if all(name in marks for name in expected):
+                        done.set()
+        done.set()
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    peaks = {}
+    deadline = time.time() + timeout
+    while not done.is_set() and time.time() < deadline:
+        for pid, comm, cmdline in session_processes(process.pid):
+            name = component_name(comm, cmdline)
+            peaks[name] = max(peaks.get(name, 0), peak_rss_kb(pid))
+        done.wait(0.05)
+    # One last sample once the dock is up, then tear the whole session down
+    for pid, comm, cmdline in session_processes(process.pid):
+        name = component_name(comm, cmdline)
+        peaks[name] = max(peaks.get(name, 0), peak_rss_kb(pid))
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=5)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    return {
+        "milestones_ms": {name: round((t - launched_at) * 1000, 1) for name, t in marks.items()},
+        "missing": [name for name in expected if name not in marks],
+        "peak_rss_kb": peaks,
+    }
+
+
+def p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def summarize(runs, target):
+    summary = {"milestones": {}, "peak_rss_kb": {}}
+    for name in MILESTONES[target]:
+        values = [r["milestones_ms"][name] for r in runs if name in r["milestones_ms"]]
+        if values:
+            summary["milestones"][name] = {"median_ms": round(statistics.median(values), 1),
+                                           "p95_ms": round(p95(values), 1), "n": len(values)}
+    components = {name for r in runs for name in r["peak_rss_kb"]}
+    for name in sorted(components):
+        values = [r["peak_rss_kb"][name] for r in runs if name in r["peak_rss_kb"]]
+        summary["peak_rss_kb"][name] = {"median": int(statistics.median(values)), "max": max(values)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", choices=("desktop", "main"), default="desktop",
+                        help="start desktop.py directly or go through the main.py splash")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for all milestones")
+    parser.add_argument("--geometry", default="1920x1080x24", help="Xvfb screen geometry")
+    parser.add_argument("--warm-home", action="store_true",
+                        help="reuse the user's cache directories instead of a fresh one per run")
+    parser.add_argument("--output", help="write raw runs and summary as JSON")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        home = None if args.warm_home else tempfile.mkdtemp(prefix="opendesktop-boot-")
+        try:
+            with Xvfb(args.geometry) as xvfb:
+                run = run_once(args.target, xvfb.display, args.timeout, home)
+        finally:
+            if home:
+                shutil.rmtree(home, ignore_errors=True)
+        runs.append(run)
+        last = max(run["milestones_ms"].values(), default=0)
+        missing = f"  missing: {', '.join(run['missing'])}" if run["missing"] else ""
+        print(f"run {i + 1}/{args.runs}: {last:.0f} ms to last milestone{missing}")
+
+    summary = summarize(runs, args.target)
+    print(f"\n{'milestone':<24}{'median':>10}{'p95':>10}")
+    for name, stats in summary["milestones"].items():
+        print(f"{name:<24}{stats['median_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+    print(f"\n{'process':<24}{'peak RSS median':>18}{'max':>12}")
+    for name, stats in summary["peak_rss_kb"].items():
+        print(f"{name:<24}{stats['median'] / 1024:>15.1f} MB{stats['max'] / 1024:>9.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"target": args.target, "runs": runs, "summary": summary}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Replays a session recorded with OPENDESKTOP_RECORD=path (or "record" in
+config.json) against the headless shell, so a field report can be
+reproduced and profiled without a display.
+
+    OPENDESKTOP_RECORD=/tmp/session.jsonl python3 desktop.py
+    python3 benchmarks/replay.py /tmp/session.jsonl --profile replay.prof
+
+Window events are applied to an in-memory backend and bridge messages go
+through on_js_message exactly as WebKit would deliver them. Nothing is
+executed: launches and power commands are only counted, and actions that
+open GTK dialogs or Qt windows are skipped. By default the recording is
+replayed as fast as possible; --realtime keeps the original pacing.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import time
+
+from stubs import StubIconTheme, StubScriptMessage, make_headless_shell
+from modules.recorder import read_recording
+from modules.window_backends import WindowInfo
+
+# Bridge actions that would write the user's config.json
+SKIPPED_ACTIONS = {"set_wallpaper"}
+
+
+def make_icon_theme(use_gtk):
+    """The user's real icon theme, so icon lookups cost what they cost live"""
+    if use_gtk:
+        import gi
+        gi.require_version("Gtk", "3.0")
+        from gi.repository import Gtk
+        return Gtk.IconTheme.new()
+    return StubIconTheme("/usr/share/icons/hicolor/48x48/apps")
+
+
+def apply_window_record(shell, record):
+    backend = shell.windows
+    event = record["event"]
+    if event == "snapshot":
+        backend.cache = {w["xid"]: WindowInfo(**w) for w in record["windows"]}
+        active = [w["xid"] for w in record["windows"] if w.get("active")]
+        backend.active_xid = active[0] if active else None
+        shell.schedule_running_update()
+    elif event == "opened":
+        backend.add_window(WindowInfo(**record["info"]))
+    elif event == "closed":
+        backend.remove_window(record["xid"])
+    elif event == "changed":
+        info = record["info"]
+        if info["xid"] in backend.cache:
+            backend.update_window(info["xid"], **{k: v for k, v in info.items() if k != "xid"})
+        else:
+            backend.add_window(WindowInfo(**info))
+    elif event == "active":
+        backend.set_active(record["xid"])
+
+
+def replay(records, shell, realtime=False):
+    stats = {"bridge": 0, "skipped": 0, "window": 0, "recorded_js_calls": 0, "recorded_js_bytes": 0,
+             "by_action": {}}
+    started = time.monotonic()
+    for record in records:
+        kind = record.get("kind")
+        if realtime:
+            delay = record.get("t", 0) - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+        if kind == "js":
+            stats["recorded_js_calls"] += 1
+            stats["recorded_js_bytes"] += len(record["script"].encode("utf-8"))
+        elif kind == "window":
+            stats["window"] += 1
+            apply_window_record(shell, record)
+        elif kind == "bridge":
+            try:
+                action = json.loads(record["message"]).get("action")
+            except ValueError:
+                action = None
+            if action in SKIPPED_ACTIONS:
+                stats["skipped"] += 1
+                continue
+            stats["bridge"] += 1
+            stats["by_action"][action] = stats["by_action"].get(action, 0) + 1
+            shell.on_js_message(None, StubScriptMessage(record["message"]))
+        # Stands in for the idle callback that would run between main loop events
+        shell.drain()
+    stats["elapsed_s"] = round(time.monotonic() - started, 4)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="JSON-lines file written by the recorder")
+    parser.add_argument("--realtime", action="store_true", help="sleep to reproduce the recorded timing")
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    parser.add_argument("--stub-icons", action="store_true",
+                        help="use a pure-Python icon theme instead of Gtk.IconTheme")
+    parser.add_argument("--top", type=int, default=25, help="functions to print from the profile")
+    args = parser.parse_args()
+
+    records = list(read_recording(args.recording))
+    if not records or records[0].get("kind") != "meta":
+        raise SystemExit(f"{args.recording} is not a recording")
+
+    shell = make_headless_shell(icon_theme=make_icon_theme(not args.stub_icons))
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    stats = replay(records[1:], shell, args.realtime)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    duration = records[-1].get("t", 0)
+    replayed_bytes = shell.webview.bytes_sent
+    print(f"recording        {os.path.basename(args.recording)}, {duration:.1f} s, {len(records) - 1} events")
+    print(f"replay time      {stats['elapsed_s']:.3f} s")
+    print(f"bridge messages  {stats['bridge']} replayed, {stats['skipped']} skipped")
+    for action, count in sorted(stats["by_action"].items(), key=lambda item: -item[1]):
+        print(f"    {action or '?':<28}{count:>6}")
+    print(f"window events    {stats['window']}")
+    print(f"JS calls         recorded {stats['recorded_js_calls']}, replayed {len(shell.webview.calls)}")
+    print(f"JS bytes         recorded {stats['recorded_js_bytes']}, replayed {replayed_bytes}")
+    if shell.supervisor.spawned:
+        print(f"spawns (not run) {len(shell.supervisor.spawned)}")
+    if profiler:
+        print()
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Stand-ins for the GTK/WebKit/X pieces of desktop.py so its handlers can be
+driven without a display. Shared by the microbenchmarks and the replay tool.
+"""
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from modules.launch_utils import ProcessSupervisor
+from modules.launch_profiles import LaunchProfiles
+from modules.launch_metrics import LatencyHistograms, LaunchTracker
+from modules.prefetch import LaunchStats
+from modules.memory_usage import MemoryAccountant
+from modules.frame_metrics import FrameStats
+from modules.power_mode import PowerModeManager
+from modules.settings import SettingsStore
+from modules.startup import UICache
+from modules.window_backends import FakeBackend, WindowInfo
+
+
+class StubWebView:
+    """Records every run_javascript payload instead of executing it"""
+
+    def __init__(self):
+        self.calls = []
+        self.bytes_sent = 0
+
+    def run_javascript(self, script, *args):
+        self.calls.append(script)
+        self.bytes_sent += len(script.encode("utf-8"))
+
+    def reset(self):
+        self.calls.clear()
+        self.bytes_sent = 0
+
+
+class StubIconInfo:
+    def __init__(self, filename):
+        self.filename = filename
+
+    def get_filename(self):
+        return self.filename
+
+
+class StubIconTheme:
+    """Pure-Python icon theme: name -> file lookups over a synthetic directory"""
+
+    def __init__(self, icon_dir):
+        self.icons = {}
+        if os.path.isdir(icon_dir):
+            for file in os.listdir(icon_dir):
+                self.icons[os.path.splitext(file)[0]] = os.path.join(icon_dir, file)
+
+    def lookup_icon(self, name, size, flags):
+        path = self.icons.get(name)
+        return StubIconInfo(path) if path else None
+
+
+class StubJSValue:
+    def __init__(self, text):
+        self.text = text
+
+    def to_string(self):
+        return self.text
+
+
+class StubScriptMessage:
+    """What WebKit hands to script-message-received: result.get_js_value().to_string()"""
+
+    def __init__(self, payload):
+        self.value = StubJSValue(payload if isinstance(payload, str) else json.dumps(payload))
+
+    def get_js_value(self):
+        return self.value
+
+
+class StubProcess:
+    """Looks enough like subprocess.Popen for the shell's bookkeeping"""
+    _pids = itertools.count(900000)
+
+    def __init__(self, cmd):
+        self.args = cmd
+        self.pid = next(self._pids)
+        self.returncode = None
+
+
+class StubSupervisor(ProcessSupervisor):
+    """Records spawn requests instead of executing anything (replays may contain power_command)"""
+
+    def __init__(self):
+        super().__init__()
+        self.spawned = []
+
+    def spawn(self, cmd, app=None, timeout=None, profile=None, **popen_kwargs):
+        process = StubProcess(cmd)
+        self.spawned.append((list(cmd), app))
+        self.track(process, cmd, app=app)
+        return process
+
+    def use_glib_main_loop(self):
+        pass
+
+
+def fake_windows(count, classes=None):
+    """count normal windows spread over a handful of app classes"""
+    classes = classes or ["brave-browser", "nautilus", "gnome-terminal", "code", "gimp", "libreoffice"]
+    return [
+        WindowInfo(xid=0x1000000 + i, class_name=classes[i % len(classes)], name=f"Window {i}",
+                   pid=10000 + i, geometry=((i % 4) * 480, (i // 4 % 3) * 360, 800, 600))
+        for i in range(count)
+    ]
+
+
+def make_headless_shell(base_dir=BASE_DIR, app_dirs=None, icon_theme=None, windows=None, config=None):
+    """
+    An object carrying OpenDesktop's methods but none of its GTK state.
+
+    The methods are copied off the class rather than inherited, so no
+    GObject is ever constructed and nothing needs an X display.
+    """
+    import desktop
+
+    class HeadlessShell:
+        def own_xids(self):
+            return set()
+
+        def new_startup_id(self, command):
+            return None
+
+        # No GLib main loop here: remember the request, drain() performs it
+        def schedule_running_update(self):
+            self.running_update_pending = True
+
+        # No Gio file monitors either: the start menu cache is invalidated by hand
+        def watch_app_dirs(self):
+            pass
+
+        def drain(self):
+            if self.running_update_pending:
+                self.running_update_pending = False
+                self.update_running_apps()
+
+    for name, value in vars(desktop.OpenDesktop).items():
+        if callable(value) and not name.startswith("__") and name not in vars(HeadlessShell):
+            setattr(HeadlessShell, name, value)
+
+    state_dir = tempfile.mkdtemp(prefix="opendesktop-headless-")
+    shell = HeadlessShell()
+    shell.base_dir = base_dir
+    # Settings are read from base_dir but never written back from a benchmark or replay
+    shell.settings = SettingsStore(base_dir, writable=False)
+    shell.config = config or {}
+    shell.dock_apps = None
+    shell.recorder = None
+    shell.icon_theme = icon_theme
+    shell.app_dirs = app_dirs or []
+    shell.webview = StubWebView()
+    shell.primary_view = desktop.ShellView(shell.webview, None)
+    shell.views = [shell.primary_view]
+    shell.reply_view = None
+    shell.supervisor = StubSupervisor()
+    shell.launch_profiles = LaunchProfiles(None)
+    shell.dock_profiles = {}
+    # Statistics go to a scratch directory, never to the real ones in $XDG_STATE_HOME
+    shell.launch_stats = LaunchStats(os.path.join(state_dir, "launch_stats.json"))
+    shell.prefetcher = None
+    shell.latency = LatencyHistograms(os.path.join(state_dir, "launch_latency.json"))
+    shell.launch_tracker = LaunchTracker(shell.latency)
+    shell.launch_contexts = {}
+    shell.latency_save_id = 0  # non-None: never schedule a GLib save timer
+    shell.session_save_id = 0
+    shell.session_exits_pending = False
+    shell.saved_session = None
+    shell.supervisor.exit_callbacks.append(shell.on_child_exit)
+    shell.windows = FakeBackend(windows or [])
+    shell.windows.connect(shell.on_window_event)
+    shell.running_update_id = None
+    shell.running_update_pending = False
+    shell.memory = MemoryAccountant(app_names=shell.supervisor.pid_map)
+    shell.memory_dump_path = os.path.join(state_dir, "memory_usage.json")
+    shell.frame_stats = FrameStats(os.path.join(state_dir, "frame_stats.json"))
+    shell.power_mode = PowerModeManager()
+    shell.running_update_deferred = False
+    shell.system_info = None
+    shell.about_timer_id = None
+    shell.about_view = None
+    shell.previews = None
+    shell.preview_view = None
+    shell.dock_usage = None
+    # Desktop icons would scan the real ~/Desktop and write into ~/.cache/thumbnails
+    shell.desktop_enabled = False
+    shell.thumbnails = None
+    shell.wallpaper_gallery = None
+    shell.gallery_view = None
+    shell.desktop_monitor = None
+    shell.start_apps = []
+    shell.start_apps_stale = True
+    shell.app_dir_monitors = []
+    shell.start_apps_refresh_id = None
+    shell.file_index = None
+    shell.status_sources = []
+    shell.status_state = {}
+    shell.status_dirty = set()
+    shell.status_push_id = None
+    # Handlers behave as after startup; the last-known UI cache is never consulted
+    shell.startup_stage = "ready"
+    shell.ui_cache = UICache(os.path.join(state_dir, "ui_cache.json"))
+    return shell
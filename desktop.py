@@ -5,21 +5,71 @@
 # Copyright 2025 (C) Radin6262, All rights reserved
 
 #!/usr/bin/env python3
+from modules.milestones import milestone
+milestone("desktop-start")
+
 import gi
 import json
 import os
+import signal
 import subprocess
+import threading
+import time
 import configparser
 # In your main script:
-from modules.launch_utils import launch_script_pythonw_style
+from modules.launch_utils import get_supervisor
+from modules.launch_profiles import LaunchProfiles
+from modules.autostart import AutostartEngine, read_xdg_autostart, read_session, save_session, session_apps
+from modules.prefetch import LaunchStats, Prefetcher
+from modules.launch_metrics import LatencyHistograms, LaunchTracker
+from modules.window_backends import create_backend, monitor_index, EVENT_OPENED, EVENT_CHANGED, EVENT_CLOSED
+from modules.window_previews import PreviewService
+from modules.thumbnails import ThumbnailService, file_uri, guess_mime
+from modules.wallpapers import WallpaperGallery, cached_wallpaper
+from modules.file_index import FileIndex, default_db_path, rank_results
+from modules.desktop_folder import desktop_dir, scan_desktop, read_launcher, is_trusted_launcher
+from modules.recorder import open_recorder
+from modules.system_info import SystemInfoCollector
+from modules.memory_usage import MemoryAccountant
+from modules.frame_metrics import FrameStats
+from modules.power_mode import PowerModeManager, read_power_state, TIER_SUSPENDED
+from modules.status_sources import create_sources
+from modules.app_usage import AppUsage
+from modules.settings import SettingsStore, cache_path, state_path
+from modules.startup import StartupStages, UICache
+from modules.frontend_bundle import bundle_page
+from modules.web_profile import resolve_profile, apply_profile, apply_memory_limit
 
-# Core dependencies for GUI, Web Rendering, and Window Management
+# Core dependencies for GUI and Web Rendering (window tracking lives in modules/window_backends)
 gi.require_version("Gtk", "3.0")
 gi.require_version("WebKit2", "4.1")
 gi.require_version("Gdk", "3.0")
-gi.require_version("Wnck", "3.0")
 
-from gi.repository import Gtk, WebKit2, Gdk, Wnck, GLib
+from gi.repository import Gtk, WebKit2, Gdk, GLib, Gio
+
+class ShellView:
+    """One monitor's WebView, the window holding it and the window list it last received."""
+
+    def __init__(self, webview, window, monitor=None):
+        self.webview = webview
+        self.window = window
+        self.monitor = monitor
+        self.last_running = None
+        self.reload_started = None  # monotonic time of a recovery/hot reload in progress
+
+    def rect(self):
+        if self.monitor is None:
+            return None
+        geometry = self.monitor.get_geometry()
+        return (geometry.x, geometry.y, geometry.width, geometry.height)
+
+class MonitorWindow(Gtk.Window):
+    """Panel and desktop for a secondary monitor; all state stays in OpenDesktop."""
+
+    def __init__(self, webview):
+        super().__init__(title="OpenDesktop Environment")
+        self.set_decorated(False)
+        self.add(webview)
 
 class OpenDesktop(Gtk.Window):
     def __init__(self):
@@ -27,51 +77,658 @@ class OpenDesktop(Gtk.Window):
         self.set_decorated(False)
         self.fullscreen()
 
+        # Startup runs in stages so the first paint never waits for work nobody can see yet:
+        # "show" (here) puts up the window with the last-known dock and start menu, "windows"
+        # attaches window tracking once the loop is idle, and "services" (app index, icons,
+        # file search, status sources, file monitors) runs step by step after the page loaded
+        self.startup = StartupStages()
+        self.startup_stage = None
+        self.startup_steps = None
+        self.page_loaded = False
+        self.startup.run("show", self.init_shown_state)
+        self.startup.done("show")
+        self.show_all()
+        # Low priority keeps it behind the first frame's layout and paint
+        GLib.idle_add(self.startup_stage_windows, priority=GLib.PRIORITY_LOW)
+
+    def init_shown_state(self):
+        """Stage one: what the first frame needs. Later stages fill in the None/empty placeholders."""
+        self.startup_stage = "show"
         # Absolute path tracking for assets and scripts
         self.base_dir = os.path.dirname(os.path.realpath(__file__))
+        # config.json and dock.json live in memory; edits are saved atomically after a
+        # short pause, and changes made by other programs are picked up by a file monitor
+        self.settings = SettingsStore(self.base_dir)
+        self.config = self.settings.config.data
+        self.dock_apps = None  # dock.json entries with resolved icons, built on first request
+        # Dock and start menu as the last session showed them, painted before any scan
+        self.ui_cache = UICache(cache_path("ui_cache.json"))
+
+        # Optional record mode: OPENDESKTOP_RECORD=/path/session.jsonl (or "record" in config.json)
+        self.recorder = open_recorder(os.environ.get("OPENDESKTOP_RECORD") or self.config.get("record"))
+
+        # Icon lookups and the start menu scan read these, so benchmarks can point them elsewhere
+        self.icon_theme = Gtk.IconTheme.get_default()
+        self.app_dirs = ["/usr/share/applications", os.path.expanduser("~/.local/share/applications")]
+        self.start_apps = []  # cached scan, redone only after an applications directory changes
+        self.start_apps_stale = True
+        self.app_dir_monitors = []
+        self.start_apps_refresh_id = None
+
+        # Every child we start is tracked and reaped from the GTK main loop
+        self.supervisor = get_supervisor()
+        self.supervisor.use_glib_main_loop()
+
+        # Per-app scheduling profiles; the shell protects itself before WebKit
+        # spawns its web/network processes so they inherit the same priority
+        self.launch_profiles = LaunchProfiles(os.path.join(self.base_dir, "profiles.json"))
+        self.dock_profiles = {}
+        failed = self.launch_profiles.get("shell").apply()
+        if failed:
+            print(f"Shell profile partially applied (missing: {', '.join(failed)})")
+
+        # Filled in by the later stages; handlers check for None until then
+        self.windows = None
+        self.running_update_id = None
+        self.autostart = None
+        self.file_index = None
+        self.previews = None
+        self.preview_view = None
+        self.dock_usage = None
+        self.status_sources = []
+        self.status_state = {}
+        self.status_dirty = set()
+        self.status_push_id = None
+        self.frontend_monitors = []
+        self.frontend_changed = set()
+        self.frontend_reload_id = None
+        self.web_process_crashes = []
+
+        # WebKit profile ("frontend" in config.json): production loads the prebuilt bundle and
+        # turns off developer extras and features the shell does not use; development is for hacking
+        self.web_profile = resolve_profile(self.config)
+        apply_memory_limit(self.web_profile)
+        page = bundle_page(self.base_dir) if self.web_profile["bundle"] else None
+        self.page_uri = "file://" + (page or os.path.join(self.base_dir, "desktop.html"))
 
         # WebKit Configuration: Enable local file access
-        settings = WebKit2.Settings()
-        settings.set_allow_universal_access_from_file_urls(True)
-        settings.set_allow_file_access_from_file_urls(True)
-        settings.set_enable_developer_extras(True)
+        self.web_settings = WebKit2.Settings()
+        self.web_settings.set_allow_universal_access_from_file_urls(True)
+        self.web_settings.set_allow_file_access_from_file_urls(True)
+
+        # One WebContext for every monitor. Views for extra monitors are related
+        # to this one, so they share its web process and memory cache (wallpaper,
+        # icons) instead of each bringing up their own.
+        self.web_context = WebKit2.WebContext.get_default()
+        apply_profile(self.web_profile, self.web_settings, self.web_context)
+        self.webview = self.create_webview()
+        self.primary_view = ShellView(self.webview, self)
+        self.views = [self.primary_view]
+        self.reply_view = None  # view whose bridge message is being handled
+
+        self.add(self.webview)
+        self.connect("destroy", self.on_destroy)
+
+        # Launch statistics drive idle-time page cache warming of likely apps
+        prefetch_cfg = self.config.get("prefetch", {})
+        self.launch_stats = LaunchStats(state_path("launch_stats.json"))
+        self.prefetcher = None
+        if prefetch_cfg.get("enabled", True):
+            self.prefetcher = Prefetcher(self.launch_stats,
+                                         top_n=prefetch_cfg.get("top_n", 8),
+                                         min_available_mb=prefetch_cfg.get("min_available_mb", 512))
+
+        # Launch feedback: startup-notification ids, time-to-first-window histograms
+        self.latency = LatencyHistograms(state_path("launch_latency.json"))
+        self.launch_tracker = LaunchTracker(self.latency)
+        self.launch_contexts = {}
+        self.latency_save_id = None
+        self.supervisor.exit_callbacks.append(self.on_child_exit)
+        self.session_path = state_path("session.json")
+        # Saved as apps start and exit, not only on a clean exit: a crash or a killed
+        # X session would lose it otherwise
+        self.session_save_id = None
+        self.session_exits_pending = False
+        self.saved_session = None
+
+        # Memory footprint per component (shell, WebKit processes, splash, apps).
+        # SIGUSR1 writes the latest sample to memory_usage.json; sampling starts with the services.
+        memory_cfg = self.config.get("memory", {})
+        self.memory = MemoryAccountant(app_names=self.supervisor.pid_map,
+                                       thresholds_mb=memory_cfg.get("thresholds_mb"))
+        self.memory_dump_path = state_path("memory_usage.json")
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self.dump_memory)
+
+        # Frame-time reports from the page's opt-in frame monitor
+        self.frame_stats = FrameStats(state_path("frame_stats.json"))
+
+        # "About this PC" data is collected lazily, only while the panel is open
+        self.system_info = None
+        self.about_timer_id = None
+        self.about_view = None
+
+        # Effects/power tier: battery state, screen lock and frame probes decide
+        # how much the UI may cost (blur, transitions, timer rates). The page's
+        # first paint already uses the tier, so the battery is read now.
+        power_cfg = self.config.get("power_mode", {})
+        self.power_mode = PowerModeManager(forced=power_cfg.get("tier"),
+                                           low_battery=power_cfg.get("low_battery", 20))
+        self.power_mode.connect(self.on_power_tier_changed)
+        self.running_update_deferred = False
+        self.poll_power_state()
+
+        # ~/Desktop icons: listed at once with placeholder icons, thumbnails from the
+        # shared ~/.cache/thumbnails cache streamed in as the worker pool gets to them
+        desktop_cfg = self.config.get("desktop_icons", {})
+        self.desktop_enabled = desktop_cfg.get("enabled", True)
+        self.desktop_path = os.path.abspath(os.path.expanduser(desktop_cfg.get("path") or desktop_dir()))
+        self.desktop_monitor = None
+        self.desktop_rescan_id = None
+        self.desktop_thumbs = {}  # path -> (mtime, thumbnail URI or None)
+        self.desktop_mtimes = {}
+        self.mime_icons = {}
+        self.thumbnail_batch = []
+        self.thumbnail_flush_id = None
+        self.thumbnail_lock = threading.Lock()
+        self.thumbnails = ThumbnailService(self.on_thumbnail_ready,
+                                           workers=desktop_cfg.get("thumbnail_workers", 2))
+        # Wallpaper gallery: created when first opened, shares the thumbnail pool
+        self.wallpaper_gallery = None
+        self.gallery_view = None
+
+        # Recovery: a crashed or killed web process is replaced and its page restored from cached state
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR2, self.restart_web_process)
+
+        # A panel and desktop on every monitor, following hotplug. Only the primary
+        # one now: secondary views start loading in stage three, after the first paint
+        self.secondary_views = False
+        self.sync_monitors()
+        self.get_screen().connect("monitors-changed", self.sync_monitors)
+
+    def startup_stage_windows(self):
+        """Stage two, first idle after the window is shown: window tracking, then login apps."""
+        for step in (self.init_window_tracking, self.start_autostart):
+            self.run_startup_step("windows", step)
+        self.startup.done("windows")
+        self.startup_stage = "windows"
+        self.schedule_running_update()
+        self.advance_startup()
+        return False
+
+    def init_window_tracking(self):
+        # Window tracking through a pluggable backend ("wnck" or "xcb" in config.json).
+        # Backends keep an event-driven cache, so the dock is only refreshed on change.
+        listeners = [self.recorder.window_event] if self.recorder else []
+        listeners.append(self.on_window_event)
+        self.windows = create_backend(self.config.get("window_backend", "wnck"), listeners)
+        if self.recorder:
+            self.recorder.window_snapshot(self.windows.windows())
+
+    def start_autostart(self):
+        # Login apps: essential ones now, the rest staggered behind them. Started after
+        # window tracking so their first windows complete the launch bookkeeping.
+        autostart_cfg = self.config.get("autostart", {})
+        self.autostart = AutostartEngine(self.supervisor, self.launch_profiles,
+                                         max_parallel=autostart_cfg.get("max_parallel", 3))
+        if autostart_cfg.get("enabled", True) and not os.environ.get("OPENDESKTOP_NO_AUTOSTART"):
+            self.autostart.add(read_xdg_autostart())
+            if autostart_cfg.get("restore_session", True):
+                self.autostart.add(read_session(self.session_path))
+            self.autostart.start()
+
+    def advance_startup(self):
+        """Stage three starts once window tracking is attached and the primary page has loaded."""
+        if self.startup_stage != "windows" or not self.page_loaded:
+            return
+        self.startup_stage = "services"
+        self.startup_steps = iter([self.init_secondary_views, self.refresh_shell_lists,
+                                   self.init_file_index, self.init_status_sources,
+                                   self.init_previews, self.init_dock_usage, self.init_background_watches])
+        GLib.idle_add(self.startup_stage_services, priority=GLib.PRIORITY_LOW)
+
+    def startup_stage_services(self):
+        """Stage three: one service per idle callback, so input and paints get in between."""
+        step = next(self.startup_steps, None)
+        if step is not None:
+            self.run_startup_step("services", step)
+            return True
+        self.startup.done("services")
+        self.startup_stage = "ready"
+        print(self.startup.summary())
+        if self.autostart is None or not self.autostart.idle:
+            delay = self.config.get("autostart", {}).get("idle_delay", 5)
+            GLib.timeout_add_seconds(delay, self.on_desktop_settled)
+        return False
+
+    def init_secondary_views(self):
+        # WebViews for the other monitors, sharing the primary's web process
+        self.secondary_views = True
+        self.sync_monitors()
+
+    def run_startup_step(self, stage, step):
+        try:
+            self.startup.run(stage, step)
+        except Exception as e:
+            # One broken step must not keep the others, or the next stage, from starting
+            print(f"Startup step {step.__name__} failed: {e}")
+
+    def refresh_shell_lists(self):
+        """Replaces the cached dock and start menu with freshly resolved ones; views hear only of changes."""
+        shown_dock, shown_apps = self.dock_apps, self.start_apps
+        self.dock_apps = None
+        dock = self.get_dock_apps()
+        apps = self.get_start_apps()
+        if shown_dock is not None and dock != shown_dock:
+            self.broadcast_js(f"receiveDockData({json.dumps(dock)})")
+        if apps != shown_apps:
+            self.broadcast_js(f"receiveStartMenuApps({json.dumps(apps)})")
+        self.ui_cache.save(self.settings.dock.data, dock, apps)
+
+    def init_file_index(self):
+        # Start menu file search: an SQLite FTS5 index of the configured roots, built
+        # by a low-priority crawler once the desktop has settled, then kept by inotify
+        search_cfg = self.config.get("file_search", {})
+        if search_cfg.get("enabled", True):
+            self.file_index = FileIndex(os.path.expanduser(search_cfg.get("db") or default_db_path()),
+                                        search_cfg.get("roots", ["~"]),
+                                        excludes=search_cfg.get("exclude"),
+                                        max_files=search_cfg.get("max_files", 500000),
+                                        max_watches=search_cfg.get("max_watches", 8192),
+                                        files_per_second=search_cfg.get("files_per_second", 5000),
+                                        rescan_hours=search_cfg.get("rescan_hours", 12))
+
+    def init_status_sources(self):
+        # Taskbar status indicators (battery, network, volume, disk), each woken by
+        # kernel or sound server notifications; bursts are coalesced into one push
+        status_cfg = self.config.get("status", {})
+        self.status_sources = create_sources(status_cfg) if status_cfg.get("enabled", True) else []
+        self.status_dirty = {source.name for source in self.status_sources}
+        for source in self.status_sources:
+            if source.fileno() is not None:
+                condition = GLib.IO_PRI | GLib.IO_ERR if source.urgent else GLib.IO_IN | GLib.IO_HUP
+                GLib.io_add_watch(source.fileno(), GLib.PRIORITY_LOW, condition, self.on_status_event, source)
+            if source.name == "disk":
+                # Free space has no notification; a slow refresh is enough for a low-space warning
+                GLib.timeout_add_seconds(status_cfg.get("disk_interval", 300), self.refresh_disk_status)
+        if self.status_sources:
+            self.schedule_status_push()
+
+        # Battery uevents drive the power tier too; poll only without them
+        if not any(source.name == "battery" for source in self.status_sources):
+            GLib.timeout_add_seconds(self.config.get("power_mode", {}).get("battery_poll", 30), self.poll_power_state)
+
+    def init_previews(self):
+        # Dock hover previews: captured and downscaled on a worker thread, cached per XID
+        previews_cfg = self.config.get("window_previews", {})
+        if previews_cfg.get("enabled", True):
+            self.previews = PreviewService(lambda xid, entry: GLib.idle_add(self.push_window_preview, xid, entry.src),
+                                           budget_mb=previews_cfg.get("budget_mb", 16),
+                                           max_width=previews_cfg.get("width", 240),
+                                           max_height=previews_cfg.get("height", 160))
+
+    def init_dock_usage(self):
+        # CPU/RSS badges on dock items: each app's window process trees, sampled at a slow rate,
+        # sent only when a display threshold is crossed
+        usage_cfg = self.config.get("dock_usage", {})
+        if usage_cfg.get("enabled", True):
+            self.dock_usage = AppUsage(cpu_thresholds=usage_cfg.get("cpu_thresholds", (25, 50, 100, 200)),
+                                       memory_thresholds_mb=usage_cfg.get("memory_thresholds_mb", (1024, 2048, 4096)),
+                                       alert_cpu=usage_cfg.get("alert_cpu", 100),
+                                       alert_memory_mb=usage_cfg.get("alert_memory_mb", 4096))
+            GLib.timeout_add_seconds(usage_cfg.get("interval", 5), self.sample_dock_usage)
 
+    def init_background_watches(self):
+        """Timers and monitors nobody notices the first seconds without."""
+        interval = self.config.get("memory", {}).get("interval", 60)
+        if interval:
+            GLib.timeout_add_seconds(interval, self.sample_memory)
+        self.watch_screensaver()
+        self.settings.watch(self.on_config_changed, self.on_dock_changed)
+        # Dev: frontend edits reload the views (style.css is swapped in place)
+        if self.config.get("dev", {}).get("hot_reload") or os.environ.get("OPENDESKTOP_DEV"):
+            self.watch_frontend()
+
+    def create_webview(self, related=None):
+        """Builds a shell WebView on the shared context, with its own bridge so replies reach the right monitor."""
         # Content Manager for Javascript <-> Python Bridge
-        self.content_manager = WebKit2.UserContentManager()
-        self.content_manager.register_script_message_handler("bridge")
-        self.content_manager.connect("script-message-received::bridge", self.on_js_message)
-
-        # Initialize the webview
-        self.webview = WebKit2.WebView.new_with_user_content_manager(self.content_manager)
-        self.webview.set_settings(settings)
-        self.webview.connect("button-press-event", self.on_webview_button_press)
-        self.webview.connect("context-menu", self.on_context_menu)
-        
+        content_manager = WebKit2.UserContentManager()
+        content_manager.register_script_message_handler("bridge")
+        if related is None:
+            webview = WebKit2.WebView(web_context=self.web_context, user_content_manager=content_manager)
+        else:
+            webview = WebKit2.WebView(related_view=related, user_content_manager=content_manager)
+        content_manager.connect("script-message-received::bridge", self.on_js_message, webview)
+        webview.set_settings(self.web_settings)
+        webview.connect("load-changed", self.on_load_changed)
+        webview.connect("context-menu", self.on_context_menu)
+        webview.connect("web-process-terminated", self.on_web_process_terminated)
+
         # Load the HTML interface
-        html_path = "file://" + os.path.join(self.base_dir, "desktop.html")
-        self.webview.load_uri(html_path)
+        webview.load_uri(self.page_uri)
+        return webview
 
-        self.add(self.webview)
-        self.connect("destroy", Gtk.main_quit)
+    def sync_monitors(self, *args):
+        """One view per monitor: this window covers the primary one, MonitorWindows the rest."""
+        display = Gdk.Display.get_default()
+        monitors = [display.get_monitor(i) for i in range(display.get_n_monitors())]
+        primary = display.get_primary_monitor() or (monitors[0] if monitors else None)
+        self.primary_view.monitor = primary
+        multi = self.secondary_views and self.config.get("multi_monitor", True)
+        wanted = [m for m in monitors if m != primary] if multi else []
 
-        # Window Tracking Setup via libwnck
-        self.screen = Wnck.Screen.get_default()
-        # Poll for running apps every 2 seconds to update the dock/taskbar
-        GLib.timeout_add(100, self.update_running_apps)
+        for view in self.views[1:]:
+            if view.monitor not in wanted:
+                self.views.remove(view)
+                view.window.destroy()
+        for monitor in wanted:
+            if not any(view.monitor == monitor for view in self.views):
+                webview = self.create_webview(related=self.webview)
+                self.views.append(ShellView(webview, MonitorWindow(webview), monitor))
+
+        for view in self.views:
+            if view.monitor is not None:
+                geometry = view.monitor.get_geometry()
+                view.window.move(geometry.x, geometry.y)
+                view.window.fullscreen_on_monitor(self.get_screen(), monitors.index(view.monitor))
+            if view is not self.primary_view:
+                view.window.show_all()
+        # Window lists are split by monitor geometry, which may just have changed
+        for view in self.views:
+            view.last_running = None
+        self.schedule_running_update()
+
+    def watch_frontend(self):
+        # Edits land in the sources, so reloads must not go back to a prebuilt bundle
+        self.page_uri = "file://" + os.path.join(self.base_dir, "desktop.html")
+        for name in ("desktop.html", "script.js", "style.css"):
+            monitor = Gio.File.new_for_path(os.path.join(self.base_dir, name)).monitor_file(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+            monitor.connect("changed", self.on_frontend_changed, name)
+            self.frontend_monitors.append(monitor)
+        print("Hot reload: watching desktop.html, script.js and style.css")
+
+    def on_frontend_changed(self, monitor, file, other_file, event_type, name):
+        if event_type in (Gio.FileMonitorEvent.CHANGED, Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+            return  # wait for CHANGES_DONE_HINT (or the rename of an atomic save)
+        self.frontend_changed.add(name)
+        if self.frontend_reload_id is not None:
+            GLib.source_remove(self.frontend_reload_id)
+        self.frontend_reload_id = GLib.timeout_add(150, self.reload_frontend)
+
+    def reload_frontend(self):
+        self.frontend_reload_id = None
+        changed, self.frontend_changed = self.frontend_changed, set()
+        if changed == {"style.css"}:
+            self.broadcast_js("reloadStylesheet()")
+        else:
+            for view in self.views:
+                self.reload_view(view, bypass_cache=True)
+        return False
+
+    def reload_view(self, view, bypass_cache=False):
+        view.reload_started = time.monotonic()
+        view.last_running = None
+        if bypass_cache:
+            view.webview.reload_bypass_cache()
+        else:
+            view.webview.reload()
+        return False
+
+    def on_web_process_terminated(self, webview, reason):
+        """The web process crashed or was killed: reload into a fresh one instead of restarting the shell."""
+        view = self.view_for(webview)
+        now = time.monotonic()
+        self.web_process_crashes = [t for t in self.web_process_crashes if now - t < 60] + [now]
+        print(f"Web process terminated ({reason.value_nick}), reloading")
+        # Related views share the process, so each crash is reported once per view
+        delay = 0 if len(self.web_process_crashes) <= 3 * len(self.views) else 5000
+        GLib.timeout_add(delay, self.reload_view, view)
+
+    def restart_web_process(self):
+        """SIGUSR2: replace a wedged web process; on_web_process_terminated restores the pages."""
+        try:
+            self.webview.terminate_web_process()
+        except AttributeError:
+            print("terminate_web_process needs WebKitGTK 2.34 or newer")
+        return True
+
+    def view_for(self, webview):
+        for view in self.views:
+            if view.webview is webview:
+                return view
+        return self.primary_view
+
+    def run_js(self, script, view=None):
+        """Single exit point for Python -> JS calls (recorded in record mode).
+
+        Goes to the given view, else the one whose message is being handled, else the primary.
+        """
+        view = view or self.reply_view or self.primary_view
+        if self.recorder:
+            self.recorder.js(script)
+        view.webview.run_javascript(script)
+
+    def broadcast_js(self, script):
+        """Runs a call in every monitor's view."""
+        for view in self.views:
+            self.run_js(script, view)
+
+    def own_xids(self):
+        """XIDs of the shell's own toplevels (one per monitor) that are realized."""
+        xids = set()
+        for view in self.views:
+            gdk_window = view.window.get_window()
+            if gdk_window:
+                xids.add(gdk_window.get_xid())
+        return xids
+
+    def on_config_changed(self, previous):
+        """config.json was edited by hand: apply what can change live."""
+        print("config.json reloaded (most sections apply on the next start)")
+        if previous.get("wallpaper") != self.config.get("wallpaper"):
+            self.handle_get_saved_background(broadcast=True)
+            if self.config.get("wallpaper"):
+                self.get_wallpaper_gallery().optimize(self.config["wallpaper"], self.screen_size())
+
+    def on_dock_changed(self, previous):
+        """dock.json was edited by hand: every view gets the new list."""
+        self.dock_apps = None
+        self.broadcast_js(f"receiveDockData({json.dumps(self.get_dock_apps())})")
+
+    def on_load_changed(self, webview, event):
+        """A loaded page gets the live state; the first primary load lets startup stage three begin."""
+        if event != WebKit2.LoadEvent.FINISHED:
+            return
+        view = self.view_for(webview)
+        # The page starts empty: give it the current window list once
+        view.last_running = None
+        self.schedule_running_update()
+        self.push_performance_tier(view)
+        if self.status_state:
+            self.run_js(f"updateStatusIndicators({json.dumps(self.status_state)})", view)
+        if self.dock_usage and self.dock_usage.badges:
+            self.run_js(f"updateUsageBadges({json.dumps(self.dock_usage.badges)})", view)
+        frame_cfg = self.config.get("frame_monitor", {})
+        if frame_cfg.get("enabled", False):
+            self.run_js(f"startFrameMonitor({json.dumps({'reportInterval': frame_cfg.get('report_interval', 10)})})", view)
+        if view is not self.primary_view:
+            return
+        milestone("load-finished")
+        self.page_loaded = True
+        self.advance_startup()
+
+    def on_desktop_settled(self):
+        if self.autostart:
+            GLib.idle_add(self.autostart.notify_idle, priority=GLib.PRIORITY_LOW)
+        if self.prefetcher:
+            # Once now; the timeout below repeats it
+            GLib.idle_add(lambda: self.run_prefetch() and False, priority=GLib.PRIORITY_LOW)
+            interval = self.config.get("prefetch", {}).get("interval", 600)
+            GLib.timeout_add_seconds(interval, self.run_prefetch)
+        if self.file_index:
+            self.file_index.start()
+        return False
+
+    def run_prefetch(self):
+        """Periodic idle task: hint the page cache with the top apps' binaries and libraries."""
+        if not self.power_mode.throttled:
+            self.prefetcher.run_async()
+        return True
+
+    def sample_memory(self):
+        """Periodic memory sample; warnings for configured thresholds are logged by the accountant."""
+        if self.power_mode.tier != TIER_SUSPENDED:
+            self.memory.sample()
+        return True
+
+    def sample_dock_usage(self):
+        """Periodic: one pass over the /proc/PID/stat files of the apps in the dock."""
+        if self.power_mode.tier == TIER_SUSPENDED or self.windows is None:
+            return True
+        own_xids = self.own_xids()
+        launched = self.supervisor.pid_map()
+        apps = {}
+        for w in self.windows.windows():
+            if w.window_type == "normal" and w.pid and w.xid not in own_xids:
+                # Same key the page groups dock items by: the launched app id, else the window class
+                apps.setdefault(launched.get(w.pid) or w.class_name, set()).add(w.pid)
+        changed = self.dock_usage.sample(apps)
+        if changed:
+            self.broadcast_js(f"updateUsageBadges({json.dumps(changed)})")
+        return True
+
+    def poll_power_state(self):
+        self.power_mode.set_power(read_power_state())
+        return True
+
+    def on_status_event(self, fd, condition, source):
+        """A status source's descriptor woke the loop; the page hears about it only if its state changed."""
+        if source.drain():
+            self.status_dirty.add(source.name)
+            self.schedule_status_push()
+        return source.fileno() is not None  # closed sources drop their watch
+
+    def refresh_disk_status(self):
+        self.status_dirty.add("disk")
+        self.schedule_status_push()
+        return True
+
+    def schedule_status_push(self):
+        if self.status_push_id is None:
+            self.status_push_id = GLib.timeout_add(250, self.push_status)
+
+    def push_status(self):
+        """Reads the dirty sources once per burst and sends the indicators only what changed."""
+        self.status_push_id = None
+        if self.power_mode.tier == TIER_SUSPENDED:
+            return False  # stays dirty until unlocked
+        changed = {}
+        for source in self.status_sources:
+            if source.name not in self.status_dirty:
+                continue
+            state = self.status_icon(source.name, source.state())
+            if state != self.status_state.get(source.name):
+                self.status_state[source.name] = changed[source.name] = state
+        if "battery" in self.status_dirty:
+            self.poll_power_state()
+        self.status_dirty.clear()
+        if changed:
+            self.broadcast_js(f"updateStatusIndicators({json.dumps(changed)})")
+        return False
+
+    def status_icon(self, name, state):
+        """Adds the themed symbolic icon for an indicator's state."""
+        if state is None:
+            return None
+        if name == "battery":
+            percent = state["percent"] if state["percent"] is not None else 100
+            level = "full" if percent > 80 else "good" if percent > 40 else "low" if percent > 15 else "caution"
+            icon = f"battery-{level}-charging-symbolic" if state["charging"] else f"battery-{level}-symbolic"
+        elif name == "network":
+            icon = {"wifi": "network-wireless-symbolic", "wired": "network-wired-symbolic"}.get(
+                state["kind"], "network-offline-symbolic")
+            if state["kind"] != "offline" and not state["online"]:
+                icon = "network-no-route-symbolic"
+        elif name == "volume":
+            percent = state["percent"]
+            icon = ("audio-volume-muted-symbolic" if state["muted"] or percent == 0 else
+                    "audio-volume-low-symbolic" if percent < 34 else
+                    "audio-volume-medium-symbolic" if percent < 67 else "audio-volume-high-symbolic")
+        else:
+            icon = "drive-harddisk-symbolic"
+        return {**state, "icon": self.get_system_icon_path(icon)}
+
+    def watch_screensaver(self):
+        """Follows screen lock/blanking through the session bus screensaver interfaces."""
+        try:
+            bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        except GLib.Error as e:
+            print(f"Screensaver state unavailable: {e}")
+            return
+        for interface in ("org.freedesktop.ScreenSaver", "org.gnome.ScreenSaver",
+                          "org.mate.ScreenSaver", "org.cinnamon.ScreenSaver"):
+            bus.signal_subscribe(None, interface, "ActiveChanged", None, None,
+                                 Gio.DBusSignalFlags.NONE, self.on_screensaver_changed)
+
+    def on_screensaver_changed(self, connection, sender, path, interface, signal_name, parameters):
+        self.power_mode.set_locked(bool(parameters.unpack()[0]))
+
+    def on_power_tier_changed(self, tier, reason):
+        """Applies a new effects tier to the page and the shell's own timers."""
+        print(f"Power mode: {tier} ({reason})")
+        self.push_performance_tier()
+        if self.about_timer_id is not None:
+            GLib.source_remove(self.about_timer_id)
+            self.about_timer_id = GLib.timeout_add_seconds(self.power_mode.interval(2), self.push_about_dynamic_info)
+        if self.file_index:
+            self.file_index.pause(tier == TIER_SUSPENDED)
+        if tier != TIER_SUSPENDED and self.running_update_deferred:
+            self.running_update_deferred = False
+            self.schedule_running_update()
+        if tier != TIER_SUSPENDED and self.status_dirty:
+            self.schedule_status_push()
+
+    def push_performance_tier(self, view=None):
+        # Frame probes only run when the tier may adapt to them
+        probe = self.power_mode.forced is None and self.power_mode.tier != TIER_SUSPENDED
+        script = f"setPerformanceTier({json.dumps(self.power_mode.tier)}, {json.dumps(probe)})"
+        if view:
+            self.run_js(script, view)
+        else:
+            self.broadcast_js(script)
+
+    def dump_memory(self):
+        try:
+            self.memory.sample()
+            self.memory.dump(self.memory_dump_path)
+            print(f"Memory usage written to {self.memory_dump_path}")
+        except OSError as e:
+            print(f"Error writing memory usage: {e}")
+        return True
+
+    def on_destroy(self, *args):
+        """Remembers the apps that are still open, then quits."""
+        # Apps that exited in the last seconds are most likely going down with the X
+        # session: keep the session saved before them
+        if self.config.get("autostart", {}).get("restore_session", True) and not self.session_exits_pending:
+            self.save_session_now()
+        self.launch_stats.save()
+        self.latency.save()
+        self.frame_stats.save()
+        self.settings.flush()
+        if self.file_index:
+            self.file_index.stop()
+        for source in self.status_sources:
+            source.close()
+        if self.dock_usage:
+            self.dock_usage.close()
+        if self.recorder:
+            self.recorder.close()
+        Gtk.main_quit()
 
-        self.show_all()
-    def on_webview_button_press(self, widget, event):
-        # Block right-click in WebView
-        if event.button == 3:  # Right mouse button
-            print("Right-click blocked in WebView")
-            return True  # Block the event
-        
-        return False  # Allow other clicks
-    
     def on_context_menu(self, web_view, context_menu, event, hit_test_result):
-        # This prevents the context menu from showing
-        print("Context menu prevented")
-        return True  # Return True to prevent default context menu
+        # No native WebKit menu; right-clicks still reach the page, which draws its own menus
+        return True
 
 
     def get_system_icon_path(self, icon_name):
@@ -79,7 +736,7 @@ class OpenDesktop(Gtk.Window):
         # Define the default fallback icon name
         DEFAULT_ICON = "preferences-system" 
         
-        icon_theme = Gtk.IconTheme.get_default()
+        icon_theme = self.icon_theme
         
         # 1. Try to find the requested icon
         if icon_name:
@@ -95,47 +752,94 @@ class OpenDesktop(Gtk.Window):
         # 3. Ultimate safety: return empty string if even the fallback is missing
         return ""
 
+    def on_window_event(self, event, payload):
+        """Window backend listener: launch bookkeeping plus a coalesced dock refresh."""
+        if event == EVENT_OPENED:
+            self.on_window_opened(payload)
+        elif self.previews and event == EVENT_CHANGED:
+            self.previews.window_changed(payload.xid, payload.geometry[2:])
+        elif self.previews and event == EVENT_CLOSED:
+            self.previews.forget(payload)
+        self.schedule_running_update()
+
+    def schedule_running_update(self):
+        """Collapses bursts of window events into a single dock update."""
+        if self.power_mode.tier == TIER_SUSPENDED:
+            # Nobody can see the dock; send one update after unlocking instead
+            self.running_update_deferred = True
+            return
+        if self.running_update_id is None:
+            self.running_update_id = GLib.idle_add(self.update_running_apps)
+
     def update_running_apps(self):
-        """Scans the window list and sends details to the frontend, excluding itself."""
-        self.screen.force_update()
-        running_data = []
-        
-        # Get the XID of this window (the dock/environment itself)
-        own_xid = None
-        if self.get_window():
-            own_xid = self.get_window().get_xid()
+        """Sends each monitor's view the windows on that monitor, excluding the shell's own."""
+        self.running_update_id = None
+        running_data = self.collect_running()
+
+        # Inject each window list into its view, skipping views whose list did not change
+        for view, windows in zip(self.views, running_data):
+            payload = json.dumps(windows)
+            if payload != view.last_running:
+                view.last_running = payload
+                self.run_js(f"updateRunningIndicators({payload})", view)
+        return False
+
+    def collect_running(self):
+        """Window lists per view, in self.views order."""
+        running_data = [[] for _ in self.views]
+        rects = [view.rect() for view in self.views]
+        split = len(self.views) > 1 and None not in rects
 
-        for w in self.screen.get_windows():
+        # XIDs of the shell's windows (the dock/environment itself)
+        own_xids = self.own_xids()
+
+        # Windows whose process we launched can be matched to their dock entry directly
+        launched = self.supervisor.pid_map()
+
+        for w in self.windows.windows() if self.windows else []:
             # Filter for normal application windows AND ensure it's not THIS window
-            if w.get_window_type() == Wnck.WindowType.NORMAL:
-                window_xid = w.get_xid()
-                
-                if window_xid == own_xid:
-                    continue # Skip adding our own window to the dock list
+            if w.window_type == "normal":
+                if w.xid in own_xids:
+                    continue # Skip adding our own windows to the dock list
+
+                # First mapped window of a supervised child: records time-to-first-window
+                if w.pid in launched:
+                    self.supervisor.mark_window(w.pid)
                 
-                class_group = w.get_class_group_name().lower()
-                running_data.append({
-                    "class": class_group,
-                    "xid": window_xid,
-                    "name": w.get_name(),
-                    "icon": self.get_system_icon_path(class_group)
+                index = monitor_index(w.geometry, rects) if split else 0
+                running_data[index].append({
+                    "class": w.class_name,
+                    "xid": w.xid,
+                    "name": w.name,
+                    "icon": self.get_system_icon_path(w.class_name),
+                    "app": launched.get(w.pid),
+                    "focused": w.active
                 })
-        
-        # Inject the window list into the JS environment
-        js_call = f"updateRunningIndicators({json.dumps(running_data)})"
-        self.webview.run_javascript(js_call)
-        return True
-    def on_js_message(self, manager, result):
-        """Dispatches messages from the UI to Python handlers."""
+        return running_data
+    def on_js_message(self, manager, result, webview=None):
+        """Dispatches messages from the UI to Python handlers; replies go back to the sending view."""
+        previous_view, self.reply_view = self.reply_view, self.view_for(webview)
         try:
             message = result.get_js_value().to_string()
+            if self.recorder:
+                self.recorder.bridge(message)
             data = json.loads(message)
             action = data.get("action")
 
-            if action == "get_dock_apps":
+            if action == "milestone":
+                milestone(data.get("name", "unknown"))
+            elif action == "get_shell_state":
+                self.handle_get_shell_state()
+            elif action == "get_dock_apps":
                 self.handle_get_dock_apps()
+            elif action == "pin_app":
+                self.handle_pin_app(data.get("app_id"), data.get("index"))
+            elif action == "unpin_app":
+                self.handle_unpin_app(data.get("app_id"))
+            elif action == "move_dock_app":
+                self.handle_move_dock_app(data.get("app_id"), int(data.get("index", 0)))
             elif action == "launch_app":
-                self.handle_launch_app(data.get("command"), data.get("file_path_based", False))
+                self.handle_launch_app(data.get("command"), data.get("file_path_based", False), data.get("app_id"))
             elif action == "focus_app":
                 self.handle_focus_app_by_xid(data.get("xid"))
             elif action == "focus_app_by_command":
@@ -150,74 +854,387 @@ class OpenDesktop(Gtk.Window):
                 self.handle_power_command(data.get("command"))
             elif action == "open_bg_picker":
                 self.handle_open_bg_picker()
+            elif action == "list_wallpapers":
+                self.handle_list_wallpapers(data.get("folder"))
+            elif action == "get_wallpaper_thumbs":
+                self.get_wallpaper_gallery().request_thumbnails(data.get("paths", []))
+            elif action == "set_wallpaper":
+                self.handle_set_wallpaper(data.get("path"))
+            elif action == "wallpaper_gallery_close":
+                self.gallery_view = None
             elif action == "get_saved_background":
                 self.handle_get_saved_background()
+            elif action == "get_launch_latency":
+                self.run_js(f"receiveLaunchLatency({json.dumps(self.latency.summary())})")
+            elif action == "frame_stats":
+                self.frame_stats.merge(data.get("metrics", {}))
+                if data.get("metrics", {}).get("frame"):
+                    self.power_mode.report_frames(FrameStats.percentile(data["metrics"]["frame"], 95))
+            elif action == "frame_probe":
+                self.power_mode.report_frames(data.get("p95_ms"))
+            elif action == "get_window_previews":
+                self.handle_get_window_previews(data.get("xids", []))
+            elif action == "search":
+                self.handle_search(data.get("query", ""), data.get("seq"))
+            elif action == "open_path":
+                self.handle_open_path(data.get("path"))
+            elif action == "get_desktop_items":
+                self.handle_get_desktop_items()
+            elif action == "open_desktop_item":
+                self.handle_open_desktop_item(data.get("path"))
+            elif action == "get_memory_usage":
+                self.run_js(f"receiveMemoryUsage({json.dumps(self.memory.sample())})")
+            elif action == "about_panel_open":
+                self.handle_about_panel_open()
+            elif action == "about_panel_close":
+                self.handle_about_panel_close()
+            elif action == "open_task_manager":
+                self.handle_open_task_manager()
             elif action == "Runabout":
-                process = launch_script_pythonw_style("apps/aboutpc.py")
+                self.handle_open_about_app()
         except Exception as e:
             print(f"Bridge error: {e}")
+        finally:
+            self.reply_view = previous_view
+
+    def handle_get_shell_state(self):
+        """Everything a freshly (re)loaded page shows, from cached state, in one call."""
+        view = self.reply_view or self.primary_view
+        running = self.collect_running()[self.views.index(view)]
+        view.last_running = json.dumps(running)
+        if self.startup_stage == "ready":
+            dock, apps = self.get_dock_apps(), self.get_start_apps()
+        else:
+            dock, apps = self.cached_shell_lists()
+        state = {
+            "dock": dock,
+            "apps": apps,
+            "wallpaper": self.wallpaper_uri(),
+            "status": self.status_state,
+            "running": running,
+        }
+        self.run_js(f"restoreShellState({json.dumps(state)})")
+        if view.reload_started is not None:
+            print(f"View restored {(time.monotonic() - view.reload_started) * 1000:.0f} ms after reload")
+            view.reload_started = None
+
+    def cached_shell_lists(self):
+        """Before startup stage three: the last session's dock and start menu (apps None if unknown)."""
+        if self.dock_apps is None:
+            self.dock_apps = self.ui_cache.dock(self.settings.dock.data)
+            if self.dock_apps is not None:
+                self.dock_profiles = {app["id"]: app["profile"] for app in self.dock_apps if app.get("profile")}
+        if self.start_apps_stale and not self.start_apps:
+            self.start_apps = self.ui_cache.apps() or []
+        return self.get_dock_apps(), self.start_apps or None
 
     def handle_get_dock_apps(self):
-        """Loads pinned apps from dock.json."""
-        try:
-            dock_path = os.path.join(self.base_dir, "dock.json")
-            if not os.path.exists(dock_path):
-                self.webview.run_javascript("receiveDockData([])")
-                return
+        """Sends the pinned apps from the in-memory dock.json."""
+        self.run_js(f"receiveDockData({json.dumps(self.get_dock_apps())})")
 
-            with open(dock_path, "r") as f:
-                apps = json.load(f)
-            
-            for app in apps:
-                if app.get("FilePathBased"):
-                    app['icon_path'] = "file://" + os.path.join(self.base_dir, app['icon'])
-                else:
-                    app['icon_path'] = self.get_system_icon_path(app['icon'])
-            
-            self.webview.run_javascript(f"receiveDockData({json.dumps(apps)})")
-        except Exception as e:
-            print(f"Error in handle_get_dock_apps: {e}")
+    def get_dock_apps(self):
+        if self.dock_apps is None:
+            self.dock_apps = [self.resolve_dock_app(app) for app in self.settings.dock.data]
+            self.dock_profiles = {app["id"]: app["profile"] for app in self.dock_apps if app.get("profile")}
+        return self.dock_apps
+
+    def resolve_dock_app(self, app):
+        app = dict(app)
+        if app.get("FilePathBased"):
+            app['icon_path'] = "file://" + os.path.join(self.base_dir, app['icon'])
+        else:
+            app['icon_path'] = self.get_system_icon_path(app['icon'])
+        return app
+
+    def handle_pin_app(self, app_id, index=None):
+        """Pins a start menu app; every view gets the change as a delta."""
+        app = next((a for a in self.start_apps if a.get("id") == app_id), None)
+        if app is None:
+            return
+        entry = {"id": app_id, "name": app["name"], "icon": app["icon_name"], "exec": app["exec"],
+                 "FilePathBased": False}
+        dock_apps = self.get_dock_apps()
+        index = self.settings.pin(entry, index)
+        if index is not None:
+            resolved = self.resolve_dock_app(self.settings.dock.data[index])
+            dock_apps.insert(index, resolved)
+            self.broadcast_js(f"applyDockDelta({json.dumps({'op': 'pin', 'index': index, 'app': resolved})})")
 
-    def handle_launch_app(self, command, is_python_script):
+    def handle_unpin_app(self, app_id):
+        dock_apps = self.get_dock_apps()
+        index = self.settings.unpin(app_id)
+        if index is not None:
+            del dock_apps[index]
+            self.dock_profiles.pop(app_id, None)
+            self.broadcast_js(f"applyDockDelta({json.dumps({'op': 'unpin', 'id': app_id})})")
+
+    def handle_move_dock_app(self, app_id, index):
+        dock_apps = self.get_dock_apps()
+        current = self.settings.dock_index(app_id)
+        index = self.settings.move(app_id, index)
+        if index is not None and index != current:
+            dock_apps.insert(index, dock_apps.pop(current))
+            self.broadcast_js(f"applyDockDelta({json.dumps({'op': 'move', 'id': app_id, 'index': index})})")
+
+    def handle_launch_app(self, command, is_python_script, app_id=None):
         """Launches an application or script."""
         try:
+            app = app_id or command
+            profile = self.launch_profiles.resolve(app_id, command, self.dock_profiles.get(app_id))
+            self.launch_stats.record(app, command)
+
+            # Startup notification: the app's first window carries this id back
+            env = os.environ.copy()
+            startup_id = self.new_startup_id(command)
+            if startup_id:
+                env["DESKTOP_STARTUP_ID"] = startup_id
+
+            # A new session also gives the app its own scheduler autogroup,
+            # so a busy app cannot crowd out the shell even without a nice boost
             if is_python_script:
                 script_path = os.path.join(self.base_dir, command)
-                subprocess.Popen(["python3", script_path], cwd=self.base_dir)
+                process = self.supervisor.spawn(["python3", script_path], app=app, profile=profile,
+                                                cwd=self.base_dir, env=env, start_new_session=True)
             else:
-                subprocess.Popen(command.split(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self.webview.run_javascript("onLaunchResult(true, '')")
+                process = self.supervisor.spawn(command.split(), app=app, profile=profile, env=env,
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                                start_new_session=True)
+
+            self.launch_tracker.begin(app, startup_id, process.pid)
+            self.schedule_session_save()
+            self.supervisor.wheel.schedule(self.launch_tracker.timeout + 1, self.expire_launches)
+            self.broadcast_js(f"setAppLaunching({json.dumps(app)})")
+            self.run_js("onLaunchResult(true, '')")
         except Exception as e:
-            self.webview.run_javascript(f"onLaunchResult(false, '{str(e)}')")
+            self.run_js(f"onLaunchResult(false, '{str(e)}')")
+
+    def new_startup_id(self, command):
+        """Creates a startup-notification id (broadcasts the X "new:" message via GDK)."""
+        try:
+            context = Gdk.Display.get_default().get_app_launch_context()
+            context.set_timestamp(Gtk.get_current_event_time())
+            app_info = Gio.AppInfo.create_from_commandline(
+                command, None, Gio.AppInfoCreateFlags.SUPPORTS_STARTUP_NOTIFICATION)
+            startup_id = context.get_startup_notify_id(app_info, [])
+        except Exception as e:
+            print(f"Startup notification unavailable: {e}")
+            return None
+        if startup_id:
+            self.launch_contexts[startup_id] = context
+        return startup_id
+
+    def finish_launch(self, launch, failed):
+        """Ends the dock's launching state and the startup sequence for a launch."""
+        context = self.launch_contexts.pop(launch.startup_id, None)
+        if failed:
+            if context:
+                context.launch_failed(launch.startup_id)
+            self.broadcast_js(f"onAppLaunchFailed({json.dumps(launch.app)})")
+        if self.latency_save_id is None:
+            self.latency_save_id = GLib.timeout_add_seconds(10, self.save_latency)
+
+    def save_latency(self):
+        self.latency_save_id = None
+        self.latency.save()
+        return False
+
+    def on_window_opened(self, info):
+        """A new window completes a pending launch via _NET_STARTUP_ID or PID."""
+        result = self.launch_tracker.window_opened(info.startup_id, info.pid)
+        if result:
+            launch, latency_ms = result
+            self.finish_launch(launch, failed=False)
+            self.broadcast_js(f"onAppLaunched({json.dumps(launch.app)}, {latency_ms:.0f})")
+
+    def on_child_exit(self, record):
+        launch = self.launch_tracker.process_exited(record.pid)
+        if launch:
+            self.finish_launch(launch, failed=True)
+        if record.app:
+            self.session_exits_pending = True
+            self.schedule_session_save()
+
+    def schedule_session_save(self):
+        # A few seconds of delay: when the X session ends, apps exit just before the shell
+        # does, and the session saved last must still list them
+        if self.session_save_id is None and self.config.get("autostart", {}).get("restore_session", True):
+            self.session_save_id = GLib.timeout_add_seconds(5, self.save_session_now)
+
+    def save_session_now(self):
+        self.session_save_id = None
+        self.session_exits_pending = False
+        apps = session_apps(self.supervisor.running())
+        if apps != self.saved_session:
+            save_session(self.session_path, apps)
+            self.saved_session = apps
+        return False
+
+    def expire_launches(self):
+        for launch in self.launch_tracker.expire():
+            self.finish_launch(launch, failed=True)
+
+    def handle_get_window_previews(self, xids):
+        """Answers a dock hover from the preview cache; missing or stale thumbnails follow via push_window_preview."""
+        self.preview_view = self.reply_view
+        entries = self.previews.request(xids) if self.previews else {}
+        previews = [{"xid": xid, "src": entry.src if entry else None} for xid, entry in entries.items()]
+        self.run_js(f"receiveWindowPreviews({json.dumps(previews)})")
+
+    def push_window_preview(self, xid, src):
+        self.run_js(f"updateWindowPreview({xid}, {json.dumps(src)})", self.preview_view)
+        return False
+
+    def handle_get_desktop_items(self):
+        """Lists ~/Desktop on the primary monitor right away; thumbnails follow via flush_thumbnails."""
+        if not self.desktop_enabled or (self.reply_view and self.reply_view is not self.primary_view):
+            self.run_js("receiveDesktopItems([])")
+            return
+        if self.desktop_monitor is None:
+            self.watch_desktop()
+        self.push_desktop_items(self.primary_view)
+
+    def push_desktop_items(self, view=None):
+        items = []
+        wanted = []
+        self.desktop_mtimes = {}
+        for item in scan_desktop(self.desktop_path):
+            entry = item.to_dict()
+            if item.exec:
+                entry["icon"] = self.get_system_icon_path(item.icon_name)
+            else:
+                entry["icon"] = self.get_mime_icon_path("folder" if item.is_dir else item.mime)
+            entry["thumb"] = None
+            if not item.is_dir and not item.exec and self.thumbnails.can_thumbnail(item.mime):
+                known = self.desktop_thumbs.get(item.path)
+                if known and known[0] == item.mtime:
+                    entry["thumb"] = known[1]
+                else:
+                    wanted.append(item.path)
+                self.desktop_mtimes[item.path] = item.mtime
+            items.append(entry)
+        self.run_js(f"receiveDesktopItems({json.dumps(items)})", view or self.primary_view)
+        if wanted:
+            self.thumbnails.request(wanted)
+
+    def get_mime_icon_path(self, mime):
+        """Themed icon for a MIME type (image-png, then image-x-generic), cached per type."""
+        if mime not in self.mime_icons:
+            names = [mime.replace("/", "-"), mime.split("/")[0] + "-x-generic", "text-x-generic"]
+            icon_info = self.icon_theme.choose_icon(names, 48, 0)
+            filename = icon_info.get_filename() if icon_info else None
+            self.mime_icons[mime] = "file://" + filename if filename else ""
+        return self.mime_icons[mime]
+
+    def watch_desktop(self):
+        try:
+            self.desktop_monitor = Gio.File.new_for_path(self.desktop_path).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+            self.desktop_monitor.connect("changed", self.on_desktop_changed)
+        except GLib.Error as e:
+            print(f"Cannot watch {self.desktop_path}: {e}")
+
+    def on_desktop_changed(self, monitor, file, other_file, event_type):
+        """Copies and downloads fire many events; rescan once they settle."""
+        if self.desktop_rescan_id is not None:
+            GLib.source_remove(self.desktop_rescan_id)
+        self.desktop_rescan_id = GLib.timeout_add(250, self.rescan_desktop)
+
+    def rescan_desktop(self):
+        self.desktop_rescan_id = None
+        self.push_desktop_items(self.primary_view)
+        return False
+
+    def on_thumbnail_ready(self, path, thumb):
+        """Worker thread: queue the result; the main loop sends them in batches."""
+        with self.thumbnail_lock:
+            self.thumbnail_batch.append((path, thumb))
+            if self.thumbnail_flush_id is None:
+                self.thumbnail_flush_id = GLib.timeout_add(100, self.flush_thumbnails)
+
+    def flush_thumbnails(self):
+        with self.thumbnail_lock:
+            batch, self.thumbnail_batch = self.thumbnail_batch, []
+            self.thumbnail_flush_id = None
+        thumbs = []
+        gallery_thumbs = []
+        for path, thumb in batch:
+            src = file_uri(thumb) if thumb else None
+            if self.wallpaper_gallery and self.wallpaper_gallery.is_known(path):
+                gallery_thumbs.append({"path": path, "src": src})
+            mtime = self.desktop_mtimes.get(path)
+            if mtime is None:
+                continue  # removed from the desktop meanwhile
+            self.desktop_thumbs[path] = (mtime, src)
+            if src:
+                thumbs.append({"path": path, "src": src})
+        if thumbs:
+            self.run_js(f"receiveDesktopThumbnails({json.dumps(thumbs)})", self.primary_view)
+        if gallery_thumbs and self.gallery_view:
+            self.run_js(f"receiveWallpaperThumbnails({json.dumps(gallery_thumbs)})", self.gallery_view)
+        return False
+
+    def handle_open_desktop_item(self, path):
+        """Double-click on a desktop icon: trusted launchers run their Exec, everything else goes to xdg-open."""
+        if not path or os.path.dirname(path) != self.desktop_path or not os.path.exists(path):
+            return
+        launcher = read_launcher(path) if path.endswith(".desktop") and is_trusted_launcher(path) else None
+        if launcher:
+            self.handle_launch_app(launcher[2], False)
+        else:
+            self.supervisor.spawn(["xdg-open", path], profile=self.launch_profiles.get("default"))
 
     def handle_close_app(self, xid):
         """Closes a specific window using its XID."""
-        self.screen.force_update()
-        for window in self.screen.get_windows():
-            if window.get_xid() == xid:
-                window.close(Gdk.CURRENT_TIME)
-                break
+        if self.windows and self.windows.get(xid):
+            self.windows.close(xid, Gdk.CURRENT_TIME)
 
     def handle_focus_app_by_xid(self, xid):
         """Focuses/Pops up an existing window by its XID."""
-        self.screen.force_update()
-        for window in self.screen.get_windows():
-            if window.get_xid() == xid:
-                window.activate(Gdk.CURRENT_TIME)
-                break
+        if self.windows and self.windows.get(xid):
+            self.windows.activate(xid, Gdk.CURRENT_TIME)
 
     def handle_focus_app_by_command(self, command):
         """Focuses an existing window by matching class name."""
-        self.screen.force_update()
         target = command.lower()
-        for window in self.screen.get_windows():
-            if target in window.get_class_group_name().lower():
-                window.activate(Gdk.CURRENT_TIME)
+        for window in self.windows.windows() if self.windows else []:
+            if target in window.class_name:
+                self.windows.activate(window.xid, Gdk.CURRENT_TIME)
                 break
 
     def handle_get_start_apps(self):
+        self.run_js(f"receiveStartMenuApps({json.dumps(self.get_start_apps())})")
+
+    def get_start_apps(self):
+        """Start menu entries, rescanned only after an applications directory changed."""
+        if self.start_apps_stale:
+            self.start_apps = self.scan_start_apps()
+            self.start_apps_stale = False
+            if not self.app_dir_monitors:
+                self.watch_app_dirs()
+        return self.start_apps
+
+    def watch_app_dirs(self):
+        for adir in self.app_dirs:
+            if os.path.isdir(adir):
+                monitor = Gio.File.new_for_path(adir).monitor_directory(Gio.FileMonitorFlags.NONE, None)
+                monitor.connect("changed", self.on_app_dir_changed)
+                self.app_dir_monitors.append(monitor)
+
+    def on_app_dir_changed(self, *args):
+        """An app was installed or removed: rescan once the package manager is done."""
+        self.start_apps_stale = True
+        if self.start_apps_refresh_id is not None:
+            GLib.source_remove(self.start_apps_refresh_id)
+        self.start_apps_refresh_id = GLib.timeout_add_seconds(2, self.refresh_start_apps)
+
+    def refresh_start_apps(self):
+        self.start_apps_refresh_id = None
+        self.broadcast_js(f"receiveStartMenuApps({json.dumps(self.get_start_apps())})")
+        return False
+
+    def scan_start_apps(self):
         """Parses system .desktop files for the Start Menu."""
-        app_dirs = ["/usr/share/applications", os.path.expanduser("~/.local/share/applications")]
+        app_dirs = self.app_dirs
         apps_list = []
         seen_names = set()
 
@@ -236,16 +1253,58 @@ class OpenDesktop(Gtk.Window):
                             name = entry.get("Name", "Unknown")
                             if name not in seen_names:
                                 apps_list.append({
+                                    "id": file[:-len(".desktop")],
                                     "name": name,
                                     "exec": entry.get("Exec", "").split(" %")[0].replace('"', ''),
-                                    "icon": self.get_system_icon_path(entry.get("Icon", "system-run"))
+                                    "icon": self.get_system_icon_path(entry.get("Icon", "system-run")),
+                                    "icon_name": entry.get("Icon", "system-run")
                                 })
                                 seen_names.add(name)
                     except:
                         pass
         
         apps_list.sort(key=lambda x: x["name"].lower())
-        self.webview.run_javascript(f"receiveStartMenuApps({json.dumps(apps_list)})")
+        return apps_list
+
+    def handle_search(self, query, seq):
+        """Start menu search: apps and indexed files ranked together; seq lets the page drop stale answers."""
+        if not self.file_index:
+            self.show_search_results(query, seq, [])
+            return
+        # The FTS query runs on the index's search thread, not once per keystroke on the main loop
+        self.file_index.search_async(
+            query, lambda files: GLib.idle_add(self.show_search_results, query, seq, files))
+
+    def show_search_results(self, query, seq, files):
+        results = rank_results(query, self.start_apps, files)
+        for entry in results:
+            if entry["kind"] == "file":
+                entry["icon"] = self.get_mime_icon_path("folder" if entry["is_dir"] else guess_mime(entry["path"]))
+        self.run_js(f"receiveSearchResults({json.dumps(seq)}, {json.dumps(results)})")
+        return False
+
+    def handle_open_path(self, path):
+        """Opens a search result; only paths the index returned are accepted."""
+        if path and self.file_index and self.file_index.contains(path) and os.path.exists(path):
+            self.supervisor.spawn(["xdg-open", path], profile=self.launch_profiles.get("default"))
+
+    def handle_open_task_manager(self):
+        """Starts the bundled task manager, or raises the one already running."""
+        running = next((pid for pid, app in self.supervisor.pid_map().items() if app == "taskmanager"), None)
+        windows = self.windows.windows() if running and self.windows else []
+        window = next((w for w in windows if w.pid == running), None)
+        if window:
+            self.windows.activate(window.xid, Gdk.CURRENT_TIME)
+            return
+        self.supervisor.spawn(["python3", os.path.join(self.base_dir, "apps", "apps", "taskmanager.py")],
+                              app="taskmanager", profile=self.launch_profiles.resolve("taskmanager"),
+                              cwd=self.base_dir, start_new_session=True)
+
+    def handle_open_about_app(self):
+        """Classic standalone Qt properties window."""
+        self.supervisor.spawn(["python3", os.path.join(self.base_dir, "apps", "apps", "aboutpc.py")],
+                              app="aboutpc", profile=self.launch_profiles.resolve("aboutpc"),
+                              cwd=self.base_dir, start_new_session=True)
 
     def handle_get_power_icons(self):
         """Fetches system icons for power actions."""
@@ -254,52 +1313,114 @@ class OpenDesktop(Gtk.Window):
             "restart": self.get_system_icon_path("system-reboot"),
             "sleep": self.get_system_icon_path("system-suspend")
         }
-        self.webview.run_javascript(f"receivePowerIcons({json.dumps(icons)})")
+        self.run_js(f"receivePowerIcons({json.dumps(icons)})")
 
     def handle_power_command(self, cmd):
         """Executes systemctl power commands."""
-        if cmd == "shutdown": subprocess.Popen(["systemctl", "poweroff"])
-        elif cmd == "restart": subprocess.Popen(["systemctl", "reboot"])
-        elif cmd == "sleep": subprocess.Popen(["systemctl", "suspend"])
+        # The shell's own nice/ionice boost is not passed on to anything it starts
+        default = self.launch_profiles.get("default")
+        if cmd == "shutdown": self.supervisor.spawn(["systemctl", "poweroff"], profile=default)
+        elif cmd == "restart": self.supervisor.spawn(["systemctl", "reboot"], profile=default)
+        elif cmd == "sleep": self.supervisor.spawn(["systemctl", "suspend"], profile=default)
 
     def handle_open_bg_picker(self):
-        """Opens a GTK File Chooser for wallpaper selection."""
-        dialog = Gtk.FileChooserDialog(
-            title="Select Wallpaper", 
-            parent=self, 
-            action=Gtk.FileChooserAction.OPEN,
-            buttons=(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL, Gtk.STOCK_OPEN, Gtk.ResponseType.OK)
-        )
-        
-        filter_img = Gtk.FileFilter()
-        filter_img.set_name("Images")
-        filter_img.add_mime_type("image/png")
-        filter_img.add_mime_type("image/jpeg")
-        dialog.add_filter(filter_img)
-
-        if dialog.run() == Gtk.ResponseType.OK:
-            path = dialog.get_filename()
-            config_path = os.path.join(self.base_dir, "config.json")
-            with open(config_path, "w") as f:
-                json.dump({"wallpaper": path}, f)
-            self.webview.run_javascript(f"applyBackground('file://{path}')")
-        
-        dialog.destroy()
+        """Opens the wallpaper gallery in the asking view (the page's own panel, nothing modal)."""
+        self.run_js("openWallpaperGallery()")
+
+    def get_wallpaper_gallery(self):
+        if self.wallpaper_gallery is None:
+            self.wallpaper_gallery = WallpaperGallery(
+                self.thumbnails,
+                lambda folder, items: GLib.idle_add(self.push_wallpapers, folder, items),
+                lambda path, result: GLib.idle_add(self.apply_wallpaper, path, result),
+                folders=self.config.get("wallpapers", {}).get("folders"))
+        return self.wallpaper_gallery
+
+    def handle_list_wallpapers(self, folder):
+        """Sends the folder list at once; the images of the chosen folder follow from the gallery thread."""
+        gallery = self.get_wallpaper_gallery()
+        self.gallery_view = self.reply_view
+        folders = gallery.available_folders()
+        current = self.config.get("wallpaper")
+        if folder not in folders:
+            # Default: the folder of the current wallpaper, else the first configured one
+            folder = next((f for f in folders if current and current.startswith(f + os.sep)),
+                          folders[0] if folders else None)
+        self.run_js(f"receiveWallpaperFolders({json.dumps(folders)}, {json.dumps(folder)}, {json.dumps(current)})")
+        if folder:
+            gallery.list(folder)
+
+    def push_wallpapers(self, folder, items):
+        if self.gallery_view:
+            self.run_js(f"receiveWallpapers({json.dumps(folder)}, {json.dumps(items)})", self.gallery_view)
+        return False
+
+    def handle_set_wallpaper(self, path):
+        """Scaled to the screen on the gallery thread first; apply_wallpaper follows."""
+        gallery = self.get_wallpaper_gallery()
+        if not path or not gallery.is_known(path):
+            return
+        gallery.optimize(path, self.screen_size())
 
-    def handle_get_saved_background(self):
+    def apply_wallpaper(self, path, optimized):
+        """Main loop: remembers the original file, shows the screen-sized copy."""
+        self.settings.set("wallpaper", path)
+        self.broadcast_js(f"applyBackground({json.dumps(file_uri(optimized))})")
+        return False
+
+    def screen_size(self):
+        """Device pixels of the largest monitor, which every view's wallpaper has to cover."""
+        width = height = 0
+        for view in self.views:
+            if view.monitor is not None:
+                geometry = view.monitor.get_geometry()
+                scale = view.monitor.get_scale_factor()
+                width, height = max(width, geometry.width * scale), max(height, geometry.height * scale)
+        return (width, height) if width and height else (1920, 1080)
+
+    def wallpaper_uri(self):
+        """The configured wallpaper, through its screen-sized copy if one was made."""
+        path = self.config.get("wallpaper")
+        if not path or not os.path.exists(path):
+            return None
+        return file_uri(cached_wallpaper(path, self.screen_size()))
+
+    def handle_about_panel_open(self):
+        """Pushes system facts to the About panel and keeps them fresh while it is visible."""
+        if self.system_info is None:
+            self.system_info = SystemInfoCollector()
+        self.about_view = self.reply_view
+        self.run_js(f"receiveSystemInfo({json.dumps(self.system_info.static_info())})")
+        self.push_about_dynamic_info()
+        if self.about_timer_id is None:
+            self.about_timer_id = GLib.timeout_add_seconds(self.power_mode.interval(2), self.push_about_dynamic_info)
+
+    def handle_about_panel_close(self):
+        """Stops the About panel refresh timer."""
+        if self.about_timer_id is not None:
+            GLib.source_remove(self.about_timer_id)
+            self.about_timer_id = None
+        self.about_view = None
+
+    def push_about_dynamic_info(self):
+        """Timer callback: sends the frequently changing values (CPU, memory, uptime...)."""
+        try:
+            info = self.system_info.dynamic_info()
+            self.run_js(f"receiveSystemStats({json.dumps(info)})", self.about_view)
+        except Exception as e:
+            print(f"Error collecting system info: {e}")
+        return True
+
+    def handle_get_saved_background(self, broadcast=False):
         """Restores the wallpaper from config.json."""
-        config_path = os.path.join(self.base_dir, "config.json")
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, "r") as f:
-                    data = json.load(f)
-                    path = data.get("wallpaper")
-                    if path and os.path.exists(path):
-                        self.webview.run_javascript(f"receiveSavedBackground('file://{path}')")
-            except:
-                pass
+        uri = self.wallpaper_uri()
+        if uri:
+            script = f"receiveSavedBackground({json.dumps(uri)})"
+            if broadcast:
+                self.broadcast_js(script)
+            else:
+                self.run_js(script)
 
 if __name__ == "__main__":
-    GLib.idle_add(lambda: Wnck.Screen.get_default().force_update())
     OpenDesktop()
     Gtk.main()
\ No newline at end of file
@@ -10,6 +10,7 @@ import math
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 from PySide6.QtCore import Qt, QTimer, QRectF
 from PySide6.QtGui import QPixmap, QPainter, QColor, QPen
+from modules.milestones import milestone
 
 class WindowsSpinner(QWidget):
     def __init__(self, parent=None):
@@ -72,6 +73,10 @@ class StartupScreen(QWidget):
         # Launch explorer app after 8 seconds
         QTimer.singleShot(8000, self.launch_explorer)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        milestone("splash-paint")
+
     def launch_explorer(self):
         print("Launching desktop.py...")
         subprocess.Popen([sys.executable, "desktop.py"])
@@ -84,6 +89,7 @@ class StartupScreen(QWidget):
         sys.exit()
 
 if __name__ == "__main__":
+    milestone("splash-start")
     app = QApplication(sys.argv)
     splash = StartupScreen()
     sys.exit(app.exec())
\ No newline at end of file
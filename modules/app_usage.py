@@ -0,0 +1,124 @@
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Set
+
+from modules.proc_scan import ProcessScanner
+
+
+def _parent_of(proc_root: str, pid: int) -> Optional[int]:
+    try:
+        with open(os.path.join(proc_root, str(pid), "stat"), "rb") as f:
+            data = f.read()
+        return int(data[data.rindex(b")") + 2:].split(b" ", 2)[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def crossed(value: float, thresholds: List[float], previous: int, hysteresis: float) -> int:
+    """How many thresholds value has crossed; dropping a level needs hysteresis * its threshold, so it does not flicker"""
+    level = bisect_right(thresholds, value)
+    if level < previous and value >= thresholds[previous - 1] * hysteresis:
+        return previous
+    return level
+
+
+class AppUsage:
+    """
+    CPU and RSS per app, summed over the process trees of its windows'
+    PIDs, for the dock badges.
+
+    Only the relevant processes are sampled: the window PIDs and their
+    descendants. The parent of every other process is read once, when a
+    /proc listing first shows it, which is how new children join a tree.
+    Badges describe threshold levels, not raw numbers, so sample() reports
+    an app only when one of its levels changes.
+    """
+
+    def __init__(self, cpu_thresholds: Iterable[float] = (25, 50, 100, 200),
+                 memory_thresholds_mb: Iterable[float] = (1024, 2048, 4096),
+                 alert_cpu: float = 100, alert_memory_mb: float = 4096,
+                 hysteresis: float = 0.8, proc_root: str = "/proc"):
+        self.cpu_thresholds = sorted(cpu_thresholds)
+        self.memory_thresholds = sorted(memory_thresholds_mb)
+        self.alert_cpu = alert_cpu
+        self.alert_memory_mb = alert_memory_mb
+        self.hysteresis = hysteresis
+        self.proc_root = proc_root
+        # No kept descriptors: a few window trees do not need them, and the shell's
+        # file limit (inherited by everything it launches) stays as it is
+        self.scanner = ProcessScanner(proc_root, keep_open=False)
+        self.parents: Dict[int, int] = {}  # pid -> ppid, for every process seen
+        self.levels: Dict[str, tuple] = {}
+        self.badges: Dict[str, dict] = {}  # app -> badge currently shown
+
+    def _update_parents(self):
+        try:
+            listed = {int(name) for name in os.listdir(self.proc_root) if name.isdigit()}
+        except OSError:
+            return
+        for pid in [pid for pid in self.parents if pid not in listed]:
+            del self.parents[pid]
+        for pid in listed:
+            if pid not in self.parents:
+                parent = _parent_of(self.proc_root, pid)
+                if parent is not None:
+                    self.parents[pid] = parent
+
+    def trees(self, roots: Set[int]) -> Dict[int, Set[int]]:
+        """root pid -> the pids of its tree"""
+        children: Dict[int, List[int]] = {}
+        for pid, parent in self.parents.items():
+            children.setdefault(parent, []).append(pid)
+        result = {}
+        for root in roots:
+            tree, stack = set(), [root]
+            while stack:
+                pid = stack.pop()
+                if pid not in tree:
+                    tree.add(pid)
+                    stack.extend(children.get(pid, ()))
+            result[root] = tree
+        return result
+
+    def sample(self, apps: Dict[str, Set[int]]) -> Dict[str, Optional[dict]]:
+        """apps: app -> window PIDs. Returns the badges that changed (None: hide it)."""
+        self._update_parents()
+        trees = self.trees(set().union(*apps.values()) if apps else set())
+        self.scanner.refresh(set().union(*trees.values()) if trees else set())
+        scanner = self.scanner
+
+        changed = {}
+        for app, roots in apps.items():
+            pids = set().union(*(trees[root] for root in roots))
+            slots = [scanner.slot_of(pid) for pid in pids]
+            slots = [slot for slot in slots if slot is not None]
+            cpu = sum(scanner.cpu[slot] for slot in slots)
+            memory_mb = sum(scanner.rss_kb[slot] for slot in slots) / 1024
+            previous = self.levels.get(app, (0, 0))
+            levels = (crossed(cpu, self.cpu_thresholds, previous[0], self.hysteresis),
+                      crossed(memory_mb, self.memory_thresholds, previous[1], self.hysteresis))
+            if levels == previous:
+                continue
+            self.levels[app] = levels
+            if levels == (0, 0):
+                badge = None
+            else:
+                badge = {"cpu": self.cpu_thresholds[levels[0] - 1] if levels[0] else 0,
+                         "memory_mb": self.memory_thresholds[levels[1] - 1] if levels[1] else 0,
+                         "processes": len(slots)}
+                badge["alert"] = badge["cpu"] >= self.alert_cpu or badge["memory_mb"] >= self.alert_memory_mb
+            changed[app] = badge
+            if badge:
+                self.badges[app] = badge
+            else:
+                self.badges.pop(app, None)
+
+        # Apps whose windows are all gone
+        for app in [app for app in self.levels if app not in apps]:
+            del self.levels[app]
+            if self.badges.pop(app, None) is not None:
+                changed[app] = None
+        return changed
+
+    def close(self):
+        self.scanner.close()
@@ -0,0 +1,310 @@
+import configparser
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+TIER_ESSENTIAL = "essential"
+TIER_NORMAL = "normal"
+TIER_HEAVY = "heavy"
+TIERS = (TIER_ESSENTIAL, TIER_NORMAL, TIER_HEAVY)
+
+# GNOME session phases that must be up before the user can work
+_ESSENTIAL_PHASES = {"EarlyInitialization", "PreDisplayServer", "Initialization", "WindowManager", "Panel", "Desktop"}
+
+
+@dataclass
+class AutostartEntry:
+    """One app to start at login"""
+    app: str
+    name: str
+    cmd: List[str]
+    tier: str = TIER_NORMAL
+    source: str = "xdg"
+    profile: Optional[str] = None
+    delay: float = 0.0
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class LaunchTiming:
+    """Per-app startup measurements"""
+    app: str
+    tier: str
+    pid: Optional[int] = None
+    queued_at: float = field(default_factory=time.monotonic)
+    launched_at: Optional[float] = None
+    first_window_ms: Optional[float] = None
+    exit_status: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "app": self.app,
+            "tier": self.tier,
+            "pid": self.pid,
+            "queue_wait_ms": round((self.launched_at - self.queued_at) * 1000, 1) if self.launched_at else None,
+            "first_window_ms": self.first_window_ms,
+            "exit_status": self.exit_status,
+        }
+
+
+def strip_field_codes(exec_line: str) -> List[str]:
+    """Split a desktop-entry Exec line and drop %f/%U/... field codes"""
+    try:
+        args = shlex.split(exec_line)
+    except ValueError:
+        args = exec_line.split()
+    result = []
+    for arg in args:
+        if len(arg) == 2 and arg[0] == "%":
+            continue
+        result.append(arg.replace("%%", "%"))
+    return result
+
+
+def autostart_dirs() -> List[str]:
+    """XDG autostart directories, most important first"""
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    config_dirs = os.environ.get("XDG_CONFIG_DIRS") or "/etc/xdg"
+    dirs = [os.path.join(config_home, "autostart")]
+    dirs += [os.path.join(d, "autostart") for d in config_dirs.split(":") if d]
+    return dirs
+
+
+def _shown_in(entry, desktop_names: List[str]) -> bool:
+    only = [x for x in entry.get("OnlyShowIn", "").split(";") if x]
+    if only and not any(name in only for name in desktop_names):
+        return False
+    hidden_in = [x for x in entry.get("NotShowIn", "").split(";") if x]
+    return not any(name in hidden_in for name in desktop_names)
+
+
+def read_xdg_autostart(desktop_names: Optional[List[str]] = None) -> List[AutostartEntry]:
+    """
+    Parse XDG autostart entries. A file in the user's directory shadows a
+    system file of the same name, including to disable it (Hidden=true).
+    """
+    # Only our own name: inheriting XDG_CURRENT_DESKTOP from a parent session
+    # would start that desktop's daemons a second time
+    if desktop_names is None:
+        desktop_names = ["OpenDesktop"]
+
+    seen = set()
+    entries = []
+    for adir in autostart_dirs():
+        if not os.path.isdir(adir):
+            continue
+        for file in sorted(os.listdir(adir)):
+            if not file.endswith(".desktop") or file in seen:
+                continue
+            seen.add(file)
+            config = configparser.ConfigParser(interpolation=None)
+            try:
+                config.read(os.path.join(adir, file))
+            except configparser.Error:
+                continue
+            if "Desktop Entry" not in config:
+                continue
+            entry = config["Desktop Entry"]
+            if entry.get("Hidden", "false").lower() == "true":
+                continue
+            if entry.get("X-GNOME-Autostart-enabled", "true").lower() == "false":
+                continue
+            if entry.get("Type", "Application") != "Application" or not _shown_in(entry, desktop_names):
+                continue
+            try_exec = entry.get("TryExec")
+            if try_exec and not shutil.which(try_exec):
+                continue
+            cmd = strip_field_codes(entry.get("Exec", ""))
+            if not cmd:
+                continue
+
+            tier = entry.get("X-OpenDesktop-Autostart-Tier")
+            if tier not in TIERS:
+                tier = TIER_ESSENTIAL if entry.get("X-GNOME-Autostart-Phase") in _ESSENTIAL_PHASES else TIER_NORMAL
+            try:
+                delay = float(entry.get("X-GNOME-Autostart-Delay", 0))
+            except ValueError:
+                delay = 0.0
+
+            entries.append(AutostartEntry(
+                app=file[:-len(".desktop")],
+                name=entry.get("Name", file),
+                cmd=cmd,
+                tier=tier,
+                source="xdg",
+                delay=delay,
+            ))
+    return entries
+
+
+def read_session(path: str) -> List[AutostartEntry]:
+    """Apps that were open when the previous session ended"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading saved session: {e}")
+        return []
+    entries = []
+    for item in data.get("apps", []):
+        cmd = item.get("cmd")
+        if not cmd:
+            continue
+        entries.append(AutostartEntry(
+            app=item.get("app") or os.path.basename(cmd[0]),
+            name=item.get("name") or item.get("app") or cmd[0],
+            cmd=list(cmd),
+            tier=item.get("tier") if item.get("tier") in TIERS else TIER_NORMAL,
+            source="session",
+            profile=item.get("profile"),
+        ))
+    return entries
+
+
+# The shell's own tools (apps/apps/): opened on demand, never restored at login
+SHELL_APPS = {"taskmanager", "aboutpc"}
+
+
+def session_apps(records) -> List[dict]:
+    """The apps launched from the shell that are still running, one entry per app"""
+    apps = []
+    seen = set()
+    for record in records:
+        if not record.app or record.app in seen or record.app in SHELL_APPS:
+            continue
+        seen.add(record.app)
+        apps.append({"app": record.app, "cmd": record.cmd})
+    return apps
+
+
+def save_session(path: str, apps: List[dict]) -> None:
+    """Write session_apps() output (atomic replace)"""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"saved_at": time.time(), "apps": apps}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving session: {e}")
+
+
+class AutostartEngine:
+    """
+    Starts login apps in priority tiers with a concurrency cap.
+
+    Essential entries start right away, normal ones follow as slots free up,
+    and heavy ones wait until notify_idle() says the desktop has settled. A
+    slot is released when the app maps its first window, exits, or after
+    slot_timeout seconds, so one slow app cannot hold up the queue.
+    """
+
+    def __init__(self, supervisor, profiles=None, max_parallel: int = 3, slot_timeout: float = 8.0):
+        self.supervisor = supervisor
+        self.profiles = profiles
+        self.max_parallel = max(1, max_parallel)
+        self.slot_timeout = slot_timeout
+        self.queues: Dict[str, List[AutostartEntry]] = {tier: [] for tier in TIERS}
+        self.in_flight: Dict[int, LaunchTiming] = {}
+        self.timings: List[LaunchTiming] = []
+        self.idle = False
+        self.supervisor.exit_callbacks.append(self._on_child_exit)
+        self.supervisor.window_callbacks.append(self._on_first_window)
+
+    def add(self, entries: List[AutostartEntry]):
+        # The same app listed in autostart and the saved session starts once
+        queued = {e.app for queue in self.queues.values() for e in queue}
+        queued.update(t.app for t in self.timings)
+        for entry in entries:
+            if entry.app in queued:
+                continue
+            queued.add(entry.app)
+            tier = entry.tier
+            if tier == TIER_NORMAL and self.profiles is not None:
+                if self.profiles.resolve(entry.app, entry.cmd[0], entry.profile).name == "heavy":
+                    tier = TIER_HEAVY
+            self.queues[tier].append(entry)
+
+    def start(self):
+        self._pump()
+
+    def notify_idle(self):
+        """The desktop is up and quiet: deferred (heavy) apps may start"""
+        self.idle = True
+        self._pump()
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def _next_entry(self) -> Optional[AutostartEntry]:
+        if self.queues[TIER_ESSENTIAL]:
+            return self.queues[TIER_ESSENTIAL].pop(0)
+        # Normal apps wait until every essential one has at least mapped a window
+        if any(t.tier == TIER_ESSENTIAL for t in self.in_flight.values()):
+            return None
+        if self.queues[TIER_NORMAL]:
+            return self.queues[TIER_NORMAL].pop(0)
+        if self.idle and self.queues[TIER_HEAVY]:
+            return self.queues[TIER_HEAVY].pop(0)
+        return None
+
+    def _pump(self):
+        # Essential apps ignore the cap: the session is not usable without them
+        while self.queues[TIER_ESSENTIAL] or len(self.in_flight) < self.max_parallel:
+            entry = self._next_entry()
+            if entry is None:
+                break
+            if entry.delay:
+                delay, entry.delay = entry.delay, 0.0
+                self.supervisor.wheel.schedule(delay, self._launch_delayed, entry)
+                continue
+            self._launch(entry)
+
+    def _launch_delayed(self, entry: AutostartEntry):
+        self._launch(entry)
+        self._pump()
+
+    def _launch(self, entry: AutostartEntry):
+        timing = LaunchTiming(app=entry.app, tier=entry.tier, queued_at=entry.queued_at)
+        self.timings.append(timing)
+        profile = self.profiles.resolve(entry.app, entry.cmd[0], entry.profile) if self.profiles else None
+        try:
+            process = self.supervisor.spawn(entry.cmd, app=entry.app, profile=profile,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                            start_new_session=True)
+        except OSError as e:
+            print(f"✗ Autostart failed for {entry.name}: {e}")
+            timing.exit_status = -1
+            return
+        timing.pid = process.pid
+        timing.launched_at = time.monotonic()
+        self.in_flight[process.pid] = timing
+        self.supervisor.wheel.schedule(self.slot_timeout, self._release, process.pid)
+
+    def _release(self, pid: int):
+        if self.in_flight.pop(pid, None) is not None:
+            self._pump()
+
+    def _on_first_window(self, record):
+        timing = self.in_flight.get(record.pid)
+        if timing is None:
+            timing = next((t for t in self.timings if t.pid == record.pid), None)
+        if timing is not None and timing.first_window_ms is None and timing.launched_at:
+            timing.first_window_ms = round((record.first_window_monotonic - timing.launched_at) * 1000, 1)
+            print(f"Autostart: {timing.app} showed a window after {timing.first_window_ms} ms")
+        self._release(record.pid)
+
+    def _on_child_exit(self, record):
+        timing = self.in_flight.get(record.pid)
+        if timing is not None:
+            timing.exit_status = record.exit_status
+        self._release(record.pid)
+
+    def report(self) -> List[dict]:
+        return [t.to_dict() for t in self.timings]
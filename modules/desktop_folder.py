@@ -0,0 +1,92 @@
+import configparser
+import os
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+from modules.thumbnails import file_uri, guess_mime
+
+
+@dataclass
+class DesktopItem:
+    name: str
+    path: str
+    uri: str
+    mime: str
+    is_dir: bool = False
+    mtime: int = 0
+    icon_name: Optional[str] = None   # from a .desktop launcher
+    exec: Optional[str] = None        # from a .desktop launcher
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def desktop_dir() -> str:
+    """XDG_DESKTOP_DIR from ~/.config/user-dirs.dirs, ~/Desktop otherwise"""
+    config = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    try:
+        with open(os.path.join(config, "user-dirs.dirs"), "r") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("XDG_DESKTOP_DIR="):
+                    value = line.split("=", 1)[1].strip().strip('"')
+                    return os.path.expandvars(value.replace("$HOME", os.path.expanduser("~")))
+    except OSError:
+        pass
+    return os.path.expanduser("~/Desktop")
+
+
+def read_launcher(path: str):
+    """(name, icon, exec) of a .desktop file, or None if it is not a usable launcher"""
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(path)
+        entry = parser["Desktop Entry"]
+    except (configparser.Error, KeyError):
+        return None
+    if entry.get("Type", "Application") != "Application" or not entry.get("Exec"):
+        return None
+    return entry.get("Name"), entry.get("Icon"), entry.get("Exec").split(" %")[0].replace('"', "")
+
+
+def is_trusted_launcher(path: str) -> bool:
+    """
+    A .desktop file the user marked executable, and owns. As in file
+    managers, anything else (a fresh download) is a plain file: its Name
+    and Icon are not shown and its Exec never runs.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and os.access(path, os.X_OK)
+
+
+def scan_desktop(directory: str) -> List[DesktopItem]:
+    """One directory read: folders first, then files, by name; hidden files skipped"""
+    items = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return items
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        try:
+            is_dir = entry.is_dir()
+            mtime = int(entry.stat().st_mtime)
+        except OSError:
+            continue
+        item = DesktopItem(name=entry.name, path=entry.path, uri=file_uri(entry.path),
+                           mime="inode/directory" if is_dir else guess_mime(entry.path),
+                           is_dir=is_dir, mtime=mtime)
+        if not is_dir and entry.name.endswith(".desktop") and is_trusted_launcher(entry.path):
+            launcher = read_launcher(entry.path)
+            if launcher:
+                name, icon, command = launcher
+                item.name = name or entry.name[:-len(".desktop")]
+                item.icon_name, item.exec = icon, command
+                item.mime = "application/x-desktop"
+        items.append(item)
+    items.sort(key=lambda i: (not i.is_dir, i.name.casefold()))
+    return items
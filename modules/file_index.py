@@ -0,0 +1,478 @@
+import ctypes
+import fnmatch
+import os
+import re
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from modules.launch_profiles import set_io_priority
+
+DEFAULT_EXCLUDES = [".*", "node_modules", "__pycache__", "*.pyc", "*.o", "*~", "*.tmp"]
+
+# inotify(7)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_DONT_FOLLOW)
+EVENT_HEADER = struct.Struct("iIII")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    words TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    listed_mtime INTEGER            -- directories: mtime when their entries were last read
+);
+CREATE INDEX IF NOT EXISTS files_parent ON files(parent);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    name, words, content='files', content_rowid='id', prefix='2 3 4 6',
+    tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts(rowid, name, words) VALUES (new.id, new.name, new.words);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, name, words) VALUES ('delete', old.id, old.name, old.words);
+END;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def default_db_path() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "opendesktop", "file_index.db")
+
+
+def split_words(name: str) -> str:
+    """Extra tokens for camelCase and letter/digit runs ("MyReport2024" -> "My Report 2024")"""
+    stem = re.sub(r"([a-z])([A-Z])", r"\1 \2", name)
+    stem = re.sub(r"([A-Za-z])([0-9])|([0-9])([A-Za-z])", lambda m: " ".join(filter(None, m.groups())), stem)
+    return stem if stem != name else ""
+
+
+def fts_query(text: str) -> str:
+    """Every term must match the start of a word: "ann rep" -> "ann"* "rep"*"""
+    terms = [t for t in re.split(r"[^\w]+", text.casefold()) if t]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def match_score(query: str, name: str) -> float:
+    """How well a name matches what was typed; shared by apps and files so they rank together"""
+    query = query.strip().casefold()
+    name = name.casefold()
+    if not query:
+        return 0.0
+    if name == query:
+        return 100.0
+    if name.startswith(query):
+        return 80.0 + 10.0 * len(query) / len(name)
+    words = re.split(r"[^\w]+", name)
+    if any(word.startswith(query) for word in words):
+        return 60.0
+    if query in name:
+        return 45.0
+    # Multi-term queries matched word by word by FTS
+    return 30.0
+
+
+@dataclass
+class FileHit:
+    path: str
+    name: str
+    is_dir: bool
+    mtime: int
+    depth: int
+
+    def score(self, query: str, now: float) -> float:
+        score = match_score(query, self.name)
+        score -= min(10, 2 * self.depth)          # deep paths are less likely what was meant
+        age_days = max(0.0, (now - self.mtime) / 86400)
+        score += 10.0 / (1.0 + age_days / 7)       # recently touched files first
+        if self.is_dir:
+            score += 3
+        return score
+
+
+def rank_results(query: str, apps: List[dict], files: List[FileHit], limit: int = 30) -> List[dict]:
+    """Apps and files in one list, best first. Apps get a bonus: launching is the common case."""
+    now = time.time()
+    scored = []
+    for app in apps:
+        score = match_score(query, app.get("name", ""))
+        if score > 30:
+            scored.append((score + 15, {"kind": "app", **app}))
+    for hit in files:
+        scored.append((hit.score(query, now), {"kind": "file", "name": hit.name, "path": hit.path,
+                                               "parent": os.path.dirname(hit.path), "is_dir": hit.is_dir}))
+    scored.sort(key=lambda pair: -pair[0])
+    return [entry for _, entry in scored[:limit]]
+
+
+class Inotify:
+    """Minimal inotify binding: one watch per directory, events decoded to (path, name, mask)"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: Dict[int, str] = {}
+        self.wds: Dict[str, int] = {}
+
+    def add(self, path: str) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.paths[wd] = path
+        self.wds[path] = wd
+        return True
+
+    def remove_tree(self, path: str):
+        prefix = path + os.sep
+        for watched in [p for p in self.wds if p == path or p.startswith(prefix)]:
+            wd = self.wds.pop(watched)
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_IGNORED:
+                path = self.paths.pop(wd, None)
+                if path is not None and self.wds.get(path) == wd:
+                    del self.wds[path]
+                continue
+            events.append((self.paths.get(wd), name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileIndex:
+    """
+    Names of files and folders under the configured roots, in an SQLite FTS5
+    table, for the start menu search.
+
+    A background thread at idle I/O priority and lowest CPU priority keeps it
+    current: a crawl that only re-reads directories whose mtime changed since
+    the last one, then inotify events, with a full (incremental) rescan every
+    rescan_hours for whatever inotify could not watch (max_watches) or missed
+    (queue overflow). The crawl is capped at max_files entries and
+    files_per_second. search() runs on the caller's thread on its own
+    connection; search_async() runs it on a second background thread, so
+    the shell's main loop never waits on SQLite. WAL lets both read while
+    the crawler writes.
+    """
+
+    def __init__(self, db_path: str, roots: List[str], excludes: Optional[List[str]] = None,
+                 max_files: int = 500000, max_watches: int = 8192, files_per_second: int = 5000,
+                 rescan_hours: float = 12):
+        self.db_path = db_path
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+        self.name_excludes = [g for g in excludes if "/" not in g]
+        self.path_excludes = [os.path.expanduser(g) for g in excludes if "/" in g]
+        self.max_files = max_files
+        self.max_watches = max_watches
+        self.files_per_second = files_per_second
+        self.rescan_seconds = rescan_hours * 3600
+        self.count = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._db = None
+        self._reader = None
+        self._searcher = None
+        self._search_cond = threading.Condition()
+        self._search_next = None
+        self._inotify = None
+        self._budget_start = 0.0
+        self._budget_used = 0
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # --- queries (any thread, one connection per thread that asks) ---
+
+    def search(self, query: str, limit: int = 200) -> List[FileHit]:
+        """
+        Candidates for rank_results, unordered. bm25 ordering would score every
+        match (~100 ms for a two-letter prefix over 300k names), so two queries
+        that stop after `limit` rows in rowid order are used instead: names
+        starting with the query, then any word starting with each term.
+        """
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._search(self._reader, query, limit)
+
+    def search_async(self, query: str, on_results: Callable[[List[FileHit]], None], limit: int = 200):
+        """
+        search() on the search thread; on_results(hits) is called from that
+        thread. A query still waiting when a newer one arrives is dropped.
+        """
+        with self._search_cond:
+            self._search_next = (query, on_results, limit)
+            self._search_cond.notify()
+        if self._searcher is None:
+            self._searcher = threading.Thread(target=self._run_searches, name="file-search", daemon=True)
+            self._searcher.start()
+
+    def _run_searches(self):
+        db = self._connect()
+        while True:
+            with self._search_cond:
+                while self._search_next is None:
+                    self._search_cond.wait()
+                query, on_results, limit = self._search_next
+                self._search_next = None
+            try:
+                on_results(self._search(db, query, limit))
+            except Exception as e:
+                print(f"File search failed: {e}")
+
+    def _search(self, db: sqlite3.Connection, query: str, limit: int) -> List[FileHit]:
+        match = fts_query(query)
+        if not match:
+            return []
+        hits: Dict[str, FileHit] = {}
+        for expression in ("name : ^ " + match, match):
+            try:
+                rows = db.execute(
+                    "SELECT f.path, f.name, f.is_dir, f.mtime, f.depth FROM files_fts "
+                    "JOIN files f ON f.id = files_fts.rowid WHERE files_fts MATCH ? "
+                    "ORDER BY files_fts.rowid DESC LIMIT ?", (expression, limit)).fetchall()
+            except sqlite3.Error as e:
+                print(f"File search failed: {e}")
+                return []
+            for path, name, is_dir, mtime, depth in rows:
+                hits.setdefault(path, FileHit(path, name, bool(is_dir), mtime, depth))
+        return list(hits.values())
+
+    def contains(self, path: str) -> bool:
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone() is not None
+
+    # --- crawler thread ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._resume.set()
+
+    def pause(self, paused: bool):
+        """Paused while the screen is locked; inotify keeps queueing (or overflows into a rescan)."""
+        if paused:
+            self._resume.clear()
+        else:
+            self._resume.set()
+
+    def excluded(self, name: str, path: str) -> bool:
+        return (any(fnmatch.fnmatch(name, g) for g in self.name_excludes)
+                or any(fnmatch.fnmatch(path, g) for g in self.path_excludes))
+
+    def _run(self):
+        set_io_priority(0, "idle")
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        self._db = self._connect()
+        self.count = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            print(f"File index: no inotify ({e}), relying on periodic rescans")
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                for root in self.roots:
+                    self.crawl(root)
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('crawled_at', ?)", (str(int(time.time())),))
+                self._db.commit()
+                self._watch_until(started + self.rescan_seconds)
+        except Exception as e:
+            print(f"File index stopped: {e}")
+        finally:
+            self._db.close()
+            if self._inotify:
+                self._inotify.close()
+
+    def _throttle(self, entries: int):
+        """Keeps the crawl under files_per_second, and holds it while paused."""
+        self._resume.wait()
+        now = time.monotonic()
+        if now - self._budget_start >= 1.0:
+            self._budget_start, self._budget_used = now, 0
+        self._budget_used += entries
+        if self.files_per_second and self._budget_used >= self.files_per_second:
+            self._db.commit()
+            time.sleep(max(0.0, 1.0 - (now - self._budget_start)))
+
+    def crawl(self, top: str):
+        """Indexes top and everything below it that changed since it was last read."""
+        root = next((r for r in self.roots if top == r or top.startswith(r + os.sep)), top)
+        stack = [top]
+        while stack and not self._stop.is_set():
+            directory = stack.pop()
+            if self._inotify and len(self._inotify.wds) < self.max_watches and directory not in self._inotify.wds:
+                self._inotify.add(directory)
+            try:
+                current = int(os.stat(directory).st_mtime)
+            except OSError:
+                continue
+            known = {name: (is_dir, mtime, listed) for name, is_dir, mtime, listed in self._db.execute(
+                "SELECT name, is_dir, mtime, listed_mtime FROM files WHERE parent = ?", (directory,))}
+            if directory != root:
+                row = self._db.execute("SELECT listed_mtime FROM files WHERE path = ?", (directory,)).fetchone()
+                if row and row[0] == current:
+                    # Nothing was added or removed here; only descend
+                    stack.extend(os.path.join(directory, name) for name, info in known.items() if info[0])
+                    continue
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            self._throttle(len(entries))
+            depth = 0 if directory == root else directory[len(root):].count(os.sep)
+            seen = set()
+            for entry in entries:
+                if self.excluded(entry.name, entry.path):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    mtime = int(entry.stat(follow_symlinks=False).st_mtime)
+                except OSError:
+                    continue
+                seen.add(entry.name)
+                old = known.get(entry.name)
+                if old is None:
+                    if self.count >= self.max_files:
+                        continue
+                    self._insert(entry.path, directory, entry.name, is_dir, mtime, depth)
+                elif old[0] != is_dir:
+                    self._delete(entry.path)
+                    self._insert(entry.path, directory, entry.name, is_dir, mtime, depth)
+                elif old[1] != mtime:
+                    self._db.execute("UPDATE files SET mtime = ? WHERE path = ?", (mtime, entry.path))
+                if is_dir:
+                    stack.append(entry.path)
+            for name in known.keys() - seen:
+                self._delete(os.path.join(directory, name))
+            self._db.execute("UPDATE files SET listed_mtime = ? WHERE path = ?", (current, directory))
+        self._db.commit()
+
+    def _insert(self, path: str, parent: str, name: str, is_dir: bool, mtime: int, depth: int):
+        self._db.execute("INSERT OR IGNORE INTO files (path, parent, name, words, is_dir, mtime, depth) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", (path, parent, name, split_words(name), int(is_dir), mtime, depth))
+        self.count += 1
+
+    def _delete(self, path: str):
+        """Removes path and, for a directory, everything indexed below it"""
+        # Range on the unique path index: "dir/" <= p < "dir0" is everything below dir
+        removed = self._db.execute("DELETE FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+                                   (path, path + "/", path + "0")).rowcount
+        self.count = max(0, self.count - removed)
+        if self._inotify:
+            self._inotify.remove_tree(path)
+
+    def _watch_until(self, deadline: float):
+        """Applies inotify events (batched ~0.5 s per commit) until the next rescan is due."""
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self._inotify is None:
+                self._stop.wait(remaining)
+                continue
+            readable, _, _ = select.select([self._inotify.fd], [], [], min(remaining, 60))
+            if not readable:
+                continue
+            self._resume.wait()
+            time.sleep(0.5)  # let bursts (unpacking an archive...) arrive in one batch
+            if self._apply(self._inotify.read()):
+                return  # overflow: rescan now
+            self._db.commit()
+
+    def _apply(self, events) -> bool:
+        dirty_dirs = set()
+        for directory, name, mask in events:
+            if mask & IN_Q_OVERFLOW:
+                return True
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._delete(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                dirty_dirs.add(directory)
+        for directory in dirty_dirs:
+            # Re-listing the parent picks up the new entry and, for folders, their contents
+            self._db.execute("UPDATE files SET listed_mtime = NULL WHERE path = ?", (directory,))
+            self.crawl(directory)
+        return False
+
+
+if __name__ == "__main__":
+    # python3 -m modules.file_index [--crawl ROOT] QUERY
+    args = sys.argv[1:]
+    index_roots = []
+    if args[:1] == ["--crawl"]:
+        index_roots, args = [args[1]], args[2:]
+    index = FileIndex(default_db_path(), index_roots, files_per_second=0)
+    if index_roots:
+        index._db = index._connect()
+        t0 = time.perf_counter()
+        index.crawl(index.roots[0])
+        print(f"Crawled {index.roots[0]} in {time.perf_counter() - t0:.1f} s")
+    query = " ".join(args)
+    t0 = time.perf_counter()
+    hits = index.search(query)
+    ranked = rank_results(query, [], hits, 20)
+    elapsed = (time.perf_counter() - t0) * 1000
+    for entry in ranked:
+        print(("[dir] " if entry["is_dir"] else "      ") + entry["path"])
+    print(f"{len(hits)} candidates ranked in {elapsed:.1f} ms")
@@ -0,0 +1,115 @@
+import json
+import math
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+
+class FrameStats:
+    """
+    Accumulates the frame monitor's reports from script.js: requestAnimationFrame
+    intervals ("frame"), long tasks ("longtask") and per-function render times
+    ("render:<name>"). Each report carries its own bucket bounds; reports whose
+    bounds changed (a newer script.js) replace the stored histogram.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.metrics: Dict[str, dict] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.metrics = json.load(f).get("metrics", {})
+        except (OSError, ValueError) as e:
+            print(f"Error reading frame stats: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"metrics": self.metrics}, indent=1)
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving frame stats: {e}")
+
+    def merge(self, metrics: dict):
+        with self._lock:
+            for name, hist in metrics.items():
+                try:
+                    bounds = [float(b) for b in hist["bounds"]]
+                    buckets = [int(n) for n in hist["buckets"]]
+                    count, total, worst = int(hist["count"]), float(hist["total_ms"]), float(hist["max_ms"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not count or len(buckets) != len(bounds) + 1:
+                    continue
+                entry = self.metrics.get(name)
+                if entry is None or entry["bounds"] != bounds:
+                    entry = self.metrics[name] = {"bounds": bounds, "buckets": [0] * len(buckets),
+                                                  "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+                entry["buckets"] = [a + b for a, b in zip(entry["buckets"], buckets)]
+                entry["count"] += count
+                entry["total_ms"] = round(entry["total_ms"] + total, 3)
+                entry["max_ms"] = round(max(entry["max_ms"], worst), 3)
+                self.dirty = True
+
+    @staticmethod
+    def percentile(entry: dict, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (max for the overflow bucket)"""
+        if not entry["count"]:
+            return None
+        target = max(1, math.ceil(entry["count"] * p / 100.0))
+        seen = 0
+        for i, n in enumerate(entry["buckets"]):
+            seen += n
+            if seen >= target:
+                return entry["bounds"][i] if i < len(entry["bounds"]) else entry["max_ms"]
+        return entry["max_ms"]
+
+    @staticmethod
+    def over(entry: dict, limit_ms: float) -> int:
+        """Samples in buckets entirely above limit_ms"""
+        return sum(n for i, n in enumerate(entry["buckets"]) if i > 0 and entry["bounds"][i - 1] >= limit_ms)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for name, entry in self.metrics.items():
+                result[name] = {
+                    "count": entry["count"],
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 2) if entry["count"] else None,
+                    "p50_ms": self.percentile(entry, 50),
+                    "p95_ms": self.percentile(entry, 95),
+                    "p99_ms": self.percentile(entry, 99),
+                    "max_ms": entry["max_ms"],
+                    "over_16ms": self.over(entry, 16.7),
+                }
+            return result
+
+
+def _sort_key(item):
+    name = item[0]
+    return (0 if name == "frame" else 1 if name == "longtask" else 2, name)
+
+
+if __name__ == "__main__":
+    # python3 -m modules.frame_metrics [frame_stats.json]
+    from modules.settings import state_path
+    default = state_path("frame_stats.json")
+    summary = FrameStats(sys.argv[1] if len(sys.argv) > 1 else default).summary()
+    print(f"{'metric':<36}{'n':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'>16ms':>8}")
+    for name, s in sorted(summary.items(), key=_sort_key):
+        print(f"{name[:35]:<36}{s['count']:>8}{s['mean_ms'] or '-':>9}{s['p50_ms'] or '-':>9}"
+              f"{s['p95_ms'] or '-':>9}{s['p99_ms'] or '-':>9}{s['max_ms']:>9}{s['over_16ms']:>8}")
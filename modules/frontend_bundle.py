@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Dict, Optional, Tuple
+
+SOURCES = ("desktop.html", "style.css", "script.js")
+BUNDLE_DIR = "build"
+MANIFEST = "manifest.json"
+
+# Images stored far larger than they are shown: (max width, max height, format).
+# None as the size means the wallpaper size given to build().
+IMAGE_RULES = {
+    "assets/wallpaper.png": (None, "jpeg"),   # a JPEG already, despite the name
+    "assets/start.png": ((96, 96), "png"),    # start button and top bar logo, 48 CSS px at 2x
+}
+IMAGE_EXTENSIONS = {"jpeg": ".jpg", "png": ".png"}
+
+# Rules for UI that is hidden when the page loads. They go into a stylesheet
+# applied after the first paint; everything else is inlined into the page.
+# Rules that hide things (.hidden) always stay inline.
+DEFERRED_SELECTORS = ("#start-menu", "#start-apps-list", ".start-app-item", ".start-menu", "#start-search",
+                      ".search-", ".power-buttons", "#about-panel", ".about-", "#window-previews",
+                      ".window-preview", "#context-menu", "#frame-overlay", "#wallpaper-", ".wallpaper-")
+
+_ASSET_HTML = re.compile(r'(src|href)="(assets/[^"]+)"')
+_ASSET_CSS = re.compile(r'url\(\s*["\']?(assets/[^"\')]+)["\']?\s*\)')
+_CSS_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def minify_css(text: str) -> str:
+    text = _CSS_COMMENT.sub(lambda m: m.group(1) or "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def css_blocks(text: str):
+    """Top-level rules of minified CSS as (prelude, whole rule); at-rules keep their nested blocks"""
+    blocks, depth, start, quote = [], 0, 0, None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote and text[i - 1] != "\\":
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                rule = text[start:i + 1]
+                blocks.append((rule[:rule.index("{")], rule))
+                start = i + 1
+    return blocks
+
+
+def split_css(text: str) -> Tuple[str, str]:
+    """(critical, deferred) minified CSS, in source order within each part"""
+    critical, deferred = [], []
+    for prelude, rule in css_blocks(minify_css(text)):
+        selectors = prelude.split(",")
+        late = (not prelude.startswith("@") and ".hidden" not in prelude
+                and all(any(token in s for token in DEFERRED_SELECTORS) for s in selectors))
+        (deferred if late else critical).append(rule)
+    return "".join(critical), "".join(deferred)
+
+
+def convert_image(path: str, max_size: Tuple[int, int], fmt: str) -> Optional[bytes]:
+    """Scaled down to fit max_size (never up) and re-encoded; None without GdkPixbuf"""
+    try:
+        import gi
+        gi.require_version("GdkPixbuf", "2.0")
+        from gi.repository import GdkPixbuf
+    except (ImportError, ValueError):
+        return None
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+    scale = min(1.0, max_size[0] / pixbuf.get_width(), max_size[1] / pixbuf.get_height())
+    if scale < 1.0:
+        pixbuf = pixbuf.scale_simple(max(1, round(pixbuf.get_width() * scale)),
+                                     max(1, round(pixbuf.get_height() * scale)), GdkPixbuf.InterpType.HYPER)
+    if fmt == "jpeg":
+        ok, data = pixbuf.save_to_bufferv("jpeg", ["quality"], ["85"])
+    else:
+        ok, data = pixbuf.save_to_bufferv("png", ["compression"], ["9"])
+    return bytes(data) if ok else None
+
+
+def source_stamps(base_dir: str) -> Dict[str, list]:
+    stamps = {}
+    for name in SOURCES:
+        st = os.stat(os.path.join(base_dir, name))
+        stamps[name] = [st.st_mtime_ns, st.st_size]
+    return stamps
+
+
+class BundleBuilder:
+    """
+    Writes the frontend as the shell loads it in production: critical CSS
+    inlined into desktop.html, the rest in a stylesheet applied after the
+    first paint, script and assets under content-hashed names, and
+    oversized images scaled down.
+    """
+
+    def __init__(self, base_dir: str, out_dir: str, wallpaper_size: Tuple[int, int] = (1920, 1080)):
+        self.base_dir = base_dir
+        self.out_dir = out_dir
+        self.wallpaper_size = wallpaper_size
+        self.assets: Dict[str, str] = {}  # source path -> bundled path, both relative
+        self.sizes: Dict[str, Tuple[int, int]] = {}
+
+    def emit(self, relative: str, data: bytes) -> str:
+        stem, ext = os.path.splitext(relative)
+        bundled = f"{stem}.{fingerprint(data)}{ext}"
+        target = os.path.join(self.out_dir, bundled)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        return bundled
+
+    def asset(self, relative: str) -> str:
+        if relative in self.assets:
+            return self.assets[relative]
+        source = os.path.join(self.base_dir, relative)
+        if not os.path.exists(source):
+            print(f"Missing asset {relative}, reference left as is")
+            self.assets[relative] = relative
+            return relative
+        with open(source, "rb") as f:
+            data = f.read()
+        original = len(data)
+        rule = IMAGE_RULES.get(relative)
+        out_name = relative
+        if rule:
+            size, fmt = rule
+            converted = convert_image(source, size or self.wallpaper_size, fmt)
+            if converted is None:
+                print(f"GdkPixbuf unavailable, {relative} copied unchanged")
+            elif len(converted) < original or size is not None:
+                data = converted
+                out_name = os.path.splitext(relative)[0] + IMAGE_EXTENSIONS[fmt]
+        self.assets[relative] = self.emit(out_name, data)
+        self.sizes[relative] = (original, len(data))
+        return self.assets[relative]
+
+    def rewrite_css(self, css: str) -> str:
+        return _ASSET_CSS.sub(lambda m: f'url("{self.asset(m.group(1))}")', css)
+
+    def build(self) -> dict:
+        if os.path.isdir(self.out_dir):
+            if not os.path.exists(os.path.join(self.out_dir, MANIFEST)):
+                raise RuntimeError(f"{self.out_dir} exists and is not a bundle; not overwriting it")
+            shutil.rmtree(self.out_dir)
+        os.makedirs(self.out_dir)
+        stamps = source_stamps(self.base_dir)
+
+        def read(name):
+            with open(os.path.join(self.base_dir, name), "r", encoding="utf-8") as f:
+                return f.read()
+
+        critical, deferred = split_css(read("style.css"))
+        critical = self.rewrite_css(critical)
+        deferred_name = self.emit("style.css", self.rewrite_css(deferred).encode("utf-8"))
+        script_name = self.emit("script.js", read("script.js").encode("utf-8"))
+
+        html = read("desktop.html")
+        html = html.replace('<link rel="stylesheet" href="style.css">', f"<style>{critical}</style>")
+        # media="print" keeps it from blocking the first paint; onload switches it on
+        html = html.replace('<script src="script.js"></script>',
+                            f'<link rel="stylesheet" href="{deferred_name}" media="print" '
+                            f'onload="this.media=\'all\'">\n<script src="{script_name}"></script>')
+        html = _ASSET_HTML.sub(lambda m: f'{m.group(1)}="{self.asset(m.group(2))}"', html)
+        with open(os.path.join(self.out_dir, "desktop.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+        manifest = {"sources": stamps, "files": {"desktop.html": "desktop.html", "style.css": deferred_name,
+                                                 "script.js": script_name, **self.assets}}
+        with open(os.path.join(self.out_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def bundle_page(base_dir: str, out_dir: Optional[str] = None) -> Optional[str]:
+    """The bundled desktop.html if it was built from the current sources, else None"""
+    out_dir = out_dir or os.path.join(base_dir, BUNDLE_DIR)
+    try:
+        with open(os.path.join(out_dir, MANIFEST), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("sources") != source_stamps(base_dir):
+            print(f"Frontend bundle is older than the sources, loading them instead "
+                  f"(rebuild: python3 -m modules.frontend_bundle)")
+            return None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring frontend bundle: {e}")
+        return None
+    return os.path.join(out_dir, "desktop.html")
+
+
+if __name__ == "__main__":
+    # python3 -m modules.frontend_bundle [--wallpaper-size 2560x1440] [OUT_DIR]
+    args = sys.argv[1:]
+    wallpaper = (1920, 1080)
+    if args[:1] == ["--wallpaper-size"]:
+        wallpaper = tuple(int(v) for v in args[1].lower().split("x"))
+        args = args[2:]
+    root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    builder = BundleBuilder(root, args[0] if args else os.path.join(root, BUNDLE_DIR), wallpaper)
+    builder.build()
+    for source, (before, after) in sorted(builder.sizes.items()):
+        print(f"{source:<32}{before / 1024:>10.1f} KB -> {after / 1024:.1f} KB  {builder.assets[source]}")
+    print(f"Bundle written to {builder.out_dir}")
@@ -0,0 +1,195 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# Log-spaced latency buckets: 25 ms * 1.5^i, the last one catches everything
+_BUCKET_BASE_MS = 25.0
+_BUCKET_FACTOR = 1.5
+_BUCKET_COUNT = 20
+
+
+def bucket_index(ms: float) -> int:
+    if ms <= _BUCKET_BASE_MS:
+        return 0
+    index = int(math.log(ms / _BUCKET_BASE_MS, _BUCKET_FACTOR)) + 1
+    return min(index, _BUCKET_COUNT - 1)
+
+
+def bucket_upper_ms(index: int) -> float:
+    return _BUCKET_BASE_MS * _BUCKET_FACTOR ** index
+
+
+class LatencyHistograms:
+    """
+    Per-app launch latency histograms (spawn -> first mapped window),
+    persisted as JSON so slow apps and the effect of prefetching can be
+    compared across sessions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.apps: Dict[str, dict] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.apps = json.load(f).get("apps", {})
+        except (OSError, ValueError) as e:
+            print(f"Error reading launch latency histograms: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"bucket_base_ms": _BUCKET_BASE_MS, "bucket_factor": _BUCKET_FACTOR,
+                               "apps": self.apps}, indent=1)
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving launch latency histograms: {e}")
+
+    def add(self, app: str, ms: float, failed: bool = False):
+        with self._lock:
+            entry = self.apps.setdefault(app, {"buckets": [0] * _BUCKET_COUNT, "count": 0, "failed": 0,
+                                               "min_ms": None, "max_ms": None, "last_ms": None})
+            if failed:
+                entry["failed"] += 1
+            else:
+                entry["buckets"][bucket_index(ms)] += 1
+                entry["count"] += 1
+                entry["last_ms"] = round(ms, 1)
+                entry["min_ms"] = round(ms, 1) if entry["min_ms"] is None else min(entry["min_ms"], round(ms, 1))
+                entry["max_ms"] = round(ms, 1) if entry["max_ms"] is None else max(entry["max_ms"], round(ms, 1))
+            self.dirty = True
+
+    @staticmethod
+    def percentile(entry: dict, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile"""
+        count = entry.get("count", 0)
+        if not count:
+            return None
+        target = max(1, math.ceil(count * p / 100.0))
+        seen = 0
+        for i, n in enumerate(entry["buckets"]):
+            seen += n
+            if seen >= target:
+                return round(min(bucket_upper_ms(i), entry["max_ms"]), 1)
+        return entry["max_ms"]
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            apps = {app: dict(entry) for app, entry in self.apps.items()}
+        return {
+            app: {
+                "count": entry["count"],
+                "failed": entry["failed"],
+                "p50_ms": self.percentile(entry, 50),
+                "p90_ms": self.percentile(entry, 90),
+                "p99_ms": self.percentile(entry, 99),
+                "min_ms": entry["min_ms"],
+                "max_ms": entry["max_ms"],
+                "last_ms": entry["last_ms"],
+            }
+            for app, entry in apps.items()
+        }
+
+
+@dataclass(eq=False)
+class PendingLaunch:
+    """A launch waiting for its first window; compared by identity"""
+    app: str
+    startup_id: Optional[str]
+    pid: Optional[int] = None
+    started: float = field(default_factory=time.monotonic)
+
+
+class LaunchTracker:
+    """
+    Matches newly mapped windows to launches, first by _NET_STARTUP_ID
+    (DESKTOP_STARTUP_ID handed to the child) and then by PID.
+    """
+
+    def __init__(self, histograms: LatencyHistograms, timeout: float = 30.0):
+        self.histograms = histograms
+        self.timeout = timeout
+        self.by_startup_id: Dict[str, PendingLaunch] = {}
+        self.by_pid: Dict[int, PendingLaunch] = {}
+
+    def begin(self, app: str, startup_id: Optional[str], pid: Optional[int]) -> PendingLaunch:
+        launch = PendingLaunch(app=app, startup_id=startup_id, pid=pid)
+        if startup_id:
+            self.by_startup_id[startup_id] = launch
+        if pid:
+            self.by_pid[pid] = launch
+        return launch
+
+    def _drop(self, launch: PendingLaunch):
+        if launch.startup_id:
+            self.by_startup_id.pop(launch.startup_id, None)
+        if launch.pid:
+            self.by_pid.pop(launch.pid, None)
+
+    def window_opened(self, startup_id: Optional[str], pid: Optional[int]) -> Optional[tuple]:
+        """Returns (launch, latency_ms) when the window completes a pending launch"""
+        launch = None
+        if startup_id:
+            launch = self.by_startup_id.get(startup_id)
+        if launch is None and pid:
+            launch = self.by_pid.get(pid)
+        if launch is None:
+            return None
+        self._drop(launch)
+        ms = (time.monotonic() - launch.started) * 1000
+        self.histograms.add(launch.app, ms)
+        return launch, ms
+
+    def process_exited(self, pid: int) -> Optional[PendingLaunch]:
+        """
+        A child that exits before showing a window counts as a failed launch,
+        unless it carried a startup id: single-instance launchers (e.g.
+        gnome-terminal) hand the id to an already running server and exit.
+        """
+        launch = self.by_pid.pop(pid, None)
+        if launch is None or launch.startup_id in self.by_startup_id:
+            return None
+        self._drop(launch)
+        self.histograms.add(launch.app, 0, failed=True)
+        return launch
+
+    def expire(self) -> list:
+        """Launches that never showed a window within the timeout"""
+        now = time.monotonic()
+        expired = [l for l in set(self.by_startup_id.values()) | set(self.by_pid.values())
+                   if now - l.started > self.timeout]
+        for launch in expired:
+            self._drop(launch)
+            self.histograms.add(launch.app, 0, failed=True)
+        return expired
+
+    def pending(self) -> int:
+        return len(set(self.by_startup_id.values()) | set(self.by_pid.values()))
+
+
+if __name__ == "__main__":
+    # python3 -m modules.launch_metrics [launch_latency.json]
+    from modules.settings import state_path
+    default = state_path("launch_latency.json")
+    summary = LatencyHistograms(sys.argv[1] if len(sys.argv) > 1 else default).summary()
+    print(f"{'app':<28}{'n':>6}{'fail':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for app, s in sorted(summary.items(), key=lambda kv: -(kv[1]["p50_ms"] or 0)):
+        print(f"{app[:27]:<28}{s['count']:>6}{s['failed']:>6}"
+              f"{s['p50_ms'] or '-':>10}{s['p90_ms'] or '-':>10}{s['p99_ms'] or '-':>10}{s['max_ms'] or '-':>10}")
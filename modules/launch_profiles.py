@@ -0,0 +1,225 @@
+import ctypes
+import json
+import os
+import platform
+import resource
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# ioprio_set(2) has no libc wrapper, call it through syscall(2)
+_IOPRIO_SYSCALLS = {"x86_64": 251, "i686": 289, "i386": 289, "aarch64": 30, "armv7l": 314, "riscv64": 30}
+_IOPRIO_CLASSES = {"none": 0, "realtime": 1, "best-effort": 2, "idle": 3}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+
+_RLIMITS = {
+    "as": resource.RLIMIT_AS,
+    "cpu": resource.RLIMIT_CPU,
+    "data": resource.RLIMIT_DATA,
+    "nofile": resource.RLIMIT_NOFILE,
+    "nproc": resource.RLIMIT_NPROC,
+}
+
+_SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+except OSError:
+    _libc = None
+
+
+def _parse_size(value) -> int:
+    """Accepts ints or strings like '512M' / '4G'"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip().upper()
+    if value and value[-1] in _SIZE_SUFFIXES:
+        return int(float(value[:-1]) * _SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def _parse_cpu_list(value) -> Optional[set]:
+    """Accepts [0, 1, 2] or a taskset-style string like '0-3,6'"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return {int(c) for c in value}
+    cpus = set()
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def set_io_priority(pid: int, io_class: str, level: int = 4) -> bool:
+    """Set the IO scheduling class of pid (0 = calling process)"""
+    number = _IOPRIO_SYSCALLS.get(platform.machine())
+    if _libc is None or number is None or io_class not in _IOPRIO_CLASSES:
+        return False
+    klass = _IOPRIO_CLASSES[io_class]
+    data = 0 if klass == _IOPRIO_CLASSES["idle"] else max(0, min(7, level))
+    ioprio = (klass << _IOPRIO_CLASS_SHIFT) | data
+    return _libc.syscall(number, _IOPRIO_WHO_PROCESS, pid, ioprio) == 0
+
+
+def thread_ids(pid: int) -> List[int]:
+    """Every thread of pid (0 = the calling process); nice, ionice and affinity are per thread on Linux"""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid or 'self'}/task")]
+    except (OSError, ValueError):
+        return [pid]
+
+
+@dataclass
+class LaunchProfile:
+    """Scheduling and resource limits applied to a process at spawn time"""
+    name: str = "default"
+    nice: Optional[int] = None
+    ionice_class: Optional[str] = None
+    ionice_level: int = 4
+    rlimits: Dict[str, object] = field(default_factory=dict)
+    cpu_affinity: Optional[object] = None
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "LaunchProfile":
+        return cls(
+            name=name,
+            nice=data.get("nice"),
+            ionice_class=data.get("ionice_class"),
+            ionice_level=int(data.get("ionice_level", 4)),
+            rlimits=dict(data.get("rlimits", {})),
+            cpu_affinity=data.get("cpu_affinity"),
+        )
+
+    def apply(self, pid: int = 0) -> List[str]:
+        """
+        Apply the profile to pid (0 = the calling process).
+        Returns the settings that could not be applied, e.g. a negative nice
+        value without CAP_SYS_NICE; failures are never fatal.
+
+        For another process, nice, ionice and affinity go to each of its
+        threads: a child that started threads before this call would
+        otherwise keep the spawner's values in all but its first one.
+        """
+        failed = []
+        tids = thread_ids(pid) if pid else [0]
+        if self.nice is not None:
+            try:
+                for tid in tids:
+                    try:
+                        os.setpriority(os.PRIO_PROCESS, tid, int(self.nice))
+                    except ProcessLookupError:
+                        pass  # a thread that ended since the listing
+            except OSError:
+                failed.append("nice")
+        if self.ionice_class and not set_io_priority(pid, self.ionice_class, self.ionice_level):
+            failed.append("ionice")
+        elif self.ionice_class:
+            for tid in tids:
+                if tid != pid:
+                    set_io_priority(tid, self.ionice_class, self.ionice_level)
+        for key, value in self.rlimits.items():
+            limit = _RLIMITS.get(key)
+            if limit is None:
+                failed.append(f"rlimit:{key}")
+                continue
+            amount = _parse_size(value)
+            # Soft limit only: the app (or a build's linker) may still raise it when it must
+            try:
+                if pid:
+                    _, hard = resource.prlimit(pid, limit)
+                else:
+                    _, hard = resource.getrlimit(limit)
+                if hard != resource.RLIM_INFINITY:
+                    amount = min(amount, hard)
+                if pid:
+                    resource.prlimit(pid, limit, (amount, hard))
+                else:
+                    resource.setrlimit(limit, (amount, hard))
+            except (OSError, ValueError):
+                failed.append(f"rlimit:{key}")
+        cpus = _parse_cpu_list(self.cpu_affinity)
+        if cpus:
+            try:
+                for tid in tids:
+                    try:
+                        os.sched_setaffinity(tid, cpus)
+                    except ProcessLookupError:
+                        pass
+            except OSError:
+                failed.append("cpu_affinity")
+        return failed
+
+    def is_noop(self) -> bool:
+        return self.nice is None and not self.ionice_class and not self.rlimits and not self.cpu_affinity
+
+
+# Used when profiles.json is missing or does not define a profile
+DEFAULT_PROFILES = {
+    # Protected profile for desktop.py and the WebKit processes it spawns
+    "shell": {"nice": -5, "ionice_class": "best-effort", "ionice_level": 0},
+    # Regular apps: undo the shell's boost so they compete on equal terms
+    "default": {"nice": 0, "ionice_class": "best-effort", "ionice_level": 4},
+    # Browsers, IDEs, build tools
+    "heavy": {"nice": 10, "ionice_class": "best-effort", "ionice_level": 7},
+    # Indexers and other work nobody is waiting for
+    "background": {"nice": 19, "ionice_class": "idle"},
+}
+
+
+class LaunchProfiles:
+    """
+    Named launch profiles plus the rules that pick one for an app.
+
+    Profiles are read from profiles.json next to desktop.py:
+
+        {
+            "profiles": {"heavy": {"nice": 10, "rlimits": {"as": "6G"}}},
+            "apps": {"brave": "heavy", "make": "background"}
+        }
+
+    A dock.json entry may also name its profile directly with "profile".
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.profiles: Dict[str, LaunchProfile] = {}
+        self.app_rules: Dict[str, str] = {}
+        self.reload()
+
+    def reload(self):
+        data = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading launch profiles: {e}")
+        merged = dict(DEFAULT_PROFILES)
+        merged.update(data.get("profiles", {}))
+        self.profiles = {name: LaunchProfile.from_dict(name, spec) for name, spec in merged.items()}
+        self.app_rules = {k.lower(): v for k, v in data.get("apps", {}).items()}
+
+    def get(self, name: Optional[str]) -> LaunchProfile:
+        return self.profiles.get(name or "default") or self.profiles["default"]
+
+    def resolve(self, app_id: Optional[str] = None, command: Optional[str] = None,
+                explicit: Optional[str] = None) -> LaunchProfile:
+        """Pick a profile: explicit name, then rule by app id, then by executable name"""
+        if explicit and explicit in self.profiles:
+            return self.profiles[explicit]
+        candidates = []
+        if app_id:
+            candidates.append(app_id.lower())
+        if command:
+            candidates.append(os.path.basename(command.split()[0]).lower())
+        for key in candidates:
+            if key in self.app_rules:
+                return self.get(self.app_rules[key])
+        return self.get("default")
@@ -1,14 +1,333 @@
 import subprocess
 import sys
 import os
-from typing import Optional, Union
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# GLib is optional: inside the desktop process children are reaped through the
+# main loop, standalone scripts fall back to SIGCHLD.
+try:
+    from gi.repository import GLib
+except ImportError:
+    GLib = None
+
+
+@dataclass
+class ChildRecord:
+    """Bookkeeping for one process started through the supervisor"""
+    pid: int
+    cmd: List[str]
+    app: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    started_monotonic: float = field(default_factory=time.monotonic)
+    exit_status: Optional[int] = None
+    ended_at: Optional[float] = None
+    first_window_monotonic: Optional[float] = None
+    popen: Optional[subprocess.Popen] = field(default=None, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.exit_status is None
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": self.pid,
+            "cmd": self.cmd,
+            "app": self.app,
+            "started_at": self.started_at,
+            "exit_status": self.exit_status,
+            "ended_at": self.ended_at,
+            "first_window_ms": self.first_window_ms,
+        }
+
+    @property
+    def first_window_ms(self) -> Optional[float]:
+        """Time from spawn to the first mapped window, if one was seen"""
+        if self.first_window_monotonic is None:
+            return None
+        return round((self.first_window_monotonic - self.started_monotonic) * 1000, 1)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel driven by a single periodic tick.
+
+    All launch timeouts share one tick source (a GLib timeout when a main loop
+    is attached, otherwise one daemon thread), instead of one threading.Timer
+    per process. The tick only runs while timers are pending.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64):
+        self.tick = tick
+        self.slots = [dict() for _ in range(slots)]
+        self.position = 0
+        self.pending = 0
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self._use_glib = False
+        self._source_id = None
+        self._thread = None
+        self._wakeup = threading.Condition(self._lock)
+
+    def use_glib(self):
+        """Drive ticks from the GLib main loop instead of a helper thread"""
+        self._use_glib = GLib is not None
+
+    def schedule(self, delay: float, callback: Callable, *args) -> int:
+        """Run callback(*args) after roughly delay seconds; returns a timer id"""
+        with self._lock:
+            ticks = max(1, int(round(delay / self.tick)))
+            # The wheel reaches position + 1 on the next tick, so a delay of n ticks is offset n - 1 from there
+            rounds, offset = divmod(ticks - 1, len(self.slots))
+            slot = (self.position + offset + 1) % len(self.slots)
+            self._next_id += 1
+            timer_id = self._next_id
+            self.slots[slot][timer_id] = [rounds, callback, args]
+            self.pending += 1
+            self._ensure_running()
+            return timer_id
+
+    def cancel(self, timer_id: int) -> bool:
+        with self._lock:
+            for slot in self.slots:
+                if slot.pop(timer_id, None) is not None:
+                    self.pending -= 1
+                    return True
+        return False
+
+    def _ensure_running(self):
+        if self._use_glib:
+            if self._source_id is None:
+                self._source_id = GLib.timeout_add(int(self.tick * 1000), self._on_glib_tick)
+        elif self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._thread_loop, name="timer-wheel", daemon=True)
+            self._thread.start()
+        else:
+            self._wakeup.notify()
+
+    def _advance(self) -> list:
+        """Move the wheel one slot and collect the callbacks that are due"""
+        due = []
+        with self._lock:
+            self.position = (self.position + 1) % len(self.slots)
+            slot = self.slots[self.position]
+            for timer_id in list(slot):
+                entry = slot[timer_id]
+                if entry[0] > 0:
+                    entry[0] -= 1
+                    continue
+                del slot[timer_id]
+                self.pending -= 1
+                due.append((entry[1], entry[2]))
+        return due
+
+    def _fire(self, due: list):
+        for callback, args in due:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"✗ Timer callback failed: {type(e).__name__}: {e}")
+
+    def _on_glib_tick(self):
+        self._fire(self._advance())
+        with self._lock:
+            if self.pending:
+                return True
+            self._source_id = None
+            return False
+
+    def _thread_loop(self):
+        while True:
+            with self._lock:
+                while not self.pending:
+                    self._wakeup.wait()
+            time.sleep(self.tick)
+            self._fire(self._advance())
+
+
+class ProcessSupervisor:
+    """
+    Tracks every child started by the desktop.
+
+    Children are reaped as soon as they exit (GLib child watch when a main loop
+    is attached, SIGCHLD otherwise), so nothing lingers as a zombie, and
+    timeouts are enforced from one shared TimerWheel. Finished records are kept
+    in a bounded history so memory stays flat across thousands of launches.
+    """
+
+    def __init__(self, history: int = 256):
+        self.children: Dict[int, ChildRecord] = {}
+        self.history = deque(maxlen=history)
+        self.wheel = TimerWheel()
+        self.exit_callbacks: List[Callable[[ChildRecord], None]] = []
+        self.window_callbacks: List[Callable[[ChildRecord], None]] = []
+        self._lock = threading.RLock()
+        self._use_glib = False
+        self._sigchld_installed = False
+
+    def use_glib_main_loop(self):
+        """Reap children and run timeouts from the GLib main loop (desktop process)"""
+        if GLib is None:
+            return
+        self._use_glib = True
+        self.wheel.use_glib()
+        # Children spawned before the switch still need a watch
+        with self._lock:
+            for pid in list(self.children):
+                GLib.child_watch_add(GLib.PRIORITY_DEFAULT, pid, self._on_glib_child_exit)
+
+    def _install_sigchld(self):
+        if self._sigchld_installed:
+            return
+        try:
+            signal.signal(signal.SIGCHLD, lambda signum, frame: self.reap())
+            self._sigchld_installed = True
+        except ValueError:
+            # Not the main thread: reap opportunistically on every spawn instead
+            pass
+
+    def spawn(self, cmd: List[str], app: Optional[str] = None, timeout: Optional[float] = None,
+              profile=None, **popen_kwargs) -> subprocess.Popen:
+        """
+        Start cmd with subprocess.Popen and put it under supervision.
+        profile is an optional modules.launch_profiles.LaunchProfile applied
+        to the child by PID right after it starts (nice, ionice, rlimits, CPU
+        affinity). No preexec_fn: running Python between fork and exec is
+        unsafe in a threaded process, and it rules out the vfork fast path.
+        """
+        if not self._use_glib:
+            self._install_sigchld()
+            self.reap()
+        process = subprocess.Popen(cmd, **popen_kwargs)
+        if profile is not None and not profile.is_noop():
+            failed = profile.apply(process.pid)
+            if failed:
+                print(f"Launch profile for {cmd[0]}: could not apply {', '.join(failed)}")
+        self.track(process, cmd, app=app, timeout=timeout)
+        return process
+
+    def track(self, process: subprocess.Popen, cmd: List[str], app: Optional[str] = None,
+              timeout: Optional[float] = None) -> ChildRecord:
+        """Register an already started process"""
+        record = ChildRecord(pid=process.pid, cmd=list(cmd), app=app, popen=process)
+        with self._lock:
+            self.children[process.pid] = record
+        if self._use_glib:
+            GLib.child_watch_add(GLib.PRIORITY_DEFAULT, process.pid, self._on_glib_child_exit)
+        if timeout:
+            self.wheel.schedule(timeout, self._enforce_timeout, process.pid)
+        return record
+
+    def _on_glib_child_exit(self, pid, status):
+        try:
+            code = os.waitstatus_to_exitcode(status)
+        except ValueError:
+            code = status
+        self._finish(pid, code)
+
+    def reap(self):
+        """Collect exit statuses of finished children without blocking"""
+        with self._lock:
+            pids = list(self.children)
+        for pid in pids:
+            try:
+                waited, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                # Already reaped elsewhere (e.g. Popen.wait)
+                record = self.children.get(pid)
+                code = record.popen.returncode if record and record.popen else None
+                self._finish(pid, code if code is not None else 0)
+                continue
+            if waited:
+                self._finish(pid, os.waitstatus_to_exitcode(status))
+
+    def _finish(self, pid: int, code: int):
+        with self._lock:
+            record = self.children.pop(pid, None)
+            if record is None:
+                return
+            record.exit_status = code
+            record.ended_at = time.time()
+            if record.popen is not None and record.popen.returncode is None:
+                record.popen.returncode = code
+            # Drop the Popen so finished children do not keep pipes/objects alive
+            record.popen = None
+            self.history.append(record)
+        for callback in list(self.exit_callbacks):
+            try:
+                callback(record)
+            except Exception as e:
+                print(f"✗ Exit callback failed: {type(e).__name__}: {e}")
+
+    def _enforce_timeout(self, pid: int):
+        record = self.children.get(pid)
+        if record is None:
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        # Escalate if it ignores SIGTERM, without blocking on wait()
+        self.wheel.schedule(5, self._kill_if_running, pid)
+
+    def _kill_if_running(self, pid: int):
+        if pid in self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def mark_window(self, pid: int) -> bool:
+        """
+        Called by the window tracker for every mapped window's PID. The first
+        call for a supervised child records its time-to-first-window.
+        """
+        with self._lock:
+            record = self.children.get(pid)
+            if record is None or record.first_window_monotonic is not None:
+                return False
+            record.first_window_monotonic = time.monotonic()
+        for callback in list(self.window_callbacks):
+            try:
+                callback(record)
+            except Exception as e:
+                print(f"✗ Window callback failed: {type(e).__name__}: {e}")
+        return True
+
+    def pid_map(self) -> Dict[int, str]:
+        """Live PID -> app id map for the dock"""
+        with self._lock:
+            return {pid: rec.app for pid, rec in self.children.items() if rec.app}
+
+    def running(self) -> List[ChildRecord]:
+        with self._lock:
+            return list(self.children.values())
+
+
+_supervisor = None
+
+
+def get_supervisor() -> ProcessSupervisor:
+    """Process-wide supervisor shared by every launch helper"""
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = ProcessSupervisor()
+    return _supervisor
+
 
 def launch_script_pythonw_style(
     script_path: str,
     args: list = None,
     python_executable: str = None,
     working_dir: str = None,
-    env: dict = None
+    env: dict = None,
+    app: str = None,
+    timeout: float = None,
+    profile=None
 ) -> Optional[subprocess.Popen]:
     """
     Launch a Python script in Linux similar to pythonw behavior on Windows.
@@ -25,6 +344,12 @@ def launch_script_pythonw_style(
         Working directory for the script (defaults to script's directory)
     env : dict, optional
         Environment variables to set (merged with current env)
+    app : str, optional
+        App id recorded in the supervisor's PID -> app map
+    timeout : float, optional
+        Terminate the script after this many seconds
+    profile : LaunchProfile, optional
+        Scheduling/resource profile applied at spawn time
     
     Returns:
     --------
@@ -50,9 +375,13 @@ def launch_script_pythonw_style(
         if env:
             process_env.update(env)
         
-        # Launch the process (similar to pythonw behavior)
-        process = subprocess.Popen(
+        # Launch the process (similar to pythonw behavior); the supervisor
+        # reaps it when it exits so it never lingers as a zombie
+        process = get_supervisor().spawn(
             cmd,
+            app=app,
+            timeout=timeout,
+            profile=profile,
             cwd=working_dir,                # Working directory
             env=process_env,                # Environment variables
             start_new_session=True,         # Detach from parent
@@ -93,20 +422,6 @@ def launch_with_timeout(script_path: str, timeout: int = 60):
     Launch script but kill it after timeout if it's still running
     Useful for scripts that should complete within a certain time
     """
-    import threading
-    
-    def kill_process(p):
-        try:
-            p.terminate()
-            p.wait(timeout=5)
-            if p.poll() is None:
-                p.kill()
-        except:
-            pass
-    
-    process = launch_script_pythonw_style(script_path)
-    if process:
-        timer = threading.Timer(timeout, kill_process, [process])
-        timer.daemon = True
-        timer.start()
-    return process
+    # Enforced by the supervisor's timer wheel: SIGTERM at the deadline,
+    # SIGKILL five seconds later if the process is still alive
+    return launch_script_pythonw_style(script_path, timeout=timeout)
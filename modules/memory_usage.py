@@ -0,0 +1,217 @@
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, List, Optional
+
+# smaps_rollup keys we report, all in kB
+ROLLUP_FIELDS = {"Rss:": "rss_kb", "Pss:": "pss_kb", "Swap:": "swap_kb", "SwapPss:": "swap_pss_kb"}
+
+# WebKit truncates its helper names to the 15-char comm limit
+WEBKIT_COMPONENTS = {
+    "WebKitWebProces": "webkit-web",
+    "WebKitWebProcess": "webkit-web",
+    "WebKitNetworkPr": "webkit-network",
+    "WebKitNetworkProcess": "webkit-network",
+}
+
+
+def read_memory(pid: int) -> Optional[Dict[str, int]]:
+    """RSS/PSS/swap for one process; falls back to /proc/<pid>/status (no PSS) on old kernels"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key = ROLLUP_FIELDS.get(line.split(None, 1)[0])
+                if key:
+                    values[key] = int(line.split()[1])
+        return values
+    except FileNotFoundError:
+        pass
+    except (PermissionError, ProcessLookupError, ValueError, IndexError):
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmSwap:"):
+                    values["swap_kb"] = int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return values or None
+
+
+def read_stat(pid: int):
+    """(comm, ppid) from /proc/<pid>/stat, or None if the process is gone"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+        return stat[stat.index("(") + 1:stat.rindex(")")], int(stat[stat.rindex(")") + 2:].split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+    except OSError:
+        return ""
+
+
+def process_tree(root: int) -> Dict[int, tuple]:
+    """pid -> (comm, ppid) for root and all its descendants"""
+    table = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            info = read_stat(int(entry))
+            if info:
+                table[int(entry)] = info
+    children = {}
+    for pid, (_, ppid) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    tree, stack = {}, [root]
+    while stack:
+        pid = stack.pop()
+        if pid in table and pid not in tree:
+            tree[pid] = table[pid]
+            stack.extend(children.get(pid, []))
+    return tree
+
+
+@dataclass
+class ComponentUsage:
+    name: str
+    pids: List[int] = field(default_factory=list)
+    rss_kb: int = 0
+    pss_kb: int = 0
+    swap_kb: int = 0
+    swap_pss_kb: int = 0
+    pss_available: bool = True
+
+    def add(self, pid: int, values: Dict[str, int]):
+        self.pids.append(pid)
+        self.rss_kb += values.get("rss_kb", 0)
+        self.pss_kb += values.get("pss_kb", 0)
+        self.swap_kb += values.get("swap_kb", 0)
+        self.swap_pss_kb += values.get("swap_pss_kb", 0)
+        self.pss_available = self.pss_available and "pss_kb" in values
+
+
+class MemoryAccountant:
+    """
+    Attributes memory to the shell's components: the desktop process itself,
+    WebKit's web and network processes, the main.py splash (the shell's parent
+    while it is alive) and each app launched from the dock, grouped by name.
+
+    PSS splits shared pages between the processes mapping them, so component
+    PSS values add up to the real footprint, unlike RSS. Thresholds map a
+    component name (or "total") to a PSS limit in MB; crossing one logs a
+    warning once, until usage drops back below it.
+    """
+
+    def __init__(self, root_pid: Optional[int] = None, app_names: Optional[Callable[[], Dict[int, str]]] = None,
+                 thresholds_mb: Optional[Dict[str, float]] = None):
+        self.root_pid = root_pid or os.getpid()
+        self.app_names = app_names or dict
+        self.thresholds_mb = thresholds_mb or {}
+        self.exceeded = set()
+        self.last = None
+
+    def component_for(self, pid: int, comm: str, apps: Dict[int, str]) -> str:
+        if pid == self.root_pid:
+            return "shell"
+        if comm in WEBKIT_COMPONENTS:
+            return WEBKIT_COMPONENTS[comm]
+        if pid in apps:
+            return f"app:{apps[pid]}"
+        return f"app:{comm}"
+
+    def sample(self) -> dict:
+        apps = self.app_names()
+        components: Dict[str, ComponentUsage] = {}
+
+        def account(pid, name):
+            values = read_memory(pid)
+            if values is not None:
+                components.setdefault(name, ComponentUsage(name)).add(pid, values)
+
+        # Descendants of an app (e.g. browser helpers) are charged to that app
+        tree = process_tree(self.root_pid)
+        owner = {}
+        for pid in tree:  # parents come before their children
+            comm, ppid = tree[pid]
+            name = owner.get(ppid) if ppid != self.root_pid and ppid in owner else None
+            name = name or self.component_for(pid, comm, apps)
+            owner[pid] = name
+            account(pid, name)
+
+        parent = read_stat(self.root_pid)
+        if parent and "main.py" in read_cmdline(parent[1]):
+            account(parent[1], "splash")
+
+        total = ComponentUsage("total")
+        for usage in components.values():
+            total.pids.extend(usage.pids)
+            total.rss_kb += usage.rss_kb
+            total.pss_kb += usage.pss_kb
+            total.swap_kb += usage.swap_kb
+            total.swap_pss_kb += usage.swap_pss_kb
+            total.pss_available = total.pss_available and usage.pss_available
+
+        self.last = {
+            "timestamp": time.time(),
+            "root_pid": self.root_pid,
+            "components": [asdict(u) for u in sorted(components.values(), key=lambda u: -u.pss_kb)],
+            "total": asdict(total),
+        }
+        self.check_thresholds(list(components.values()) + [total])
+        return self.last
+
+    def check_thresholds(self, usages: List[ComponentUsage]):
+        for usage in usages:
+            limit = self.thresholds_mb.get(usage.name)
+            if limit is None:
+                continue
+            # Without PSS (pre-4.14 kernels) RSS is the only figure available
+            used_mb = (usage.pss_kb if usage.pss_available else usage.rss_kb) / 1024
+            if used_mb > limit and usage.name not in self.exceeded:
+                self.exceeded.add(usage.name)
+                print(f"Memory warning: {usage.name} uses {used_mb:.0f} MB (threshold {limit} MB)")
+            elif used_mb <= limit:
+                self.exceeded.discard(usage.name)
+
+    def dump(self, path: str):
+        """Writes the latest sample as JSON (atomically, so readers never see half a file)"""
+        report = self.last or self.sample()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def find_shell_pid() -> Optional[int]:
+    for entry in os.listdir("/proc"):
+        if entry.isdigit() and int(entry) != os.getpid():
+            cmdline = read_cmdline(int(entry))
+            if "python" in cmdline and "desktop.py" in cmdline:
+                return int(entry)
+    return None
+
+
+if __name__ == "__main__":
+    # python3 -m modules.memory_usage [pid] [--json]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    root = int(args[0]) if args else find_shell_pid()
+    if root is None:
+        sys.exit("desktop.py is not running (pass a pid)")
+    report = MemoryAccountant(root).sample()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+    print(f"{'component':<32}{'procs':>6}{'RSS MB':>10}{'PSS MB':>10}{'swap MB':>10}")
+    for usage in report["components"] + [report["total"]]:
+        print(f"{usage['name'][:31]:<32}{len(usage['pids']):>6}{usage['rss_kb'] / 1024:>10.1f}"
+              f"{usage['pss_kb'] / 1024:>10.1f}{usage['swap_kb'] / 1024:>10.1f}")
@@ -0,0 +1,24 @@
+import os
+import sys
+import time
+
+# Set by benchmarks/cold_boot.py; everything here is a no-op otherwise
+ENABLED = bool(os.environ.get("OPENDESKTOP_MILESTONES"))
+
+_seen = set()
+
+
+def milestone(name: str, once: bool = True):
+    """
+    Print a machine-readable startup milestone on stdout:
+
+        [milestone] <name> <unix time> <pid>
+
+    Wall-clock time is used so marks from different processes (splash,
+    desktop, web process via the bridge) line up on one timeline.
+    """
+    if not ENABLED or (once and name in _seen):
+        return
+    _seen.add(name)
+    sys.stdout.write(f"[milestone] {name} {time.time():.6f} {os.getpid()}\n")
+    sys.stdout.flush()
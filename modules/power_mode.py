@@ -0,0 +1,144 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+TIER_FULL = "full"            # blur, shadows, transitions
+TIER_REDUCED = "reduced"      # solid translucent panels instead of backdrop blur
+TIER_MINIMAL = "minimal"      # no transitions or animations, minute clock, slower shell timers
+TIER_SUSPENDED = "suspended"  # screen locked or blanked: page and shell timers stopped
+
+TIERS = [TIER_FULL, TIER_REDUCED, TIER_MINIMAL]
+
+# How much slower periodic shell work runs per tier
+INTERVAL_SCALE = {TIER_FULL: 1, TIER_REDUCED: 1, TIER_MINIMAL: 2.5, TIER_SUSPENDED: 30}
+
+POWER_SUPPLY_ROOT = "/sys/class/power_supply"
+
+
+@dataclass
+class PowerState:
+    on_battery: bool = False
+    capacity: Optional[int] = None  # percent, lowest battery if there are several
+    has_battery: bool = False
+    charging: bool = False
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def read_power_state(root: str = POWER_SUPPLY_ROOT) -> PowerState:
+    """Battery state from sysfs; desktops without a battery are never "on battery"."""
+    if not os.path.isdir(root):
+        return PowerState()
+    mains_online = False
+    discharging = False
+    charging = False
+    has_battery = False
+    capacities = []
+    for name in os.listdir(root):
+        supply = os.path.join(root, name)
+        kind = _read(os.path.join(supply, "type"))
+        if kind == "Mains" and _read(os.path.join(supply, "online")) == "1":
+            mains_online = True
+        elif kind == "Battery" and _read(os.path.join(supply, "scope")) != "Device":
+            # scope=Device is a mouse/keyboard battery, not the laptop's
+            has_battery = True
+            status = _read(os.path.join(supply, "status"))
+            if status == "Discharging":
+                discharging = True
+            elif status == "Charging":
+                charging = True
+            capacity = _read(os.path.join(supply, "capacity"))
+            if capacity.isdigit():
+                capacities.append(int(capacity))
+    return PowerState(on_battery=discharging and not mains_online,
+                      capacity=min(capacities) if capacities else None,
+                      has_battery=has_battery, charging=charging)
+
+
+class PowerModeManager:
+    """
+    Picks the UI tier from what it is told about the machine:
+
+        locked / screensaver active        -> suspended
+        on battery (<= low_battery %)      -> reduced (minimal)
+        frame probes slower than slow_ms   -> one tier lower per slow report,
+                                              back up after recover_reports good ones
+
+    "forced" (full/reduced/minimal) pins the tier except while locked.
+    Listeners get (tier, reason) whenever the tier changes.
+    """
+
+    def __init__(self, forced: Optional[str] = None, low_battery: int = 20,
+                 slow_ms: float = 33.4, good_ms: float = 20.0, recover_reports: int = 5):
+        self.forced = forced if forced in TIERS else None
+        self.low_battery = low_battery
+        self.slow_ms = slow_ms
+        self.good_ms = good_ms
+        self.recover_reports = recover_reports
+        self.power = PowerState()
+        self.locked = False
+        self.frame_penalty = 0
+        self.good_reports = 0
+        self.tier = TIER_FULL
+        self.listeners: List[Callable[[str, str], None]] = []
+
+    def connect(self, callback: Callable[[str, str], None]):
+        self.listeners.append(callback)
+
+    def compute(self) -> str:
+        if self.locked:
+            return TIER_SUSPENDED
+        if self.forced:
+            return self.forced
+        base = TIER_FULL
+        if self.power.on_battery:
+            low = self.power.capacity is not None and self.power.capacity <= self.low_battery
+            base = TIER_MINIMAL if low else TIER_REDUCED
+        return TIERS[min(len(TIERS) - 1, TIERS.index(base) + self.frame_penalty)]
+
+    def _update(self, reason: str):
+        tier = self.compute()
+        if tier != self.tier:
+            self.tier = tier
+            for callback in self.listeners:
+                callback(tier, reason)
+
+    def set_power(self, state: PowerState):
+        if state != self.power:
+            self.power = state
+            self._update("battery" if state.on_battery else "ac")
+
+    def set_locked(self, locked: bool):
+        if locked != self.locked:
+            self.locked = locked
+            self._update("locked" if locked else "unlocked")
+
+    def report_frames(self, p95_ms: Optional[float]):
+        """One frame probe from the page; only probes taken while visible count."""
+        if p95_ms is None or self.locked:
+            return
+        if p95_ms > self.slow_ms:
+            self.good_reports = 0
+            if self.frame_penalty < len(TIERS) - 1:
+                self.frame_penalty += 1
+                self._update(f"slow frames (p95 {p95_ms:.0f} ms)")
+        elif p95_ms <= self.good_ms and self.frame_penalty:
+            self.good_reports += 1
+            if self.good_reports >= self.recover_reports:
+                self.good_reports = 0
+                self.frame_penalty -= 1
+                self._update("frames recovered")
+
+    def interval(self, seconds: float) -> int:
+        return max(1, int(seconds * INTERVAL_SCALE[self.tier]))
+
+    @property
+    def throttled(self) -> bool:
+        """Background work (prefetch, sampling) should wait"""
+        return self.tier == TIER_SUSPENDED or self.power.on_battery
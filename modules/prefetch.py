@@ -0,0 +1,358 @@
+import glob
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from modules.launch_profiles import set_io_priority
+
+# Weight of launches at the current hour versus the all-day count
+_HOUR_WEIGHT = 3.0
+# Halve the influence of launches every two weeks
+_HALF_LIFE_DAYS = 14.0
+
+
+def available_memory() -> Optional[int]:
+    """MemAvailable from /proc/meminfo in bytes"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def resolve_executable(command: str) -> Optional[str]:
+    """Absolute, symlink-resolved path of a command's executable"""
+    if not command:
+        return None
+    exe = command.split()[0]
+    path = exe if os.path.isabs(exe) else shutil.which(exe)
+    if not path:
+        return None
+    return os.path.realpath(path)
+
+
+# ELF program header and dynamic section tags (elf(5))
+_PT_LOAD, _PT_DYNAMIC, _PT_INTERP = 1, 2, 3
+_DT_NULL, _DT_NEEDED, _DT_STRTAB, _DT_RPATH, _DT_RUNPATH = 0, 1, 5, 15, 29
+_DEFAULT_LIB_DIRS = ["/lib64", "/usr/lib64", "/lib", "/usr/lib"]
+
+
+class ElfDeps(NamedTuple):
+    kind: Tuple[int, int]  # (ELF class, machine): a library must match the binary loading it
+    interp: Optional[str]
+    needed: List[str]
+    search: List[str]      # DT_RUNPATH, else DT_RPATH, with $ORIGIN expanded
+
+
+def read_elf_deps(path: str) -> Optional[ElfDeps]:
+    """
+    The dynamic loader's view of an ELF file, read from its program
+    headers. Unlike ldd, nothing is executed and no process is started.
+    """
+    try:
+        with open(path, "rb") as f:
+            ident = f.read(64)
+            if len(ident) < 52 or ident[:4] != b"\x7fELF" or ident[4] not in (1, 2) or ident[5] not in (1, 2):
+                return None
+            is64 = ident[4] == 2
+            order = "<" if ident[5] == 1 else ">"
+            machine, = struct.unpack_from(order + "H", ident, 18)
+            if is64:
+                phoff, = struct.unpack_from(order + "Q", ident, 32)
+                phentsize, phnum = struct.unpack_from(order + "HH", ident, 54)
+                phdr, dyn = struct.Struct(order + "IIQQQQQQ"), struct.Struct(order + "qQ")
+            else:
+                phoff, = struct.unpack_from(order + "I", ident, 28)
+                phentsize, phnum = struct.unpack_from(order + "HH", ident, 42)
+                phdr, dyn = struct.Struct(order + "IIIIIIII"), struct.Struct(order + "iI")
+            if phentsize < phdr.size:
+                return None
+            f.seek(phoff)
+            table = f.read(phentsize * phnum)
+            loads, dynamic, interp = [], None, None
+            for i in range(min(phnum, len(table) // phentsize)):
+                fields = phdr.unpack_from(table, i * phentsize)
+                if is64:
+                    p_type, _flags, offset, vaddr, _paddr, filesz = fields[:6]
+                else:
+                    p_type, offset, vaddr, _paddr, filesz = fields[:5]
+                if p_type == _PT_LOAD:
+                    loads.append((vaddr, offset, filesz))
+                elif p_type == _PT_DYNAMIC:
+                    dynamic = (offset, filesz)
+                elif p_type == _PT_INTERP:
+                    f.seek(offset)
+                    interp = os.fsdecode(f.read(filesz).split(b"\0")[0]) or None
+            if dynamic is None:
+                return ElfDeps((ident[4], machine), interp, [], [])
+
+            f.seek(dynamic[0])
+            data = f.read(dynamic[1])
+            tags: List[Tuple[int, int]] = []
+            for offset in range(0, len(data) - dyn.size + 1, dyn.size):
+                tag, value = dyn.unpack_from(data, offset)
+                if tag == _DT_NULL:
+                    break
+                tags.append((tag, value))
+            strtab = next((value for tag, value in tags if tag == _DT_STRTAB), None)
+            # DT_STRTAB is an address: find the file offset of the segment holding it
+            base = next((offset + strtab - vaddr for vaddr, offset, size in loads
+                         if strtab is not None and vaddr <= strtab < vaddr + size), None)
+            if base is None:
+                return ElfDeps((ident[4], machine), interp, [], [])
+
+            def string(index: int) -> str:
+                f.seek(base + index)
+                return os.fsdecode(f.read(4096).split(b"\0")[0])
+
+            needed = [string(value) for tag, value in tags if tag == _DT_NEEDED]
+            runpath = [string(value) for tag, value in tags if tag == _DT_RUNPATH]
+            rpath = [string(value) for tag, value in tags if tag == _DT_RPATH]
+    except (OSError, struct.error):
+        return None
+    origin = os.path.dirname(path)
+    search = [d.replace("$ORIGIN", origin).replace("${ORIGIN}", origin)
+              for entry in (runpath or rpath) for d in entry.split(":") if d]
+    return ElfDeps((ident[4], machine), interp, needed, search)
+
+
+@lru_cache(maxsize=1)
+def library_dirs() -> Tuple[str, ...]:
+    """Directories the dynamic loader searches: /etc/ld.so.conf (with its includes), then the defaults"""
+    dirs: List[str] = []
+    pending = ["/etc/ld.so.conf"]
+    seen = set()
+    while pending:
+        conf = pending.pop(0)
+        if conf in seen:
+            continue
+        seen.add(conf)
+        try:
+            with open(conf, "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            line = line.split("#")[0].strip()
+            if line.startswith("include "):
+                pattern = line.split(None, 1)[1]
+                if not os.path.isabs(pattern):
+                    pattern = os.path.join(os.path.dirname(conf), pattern)
+                pending.extend(sorted(glob.glob(pattern)))
+            elif line.startswith("/"):
+                dirs.append(line)
+    return tuple(dict.fromkeys(dirs + _DEFAULT_LIB_DIRS))
+
+
+def _find_library(name: str, kind: Tuple[int, int], search: List[str]) -> Optional[str]:
+    if "/" in name:
+        return name if os.path.exists(name) else None
+    for directory in search + list(library_dirs()):
+        candidate = os.path.join(directory, name)
+        if os.path.exists(candidate):
+            deps = read_elf_deps(candidate)
+            if deps is not None and deps.kind == kind:  # skip 32-bit copies for a 64-bit binary
+                return candidate
+    return None
+
+
+def shared_libraries(exe: str) -> List[str]:
+    """Resolved shared library dependencies of an ELF executable, transitively, like ldd lists them"""
+    top = read_elf_deps(exe)
+    if top is None:
+        return []
+    libs: List[str] = []
+    if top.interp and os.path.exists(top.interp):
+        libs.append(os.path.realpath(top.interp))
+    seen = set()
+    pending = [(name, top.search) for name in top.needed]
+    while pending:
+        name, search = pending.pop(0)
+        if name in seen:
+            continue
+        seen.add(name)
+        path = _find_library(name, top.kind, search)
+        if path is None:
+            continue
+        path = os.path.realpath(path)
+        if path not in libs:
+            libs.append(path)
+        deps = read_elf_deps(path)
+        if deps is not None:
+            # A library's own RUNPATH applies to its dependencies; the executable's RPATH to all
+            pending.extend((dep, deps.search + top.search) for dep in deps.needed)
+    return libs
+
+
+class LaunchStats:
+    """
+    Launch frequency and time-of-day statistics, persisted as JSON.
+
+    Each app keeps a decayed launch count and a 24-bucket hour histogram,
+    which together rank the apps most likely to be started next.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.apps: Dict[str, dict] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.apps = json.load(f).get("apps", {})
+        except (OSError, ValueError) as e:
+            print(f"Error reading launch stats: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"apps": self.apps}, indent=1)
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving launch stats: {e}")
+
+    def record(self, app: str, command: str):
+        now = time.time()
+        with self._lock:
+            entry = self.apps.setdefault(app, {"command": command, "count": 0.0, "hours": [0] * 24, "last": now})
+            # Decay the old count before adding this launch
+            elapsed_days = (now - entry.get("last", now)) / 86400
+            entry["count"] = entry["count"] * 0.5 ** (elapsed_days / _HALF_LIFE_DAYS) + 1
+            entry["hours"][time.localtime(now).tm_hour] += 1
+            entry["last"] = now
+            entry["command"] = command
+            self.dirty = True
+
+    def set_files(self, app: str, exe: str, mtime: float, files: List[str]):
+        """Cache the resolved file list so dependencies are only read again when the binary changes"""
+        with self._lock:
+            entry = self.apps.get(app)
+            if entry is not None:
+                entry["exe"] = exe
+                entry["exe_mtime"] = mtime
+                entry["files"] = files
+                self.dirty = True
+
+    def top(self, n: int, hour: Optional[int] = None) -> List[str]:
+        if hour is None:
+            hour = time.localtime().tm_hour
+        now = time.time()
+        scored = []
+        with self._lock:
+            for app, entry in self.apps.items():
+                decay = 0.5 ** ((now - entry.get("last", now)) / 86400 / _HALF_LIFE_DAYS)
+                hours = entry.get("hours", [0] * 24)
+                total = sum(hours) or 1
+                # Neighbouring hours count too: people do not launch on the hour
+                near = hours[hour] + 0.5 * (hours[(hour - 1) % 24] + hours[(hour + 1) % 24])
+                score = entry.get("count", 0) * decay * (1 + _HOUR_WEIGHT * near / total)
+                scored.append((score, app))
+        scored.sort(reverse=True)
+        return [app for score, app in scored[:n] if score > 0]
+
+
+class Prefetcher:
+    """
+    Warms the page cache for the apps the user is likely to start.
+
+    Runs on a background thread at idle IO priority and only issues
+    posix_fadvise(WILLNEED) hints, so the kernel reads ahead asynchronously.
+    Stops as soon as available memory drops under the configured floor, so
+    prefetching never pushes the user's working set out of RAM.
+    """
+
+    def __init__(self, stats: LaunchStats, top_n: int = 8, min_available_mb: int = 512,
+                 max_bytes_mb: int = 512):
+        self.stats = stats
+        self.top_n = top_n
+        self.min_available = min_available_mb * 1024 * 1024
+        self.max_bytes = max_bytes_mb * 1024 * 1024
+        self._thread = None
+        self.last_run = None
+
+    def memory_ok(self) -> bool:
+        available = available_memory()
+        return available is None or available >= self.min_available
+
+    def run_async(self) -> bool:
+        """Start a prefetch pass unless one is already running"""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        if not self.memory_ok():
+            return False
+        self._thread = threading.Thread(target=self.run, name="prefetch", daemon=True)
+        self._thread.start()
+        return True
+
+    def files_for(self, app: str) -> List[str]:
+        entry = self.stats.apps.get(app, {})
+        exe = resolve_executable(entry.get("command", ""))
+        if not exe:
+            return []
+        try:
+            mtime = os.stat(exe).st_mtime
+        except OSError:
+            return []
+        if entry.get("exe") == exe and entry.get("exe_mtime") == mtime and "files" in entry:
+            return entry["files"]
+        files = [exe] + shared_libraries(exe)
+        self.stats.set_files(app, exe, mtime, files)
+        return files
+
+    def run(self):
+        # ioprio applies per thread: only this worker is demoted
+        set_io_priority(0, "idle")
+        started = time.monotonic()
+        seen = set()
+        budget = self.max_bytes
+        warmed = 0
+        for app in self.stats.top(self.top_n):
+            for path in self.files_for(app):
+                if path in seen:
+                    continue
+                seen.add(path)
+                if budget <= 0 or not self.memory_ok():
+                    print("Prefetch stopped: memory pressure or byte budget reached")
+                    self._finish(started, warmed)
+                    return
+                warmed += 1
+                budget -= self._advise(path)
+        self._finish(started, warmed)
+
+    def _advise(self, path: str) -> int:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return 0
+        try:
+            size = os.fstat(fd).st_size
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            return size
+        except OSError:
+            return 0
+        finally:
+            os.close(fd)
+
+    def _finish(self, started: float, warmed: int):
+        self.last_run = time.time()
+        self.stats.save()
+        print(f"Prefetch: hinted {warmed} files in {(time.monotonic() - started) * 1000:.0f} ms")
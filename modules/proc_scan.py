@@ -0,0 +1,264 @@
+import array
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+# /proc/PID/stat fields after "(comm) ", numbered from 0 at the state field
+_STATE, _PPID, _UTIME, _STIME, _THREADS, _RSS = 0, 1, 11, 12, 17, 21
+
+
+def raise_fd_limit(wanted: int = 65536):
+    """
+    Raises this process's RLIMIT_NOFILE soft limit so a full keep_open scan
+    fits. Only for processes of their own (the task manager): children
+    inherit the limit, and select()-based programs break past FD_SETSIZE.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+        except (ValueError, OSError):
+            pass
+
+
+@dataclass
+class ScanDelta:
+    """Slots touched by one refresh. removed is applied before added: a freed slot may be reused at once."""
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+
+
+class ProcessScanner:
+    """
+    Incremental /proc scanner for a refresh every second or so.
+
+    Processes live in slots of array-backed columns (pid, cpu, rss_kb...),
+    freed slots are reused. Each refresh lists /proc once to find new and
+    exited PIDs, then re-reads only /proc/PID/stat of the known ones,
+    through a descriptor kept open since the process was first seen: a
+    pread() instead of open/read/close, and a PID reused by a new process
+    shows up as a failed read rather than as wrong numbers. A stat line
+    identical to the previous one is not parsed at all, which covers most
+    processes on an idle machine.
+
+    Kept descriptors count against RLIMIT_NOFILE; past it, processes are
+    read the slow way. A process that scans everything calls
+    raise_fd_limit() first, the scanner itself never changes the limit.
+
+    CPU percentages come from tick deltas between refreshes, 100 = one core
+    (as in top).
+    """
+
+    def __init__(self, root: str = "/proc", keep_open: bool = True):
+        self.root = root
+        self.keep_open = keep_open
+        self.slots: Dict[int, int] = {}  # pid -> slot
+        self.free: List[int] = []
+        self.pid = array.array("i")
+        self.ppid = array.array("i")
+        self.uid = array.array("i")
+        self.ticks = array.array("Q")
+        self.cpu = array.array("f")
+        self.rss_kb = array.array("Q")
+        self.threads = array.array("I")
+        self.state = bytearray()
+        self.stat_hash = array.array("q")
+        self.fds = array.array("i")
+        self.name: List[str] = []
+        self.command: List[str] = []
+        self.last_scan = None
+        self.total_cpu = 0.0  # all cores busy = 100
+        self.scan_ms = 0.0
+        self._cpu_times = None
+
+    def __len__(self):
+        return len(self.slots)
+
+    def slot_of(self, pid: int) -> Optional[int]:
+        return self.slots.get(pid)
+
+    def _read_stat(self, slot: int) -> Optional[bytes]:
+        fd = self.fds[slot]
+        try:
+            if fd >= 0:
+                return os.pread(fd, 1024, 0)
+            with open(os.path.join(self.root, str(self.pid[slot]), "stat"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None  # exited (ESRCH through a kept descriptor, ENOENT otherwise)
+
+    def _allocate(self, pid: int) -> Optional[int]:
+        path = os.path.join(self.root, str(pid))
+        fd = -1
+        try:
+            if self.keep_open:
+                try:
+                    fd = os.open(os.path.join(path, "stat"), os.O_RDONLY | os.O_CLOEXEC)
+                    uid = os.fstat(fd).st_uid
+                except OSError as e:
+                    if e.errno not in (24, 23):  # EMFILE/ENFILE: read this one the slow way
+                        return None
+                    fd = -1
+            if fd < 0:
+                uid = os.stat(path).st_uid
+            try:
+                with open(os.path.join(path, "cmdline"), "rb") as f:
+                    command = f.read(4096).rstrip(b"\0").replace(b"\0", b" ").decode("utf-8", "replace")
+            except OSError:
+                command = ""
+        except OSError:
+            if fd >= 0:
+                os.close(fd)
+            return None
+
+        if self.free:
+            slot = self.free.pop()
+            self.pid[slot], self.uid[slot], self.fds[slot] = pid, uid, fd
+            self.ppid[slot] = self.ticks[slot] = self.rss_kb[slot] = self.threads[slot] = 0
+            self.cpu[slot], self.stat_hash[slot], self.state[slot] = 0.0, 0, 0
+            self.name[slot], self.command[slot] = "", command
+        else:
+            slot = len(self.pid)
+            self.pid.append(pid)
+            self.uid.append(uid)
+            self.fds.append(fd)
+            for column in (self.ppid, self.ticks, self.rss_kb, self.threads, self.stat_hash):
+                column.append(0)
+            self.cpu.append(0.0)
+            self.state.append(0)
+            self.name.append("")
+            self.command.append(command)
+        self.slots[pid] = slot
+        return slot
+
+    def _release(self, slot: int):
+        del self.slots[self.pid[slot]]
+        if self.fds[slot] >= 0:
+            os.close(self.fds[slot])
+            self.fds[slot] = -1
+        self.free.append(slot)
+
+    def _update(self, slot: int, data: bytes, elapsed: Optional[float], new: bool) -> bool:
+        """Parses a stat line into the slot; True if a shown value changed"""
+        self.stat_hash[slot] = hash(data)
+        close = data.rindex(b")")
+        fields = data[close + 2:].split(b" ", _RSS + 1)
+        ticks = int(fields[_UTIME]) + int(fields[_STIME])
+        cpu = 0.0 if new or not elapsed else round((ticks - self.ticks[slot]) * 100.0 / CLK_TCK / elapsed, 1)
+        rss = int(fields[_RSS]) * PAGE_KB
+        changed = (new or cpu != self.cpu[slot] or rss != self.rss_kb[slot]
+                   or fields[_STATE][0] != self.state[slot] or int(fields[_THREADS]) != self.threads[slot])
+        self.ticks[slot] = ticks
+        self.cpu[slot] = cpu
+        self.rss_kb[slot] = rss
+        self.state[slot] = fields[_STATE][0]
+        self.threads[slot] = int(fields[_THREADS])
+        if new:
+            self.ppid[slot] = int(fields[_PPID])
+            self.name[slot] = data[data.index(b"(") + 1:close].decode("utf-8", "replace")
+            if not self.command[slot]:
+                self.command[slot] = f"[{self.name[slot]}]"  # kernel thread
+        return changed
+
+    def _read_total_cpu(self):
+        try:
+            with open(os.path.join(self.root, "stat"), "rb") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        total = sum(values[:8])
+        if self._cpu_times:
+            d_total = total - self._cpu_times[0]
+            d_idle = idle - self._cpu_times[1]
+            self.total_cpu = round(100.0 * (d_total - d_idle) / d_total, 1) if d_total > 0 else 0.0
+        self._cpu_times = (total, idle)
+
+    def refresh(self, pids: Optional[Iterable[int]] = None) -> ScanDelta:
+        """One pass over /proc; with pids, only those processes are tracked (no directory listing)."""
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self.last_scan if self.last_scan else None
+        self.last_scan = now
+        delta = ScanDelta()
+
+        if pids is not None:
+            listed = set(pids)
+        else:
+            try:
+                listed = {int(name) for name in os.listdir(self.root) if name.isdigit()}
+            except OSError:
+                listed = set()
+        for pid in [pid for pid in self.slots if pid not in listed]:
+            slot = self.slots[pid]
+            self._release(slot)
+            delta.removed.append(slot)
+
+        # The hot loop: one pread per process, parsing only lines that differ from last time
+        pread, fds, hashes, cpu = os.pread, self.fds, self.stat_hash, self.cpu
+        exited = []
+        for slot in self.slots.values():
+            fd = fds[slot]
+            try:
+                data = pread(fd, 1024, 0) if fd >= 0 else self._read_stat(slot)
+            except OSError:
+                data = None  # exited: ESRCH through the kept descriptor
+            if data is None:
+                exited.append(slot)
+            elif hash(data) != hashes[slot]:
+                if self._update(slot, data, elapsed, False):
+                    delta.changed.append(slot)
+            elif cpu[slot]:
+                cpu[slot] = 0.0  # no new ticks since the last refresh
+                delta.changed.append(slot)
+        for slot in exited:
+            self._release(slot)
+            delta.removed.append(slot)
+
+        # New PIDs, and PIDs whose old process exited and was replaced since the last refresh
+        for pid in listed:
+            if pid in self.slots:
+                continue
+            slot = self._allocate(pid)
+            if slot is None:
+                continue
+            data = self._read_stat(slot)
+            if data is None:
+                self._release(slot)
+                continue
+            self._update(slot, data, elapsed, True)
+            delta.added.append(slot)
+
+        if pids is None:
+            self._read_total_cpu()
+        self.scan_ms = (time.perf_counter() - started) * 1000
+        return delta
+
+    def close(self):
+        for slot in list(self.slots.values()):
+            self._release(slot)
+
+
+if __name__ == "__main__":
+    # python3 -m modules.proc_scan [seconds]: per-refresh cost on this machine
+    raise_fd_limit()
+    scanner = ProcessScanner()
+    scanner.refresh()
+    costs = []
+    for _ in range(int(sys.argv[1]) if len(sys.argv) > 1 else 5):
+        time.sleep(1)
+        cpu_before = time.process_time()
+        delta = scanner.refresh()
+        costs.append((time.process_time() - cpu_before) * 1000)
+        print(f"{len(scanner)} processes, +{len(delta.added)} -{len(delta.removed)} ~{len(delta.changed)}, "
+              f"{scanner.scan_ms:.1f} ms, system CPU {scanner.total_cpu}%")
+    print(f"Scanner CPU: {sum(costs) / len(costs):.1f} ms per refresh")
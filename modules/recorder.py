@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from dataclasses import asdict
+from typing import Iterator, Optional
+
+FORMAT_VERSION = 1
+
+
+class Recorder:
+    """
+    Writes a timestamped JSON-lines log of everything that drives the shell:
+
+        {"t": 0.0,   "kind": "meta",   "version": 1, "started": <unix time>}
+        {"t": 0.01,  "kind": "window", "event": "snapshot", "windows": [...]}
+        {"t": 1.52,  "kind": "bridge", "message": "{\"action\": ...}"}
+        {"t": 1.53,  "kind": "js",     "script": "updateRunningIndicators(...)"}
+        {"t": 2.10,  "kind": "window", "event": "opened", "info": {...}}
+
+    "t" is seconds since the recording started (monotonic clock). Lines are
+    flushed as they are written so a crash still leaves a usable log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "w", buffering=1)
+        self._write({"kind": "meta", "version": FORMAT_VERSION, "started": time.time()})
+
+    def _write(self, record: dict):
+        record["t"] = round(time.monotonic() - self.started, 6)
+        line = json.dumps(record)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    def bridge(self, message: str):
+        self._write({"kind": "bridge", "message": message})
+
+    def js(self, script: str):
+        self._write({"kind": "js", "script": script})
+
+    def window_snapshot(self, windows):
+        self._write({"kind": "window", "event": "snapshot", "windows": [asdict(w) for w in windows]})
+
+    def window_event(self, event: str, payload):
+        """Listener for WindowBackend.connect()"""
+        record = {"kind": "window", "event": event}
+        if hasattr(payload, "xid"):
+            record["info"] = asdict(payload)
+        else:
+            record["xid"] = payload
+        self._write(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str) -> Iterator[dict]:
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def open_recorder(path: Optional[str]) -> Optional[Recorder]:
+    if not path:
+        return None
+    try:
+        recorder = Recorder(path)
+    except OSError as e:
+        print(f"Recording disabled, cannot open {path}: {e}")
+        return None
+    print(f"Recording bridge and window events to {path}")
+    return recorder
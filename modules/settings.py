@@ -0,0 +1,262 @@
+import json
+import os
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+# Top-level config.json keys and the types they may hold. Unknown keys are kept
+# as they are (newer shells, user notes); known ones of the wrong type are dropped.
+CONFIG_SCHEMA = {
+    "wallpaper": (str,),
+    "window_backend": (str,),
+    "record": (str, type(None)),
+    "multi_monitor": (bool,),
+    "autostart": (dict,),
+    "prefetch": (dict,),
+    "memory": (dict,),
+    "frame_monitor": (dict,),
+    "power_mode": (dict,),
+    "window_previews": (dict,),
+    "desktop_icons": (dict,),
+    "file_search": (dict,),
+    "status": (dict,),
+    "dock_usage": (dict,),
+    "wallpapers": (dict,),
+    "dev": (dict,),
+    "frontend": (dict,),
+}
+
+
+def state_path(name: str) -> str:
+    """A file the shell keeps between sessions (statistics, the saved session), under $XDG_STATE_HOME"""
+    state = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    directory = os.path.join(state, "opendesktop")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def cache_path(name: str) -> str:
+    """A file that can be deleted at any time and is rebuilt, under $XDG_CACHE_HOME"""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    directory = os.path.join(cache, "opendesktop")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+DOCK_REQUIRED = {"id": str, "name": str, "icon": str, "exec": str}
+DOCK_OPTIONAL = {"FilePathBased": bool, "profile": str}
+
+
+def validate_config(data) -> Tuple[dict, List[str]]:
+    if not isinstance(data, dict):
+        return {}, ["config.json must hold an object"]
+    clean, errors = {}, []
+    for key, value in data.items():
+        allowed = CONFIG_SCHEMA.get(key)
+        if allowed and not isinstance(value, allowed):
+            errors.append(f"config.json: '{key}' should be {' or '.join(t.__name__ for t in allowed)}")
+            continue
+        clean[key] = value
+    return clean, errors
+
+
+def validate_dock(data) -> Tuple[list, List[str]]:
+    if not isinstance(data, list):
+        return [], ["dock.json must hold a list"]
+    clean, errors, seen = [], [], set()
+    for i, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            errors.append(f"dock.json[{i}]: not an object")
+            continue
+        bad = [k for k, t in DOCK_REQUIRED.items() if not isinstance(entry.get(k), t)]
+        bad += [k for k, t in DOCK_OPTIONAL.items() if k in entry and not isinstance(entry[k], t)]
+        if bad:
+            errors.append(f"dock.json[{i}]: missing or invalid {', '.join(bad)}")
+            continue
+        if entry["id"] in seen:
+            errors.append(f"dock.json[{i}]: duplicate id '{entry['id']}'")
+            continue
+        seen.add(entry["id"])
+        clean.append(dict(entry))
+    return clean, errors
+
+
+class SettingsFile:
+    """
+    One JSON settings file held in memory. data is updated in place on reload,
+    so references handed out stay current. Changes are written after a short
+    debounce, atomically (temp file in the same directory, then rename); the
+    bytes last written are remembered so our own writes are not mistaken for
+    external edits by the file monitor.
+
+    While the file on disk has errors (unparsable, or entries the validator
+    rejected), nothing is written: data lacks the rejected parts, and saving
+    it would delete them from the file for good. Changes made meanwhile last
+    for the session only.
+    """
+
+    def __init__(self, path: str, validator: Callable, empty: type, writable: bool = True,
+                 save_delay_ms: int = 500):
+        self.path = path
+        self.validator = validator
+        self.data = empty()
+        self.writable = writable
+        self.save_delay_ms = save_delay_ms
+        self.save_id = None
+        self.reload_id = None
+        self.monitor = None
+        self._last_bytes = None
+        self.invalid = False  # the file on disk had errors when last read
+        self.load()
+
+    def _replace(self, new):
+        if isinstance(self.data, dict):
+            self.data.clear()
+            self.data.update(new)
+        else:
+            self.data[:] = new
+
+    def load(self) -> bool:
+        """Reads the file; returns True if the content differs from what we hold"""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = None
+        except OSError as e:
+            print(f"Error reading {os.path.basename(self.path)}: {e}")
+            return False
+        if raw == self._last_bytes:
+            return False
+        if raw is None:
+            new = type(self.data)()
+            self.invalid = False
+        else:
+            try:
+                new, errors = self.validator(json.loads(raw))
+            except ValueError as e:
+                # Often an editor midway through saving; the next change event retries
+                print(f"Ignoring {os.path.basename(self.path)}: {e}")
+                self.invalid = True
+                return False
+            for error in errors:
+                print(error)
+            self.invalid = bool(errors)
+        self._last_bytes = raw
+        if new == self.data:
+            return False
+        self._replace(new)
+        return True
+
+    def changed(self):
+        """Marks data as modified; it is written once edits pause"""
+        if not self.writable:
+            return
+        if self.save_id is None:
+            from gi.repository import GLib
+            self.save_id = GLib.timeout_add(self.save_delay_ms, self.save)
+
+    def save(self):
+        if self.save_id is not None:
+            from gi.repository import GLib
+            GLib.source_remove(self.save_id)
+            self.save_id = None
+        if self.invalid:
+            print(f"Not saving {os.path.basename(self.path)}: it has errors that saving would erase; fix it by hand")
+            return False
+        raw = (json.dumps(self.data, indent=4) + "\n").encode("utf-8")
+        if raw == self._last_bytes:
+            return False
+        directory = os.path.dirname(self.path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(self.path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(tmp_path, self.path)
+            self._last_bytes = raw
+        except OSError as e:
+            print(f"Error saving {os.path.basename(self.path)}: {e}")
+        return False
+
+    def watch(self, on_external_change: Callable[[object], None]):
+        """Reloads after edits by other programs; on_external_change gets the previous data."""
+        from gi.repository import Gio, GLib
+
+        def on_changed(monitor, file, other_file, event_type):
+            if event_type in (Gio.FileMonitorEvent.CHANGED, Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+                return  # wait for CHANGES_DONE_HINT
+            if self.reload_id is not None:
+                GLib.source_remove(self.reload_id)
+            self.reload_id = GLib.timeout_add(200, reload)
+
+        def reload():
+            self.reload_id = None
+            previous = json.loads(json.dumps(self.data))
+            if self.load():
+                on_external_change(previous)
+            return False
+
+        self.monitor = Gio.File.new_for_path(self.path).monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        self.monitor.connect("changed", on_changed)
+
+
+class SettingsStore:
+    """config.json and dock.json, validated and cached; nothing on a hot path reads the disk."""
+
+    def __init__(self, base_dir: str, writable: bool = True):
+        self.config = SettingsFile(os.path.join(base_dir, "config.json"), validate_config, dict, writable)
+        self.dock = SettingsFile(os.path.join(base_dir, "dock.json"), validate_dock, list, writable)
+
+    def watch(self, on_config: Callable[[dict], None], on_dock: Callable[[list], None]):
+        try:
+            self.config.watch(on_config)
+            self.dock.watch(on_dock)
+        except Exception as e:
+            print(f"Settings file monitor unavailable: {e}")
+
+    def set(self, key: str, value):
+        clean, errors = validate_config({key: value})
+        if errors:
+            raise ValueError(errors[0])
+        if self.config.data.get(key) != value or key not in self.config.data:
+            self.config.data.update(clean)
+            self.config.changed()
+
+    def dock_index(self, app_id: str) -> Optional[int]:
+        return next((i for i, entry in enumerate(self.dock.data) if entry["id"] == app_id), None)
+
+    def pin(self, entry: dict, index: Optional[int] = None) -> Optional[int]:
+        """Adds entry at index (the end by default); None if invalid or already pinned"""
+        clean, errors = validate_dock([entry])
+        if errors or self.dock_index(entry["id"]) is not None:
+            return None
+        index = len(self.dock.data) if index is None else max(0, min(index, len(self.dock.data)))
+        self.dock.data.insert(index, clean[0])
+        self.dock.changed()
+        return index
+
+    def unpin(self, app_id: str) -> Optional[int]:
+        index = self.dock_index(app_id)
+        if index is not None:
+            del self.dock.data[index]
+            self.dock.changed()
+        return index
+
+    def move(self, app_id: str, index: int) -> Optional[int]:
+        current = self.dock_index(app_id)
+        if current is None:
+            return None
+        index = max(0, min(index, len(self.dock.data) - 1))
+        if index != current:
+            self.dock.data.insert(index, self.dock.data.pop(current))
+            self.dock.changed()
+        return index
+
+    def flush(self):
+        """Writes pending changes now (shutdown)"""
+        for settings in (self.config, self.dock):
+            if settings.save_id is not None:
+                settings.save()
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from modules.milestones import milestone
+
+
+class StartupStages:
+    """
+    Busy time of each startup stage. A stage may run as several main loop
+    callbacks; only the time spent inside them counts, not the waits between.
+
+        show      window, primary WebView and the cached last-known UI
+        windows   window tracking and login apps
+        services  secondary monitor views, app index, icons, file search, status sources, monitors
+    """
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.busy_ms: Dict[str, float] = {}
+
+    def run(self, name: str, step: Callable[[], None]):
+        started = time.perf_counter()
+        try:
+            step()
+        finally:
+            self.busy_ms[name] = self.busy_ms.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def done(self, name: str):
+        milestone(f"startup-{name}")
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.busy_ms.items())
+        return f"Startup: {stages} (all up {(time.monotonic() - self.created) * 1000:.0f} ms after launch)"
+
+
+class UICache:
+    """
+    The dock and start menu as last shown, with icons already resolved, so a
+    new session can paint them before anything is scanned. Stale entries are
+    harmless: the real lists replace them once the scan has run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {}
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.data = data
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring {os.path.basename(path)}: {e}")
+
+    def dock(self, source: list) -> Optional[List[dict]]:
+        """Cached resolved dock, if it was built from the same dock.json entries"""
+        if self.data.get("dock_source") == source and isinstance(self.data.get("dock"), list):
+            return [dict(app) for app in self.data["dock"]]
+        return None
+
+    def apps(self) -> Optional[List[dict]]:
+        apps = self.data.get("apps")
+        return list(apps) if isinstance(apps, list) else None
+
+    def save(self, dock_source: list, dock: List[dict], apps: List[dict]):
+        data = {"dock_source": dock_source, "dock": dock, "apps": apps}
+        if data == self.data:
+            return
+        directory = os.path.dirname(self.path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self.data = json.loads(json.dumps(data))
+        except OSError as e:
+            print(f"Error saving {os.path.basename(self.path)}: {e}")
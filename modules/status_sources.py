@@ -0,0 +1,329 @@
+import os
+import socket
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+from modules.power_mode import read_power_state, POWER_SUPPLY_ROOT
+
+NETLINK_KOBJECT_UEVENT = 15  # not exported by the socket module
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+
+NET_ROOT = "/sys/class/net"
+
+
+class StatusSource:
+    """
+    One taskbar indicator, driven by a file descriptor the caller's main loop
+    watches (GLib.io_add_watch in desktop.py); nothing here polls.
+
+    fileno() is the descriptor (None: no event source, refresh it by hand).
+    urgent is True for descriptors that signal with POLLPRI rather than
+    POLLIN. drain() consumes what is readable and says whether state() may
+    have changed; state() reads the current value, or None to hide the
+    indicator.
+    """
+
+    name = "base"
+    urgent = False
+
+    def fileno(self) -> Optional[int]:
+        return None
+
+    def drain(self) -> bool:
+        return True
+
+    def state(self) -> Optional[dict]:
+        return None
+
+    def close(self):
+        pass
+
+
+class _NetlinkSource(StatusSource):
+    protocol = 0
+    groups = 0
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK, self.protocol)
+        self.sock.bind((0, self.groups))
+
+    def fileno(self):
+        return self.sock.fileno() if self.sock else None
+
+    def _messages(self) -> List[bytes]:
+        messages = []
+        while True:
+            try:
+                messages.append(self.sock.recv(65536))
+            except BlockingIOError:
+                return messages
+            except OSError as e:
+                # ENOBUFS: we fell behind and lost messages; a re-read covers it
+                print(f"{self.name} netlink: {e}")
+                return messages or [b""]
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class BatterySource(_NetlinkSource):
+    """
+    Kernel uevents for the power_supply class. sysfs attributes never raise
+    inotify events, but drivers send a "change" uevent on plug/unplug, status
+    changes and capacity steps.
+    """
+
+    name = "battery"
+    protocol = NETLINK_KOBJECT_UEVENT
+    groups = 1
+
+    def __init__(self, root: str = POWER_SUPPLY_ROOT):
+        super().__init__()
+        self.root = root
+
+    def drain(self) -> bool:
+        return any(b"SUBSYSTEM=power_supply" in m or not m for m in self._messages())
+
+    def state(self):
+        power = read_power_state(self.root)
+        if not power.has_battery:
+            return None
+        return {"percent": power.capacity, "charging": power.charging, "on_battery": power.on_battery}
+
+
+class NetworkSource(_NetlinkSource):
+    """rtnetlink link, address and route notifications; the state itself comes from sysfs and /proc"""
+
+    name = "network"
+    protocol = socket.NETLINK_ROUTE
+    groups = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+
+    def drain(self) -> bool:
+        return bool(self._messages())
+
+    @staticmethod
+    def _default_route() -> Optional[str]:
+        try:
+            with open("/proc/net/route", "r") as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 2 and fields[1] == "00000000":
+                        return fields[0]
+        except (OSError, StopIteration):
+            pass
+        try:
+            with open("/proc/net/ipv6_route", "r") as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) == 10 and fields[0] == "0" * 32 and fields[1] == "00" and fields[9] != "lo":
+                        return fields[9]
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def _link_up() -> Optional[str]:
+        names = sorted(os.listdir(NET_ROOT)) if os.path.isdir(NET_ROOT) else []
+        return next((n for n in names if n != "lo" and _read(os.path.join(NET_ROOT, n, "operstate")) == "up"), None)
+
+    def state(self):
+        interface = self._default_route()
+        online = interface is not None
+        if not online:
+            # No route out: a link that is up still shows as connected (locally)
+            interface = self._link_up()
+        if interface is None:
+            return {"kind": "offline", "interface": None, "online": False}
+        wireless = os.path.isdir(os.path.join(NET_ROOT, interface, "wireless"))
+        return {"kind": "wifi" if wireless else "wired", "interface": interface, "online": online}
+
+
+class PactlVolumeSource(StatusSource):
+    """
+    PulseAudio/PipeWire through one long-lived `pactl subscribe`. A helper
+    thread reads its events and, on sink or server changes, runs the pactl
+    queries for the default sink; only the result crosses back, through a
+    pipe the main loop watches. The main loop itself never waits on pactl.
+    """
+
+    name = "volume"
+
+    def __init__(self):
+        self.process = subprocess.Popen(["pactl", "subscribe"], stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self.current: Optional[dict] = None
+        # The wake pipe is closed by whichever finishes last, close() or the helper thread
+        self._lock = threading.Lock()
+        self._closed = self._finished = False
+        self._thread = threading.Thread(target=self._run, name="pactl-volume", daemon=True)
+        self._thread.start()
+
+    def fileno(self):
+        return self._wake_r if self.process else None
+
+    def drain(self) -> bool:
+        try:
+            return bool(os.read(self._wake_r, 4096))
+        except BlockingIOError:
+            return False
+
+    def state(self):
+        return self.current
+
+    @staticmethod
+    def _relevant(line: bytes) -> bool:
+        # "Event 'change' on sink #0" and "... on server #-1"; sink-input events fire all through playback
+        return b" on sink #" in line or b" on server" in line
+
+    def _read_volume(self) -> Optional[dict]:
+        try:
+            volume = subprocess.run(["pactl", "get-sink-volume", "@DEFAULT_SINK@"], capture_output=True,
+                                    text=True, timeout=2).stdout
+            mute = subprocess.run(["pactl", "get-sink-mute", "@DEFAULT_SINK@"], capture_output=True,
+                                  text=True, timeout=2).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        percents = [int(word[:-1]) for word in volume.split() if word.endswith("%") and word[:-1].isdigit()]
+        if not percents:
+            return None
+        return {"percent": max(percents), "muted": "yes" in mute.lower()}
+
+    def _post(self, state: Optional[dict]):
+        if state == self.current:
+            return
+        self.current = state
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass  # closed meanwhile
+
+    def _run(self):
+        try:
+            self._watch(self.process)
+        finally:
+            with self._lock:
+                self._finished = True
+                if self._closed:
+                    self._close_pipe()
+
+    def _watch(self, process):
+        self._post(self._read_volume())
+        fd = process.stdout.fileno()
+        partial = b""
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            # Everything queued up since the last read (a volume slider sends bursts) costs one query
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()
+            if any(self._relevant(line) for line in lines):
+                self._post(self._read_volume())
+        if self.process is process:
+            print("pactl subscribe exited; volume indicator stopped")
+            self._post(None)
+
+    def close(self):
+        if self.process:
+            process, self.process = self.process, None
+            process.terminate()
+            process.wait()
+            # The thread may still be posting a result (a query times out after 2 s): it closes the pipe then
+            with self._lock:
+                self._closed = True
+                if self._finished:
+                    self._close_pipe()
+
+    def _close_pipe(self):
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class DiskSource(StatusSource):
+    """
+    Free space on the given mount points. statvfs has no change notification:
+    /proc/self/mounts signals POLLPRI when something is mounted or unmounted,
+    and the caller refreshes it on a slow timer otherwise.
+    """
+
+    name = "disk"
+    urgent = True
+
+    def __init__(self, paths: Optional[List[str]] = None, low_percent: float = 10):
+        self.paths = [os.path.expanduser(p) for p in (paths or ["/", "~"])]
+        self.low_percent = low_percent
+        self.mounts = open("/proc/self/mounts", "r")
+
+    def fileno(self):
+        return self.mounts.fileno() if self.mounts else None
+
+    def drain(self) -> bool:
+        self.mounts.seek(0)
+        self.mounts.read()  # re-arms the notification
+        return True
+
+    def state(self):
+        disks = []
+        seen = set()
+        for path in self.paths:
+            try:
+                device = os.stat(path).st_dev
+                stats = os.statvfs(path)
+            except OSError:
+                continue
+            if device in seen or not stats.f_blocks:
+                continue
+            seen.add(device)
+            free = stats.f_bavail * stats.f_frsize
+            percent = round(100.0 * stats.f_bavail / stats.f_blocks, 1)
+            disks.append({"path": path, "free_bytes": free, "free_percent": percent,
+                          "low": percent < self.low_percent})
+        return {"disks": disks, "low": any(d["low"] for d in disks)}
+
+    def close(self):
+        if self.mounts:
+            self.mounts.close()
+            self.mounts = None
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+VOLUME_SOURCES = {"pactl": PactlVolumeSource}
+
+
+def create_sources(config: Dict) -> List[StatusSource]:
+    """The indicators enabled in config.json's "status" section; unavailable ones are skipped"""
+    factories = [
+        ("battery", BatterySource),
+        ("network", NetworkSource),
+        ("volume", VOLUME_SOURCES.get(config.get("volume_source", "pactl"))),
+        ("disk", lambda: DiskSource(config.get("disk_paths"), config.get("disk_low_percent", 10))),
+    ]
+    sources = []
+    for name, factory in factories:
+        if factory is None or name in config.get("disabled", []):
+            continue
+        try:
+            sources.append(factory())
+        except OSError as e:
+            print(f"Status indicator '{name}' unavailable: {e}")
+    return sources
@@ -0,0 +1,206 @@
+import os
+import platform
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+def _read_first_line(path: str, default: str = "Unknown") -> str:
+    """Return the stripped first line of a small sysfs/procfs file"""
+    try:
+        with open(path, "r") as f:
+            return f.readline().strip() or default
+    except OSError:
+        return default
+
+
+def _read_meminfo() -> dict:
+    """Parse /proc/meminfo into a dict of byte values"""
+    values = {}
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                parts = rest.split()
+                if parts:
+                    values[key] = int(parts[0]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def _read_cpu_times() -> Optional[tuple]:
+    """Return (idle, total) jiffies from the aggregate cpu line of /proc/stat"""
+    try:
+        with open("/proc/stat", "r") as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return idle, sum(fields)
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "Unknown CPU"
+
+
+def _cpu_freq_mhz() -> Optional[float]:
+    khz = _read_first_line("/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq", "")
+    if khz.isdigit():
+        return int(khz) / 1000
+    return None
+
+
+def _root_mount() -> tuple:
+    """Return (device, fstype) for the / mount"""
+    root = ("Unknown", "Unknown")
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                parts = line.split()
+                # Last match wins, mirroring how overmounts shadow earlier entries
+                if len(parts) >= 3 and parts[1] == "/":
+                    root = (parts[0], parts[2])
+    except OSError:
+        pass
+    return root
+
+
+def _primary_ip() -> str:
+    # connect() on a UDP socket only selects a route, nothing is sent
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+        finally:
+            s.close()
+    except OSError:
+        return "Unknown"
+
+
+def _network_interfaces() -> list:
+    try:
+        return sorted(os.listdir("/sys/class/net"))
+    except OSError:
+        return []
+
+
+def _primary_mac(interfaces: list) -> str:
+    for iface in interfaces:
+        if iface == "lo":
+            continue
+        mac = _read_first_line(f"/sys/class/net/{iface}/address", "")
+        if mac and mac != "00:00:00:00:00:00":
+            return mac
+    return "Unknown"
+
+
+class SystemInfoCollector:
+    """
+    Lightweight replacement for the data gathering in apps/apps/aboutpc.py.
+
+    Everything is read straight from /proc and /sys so the desktop process can
+    answer the "About this PC" panel without psutil or a second GUI toolkit.
+    Static facts are gathered once; dynamic values are cheap enough to be
+    sampled every couple of seconds while the panel is visible.
+    """
+
+    def __init__(self, os_name: str = "OpenDesktop"):
+        self.os_name = os_name
+        self._static = None
+        self._last_cpu = _read_cpu_times()
+
+    def static_info(self) -> dict:
+        """System facts that do not change while the session is running"""
+        if self._static is not None:
+            return self._static
+
+        system = platform.system()
+        release = platform.release()
+        version = platform.version()
+        if system == "Linux":
+            title, version_text = "Linux", f"{release} ({version})"
+        else:
+            title, version_text = f"{system} {release}", version
+
+        meminfo = _read_meminfo()
+        interfaces = _network_interfaces()
+        hostname = socket.gethostname()
+        device, fstype = _root_mount()
+
+        self._static = {
+            "os_name": self.os_name,
+            "system_title": title,
+            "version": version_text,
+            "model": _read_first_line("/sys/class/dmi/id/product_name"),
+            "cpu": _cpu_model(),
+            "cpu_cores": os.cpu_count() or 0,
+            "memory_total": meminfo.get("MemTotal", 0),
+            "swap_total": meminfo.get("SwapTotal", 0),
+            "disk_device": device,
+            "disk_fstype": fstype,
+            "hostname": hostname,
+            "full_name": hostname,
+            "workgroup": "WORKGROUP",
+            "mac": _primary_mac(interfaces),
+            "interface_count": len(interfaces),
+        }
+        return self._static
+
+    def dynamic_info(self) -> dict:
+        """Values that are refreshed while the panel is open"""
+        cpu_percent = 0.0
+        current = _read_cpu_times()
+        if current and self._last_cpu:
+            idle_delta = current[0] - self._last_cpu[0]
+            total_delta = current[1] - self._last_cpu[1]
+            if total_delta > 0:
+                cpu_percent = 100.0 * (1.0 - idle_delta / total_delta)
+        self._last_cpu = current
+
+        meminfo = _read_meminfo()
+        mem_total = meminfo.get("MemTotal", 0)
+        mem_available = meminfo.get("MemAvailable", 0)
+
+        disk = {"disk_total": 0, "disk_free": 0, "disk_percent": 0}
+        try:
+            st = os.statvfs("/")
+            total = st.f_blocks * st.f_frsize
+            free = st.f_bavail * st.f_frsize
+            disk = {
+                "disk_total": total,
+                "disk_free": free,
+                "disk_percent": round(100.0 * (total - free) / total, 1) if total else 0,
+            }
+        except OSError:
+            pass
+
+        uptime_seconds = 0.0
+        try:
+            with open("/proc/uptime", "r") as f:
+                uptime_seconds = float(f.readline().split()[0])
+        except (OSError, ValueError, IndexError):
+            pass
+        boot_time = time.time() - uptime_seconds
+
+        info = {
+            "cpu_percent": round(cpu_percent, 1),
+            "cpu_freq_mhz": _cpu_freq_mhz(),
+            "memory_available": mem_available,
+            "memory_cached": meminfo.get("Cached", 0),
+            "memory_percent": round(100.0 * (mem_total - mem_available) / mem_total, 1) if mem_total else 0,
+            "uptime": str(timedelta(seconds=int(uptime_seconds))),
+            "boot_time": datetime.fromtimestamp(boot_time).strftime("%Y-%m-%d %H:%M:%S"),
+            "ip": _primary_ip(),
+        }
+        info.update(disk)
+        return info
@@ -0,0 +1,288 @@
+import configparser
+import glob
+import hashlib
+import mimetypes
+import os
+import queue
+import shlex
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from modules.launch_profiles import set_io_priority
+
+# Freedesktop thumbnail spec sizes: directory name -> edge length in pixels
+SIZES = {"normal": 128, "large": 256, "x-large": 512, "xx-large": 1024}
+
+FAIL_DIR_NAME = "opendesktop"
+
+THUMBNAILER_DIRS = ["/usr/share/thumbnailers", "/usr/local/share/thumbnailers",
+                    os.path.expanduser("~/.local/share/thumbnailers")]
+
+
+def thumbnail_root() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "thumbnails")
+
+
+def file_uri(path: str) -> str:
+    """The canonical URI the spec hashes: file:// plus the percent-encoded absolute path"""
+    return "file://" + quote(os.path.abspath(path), safe="/")
+
+
+def thumbnail_path(path: str, size: str = "large", root: Optional[str] = None) -> str:
+    digest = hashlib.md5(file_uri(path).encode("utf-8")).hexdigest()
+    return os.path.join(root or thumbnail_root(), size, f"{digest}.png")
+
+
+def failure_path(path: str, root: Optional[str] = None) -> str:
+    digest = hashlib.md5(file_uri(path).encode("utf-8")).hexdigest()
+    return os.path.join(root or thumbnail_root(), "fail", FAIL_DIR_NAME, f"{digest}.png")
+
+
+def read_png_text(path: str) -> Dict[str, str]:
+    """tEXt chunks of a PNG, read up to the first IDAT (the spec's keys live before the image data)"""
+    chunks = {}
+    try:
+        with open(path, "rb") as f:
+            if f.read(8) != b"\x89PNG\r\n\x1a\n":
+                return chunks
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                length, kind = struct.unpack(">I4s", header)
+                if kind in (b"IDAT", b"IEND"):
+                    break
+                data = f.read(length)
+                f.seek(4, os.SEEK_CUR)  # CRC
+                if kind == b"tEXt" and b"\0" in data:
+                    key, value = data.split(b"\0", 1)
+                    chunks[key.decode("latin-1")] = value.decode("latin-1")
+    except OSError:
+        pass
+    return chunks
+
+
+def is_valid(thumb: str, path: str, mtime: int, size: Optional[int] = None) -> bool:
+    """Matches the file's URI and mtime, and its size when the thumbnail records one (Thumb::Size is optional)"""
+    text = read_png_text(thumb)
+    if size is not None and text.get("Thumb::Size", str(size)) != str(size):
+        return False
+    return text.get("Thumb::URI") == file_uri(path) and text.get("Thumb::MTime") == str(mtime)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _atomic_write(target: str, data: bytes):
+    """Writes into the target's directory and renames, so other apps never read half a thumbnail"""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".opendesktop-", suffix=".png")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, target)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def record_failure(path: str, mtime: int, root: Optional[str] = None):
+    """1x1 PNG under fail/, so neither we nor other apps retry a file that cannot be thumbnailed"""
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0)
+    text = [_png_chunk(b"tEXt", f"{k}\0{v}".encode("latin-1", "replace"))
+            for k, v in (("Thumb::URI", file_uri(path)), ("Thumb::MTime", str(mtime)))]
+    png = (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", ihdr) + b"".join(text)
+           + _png_chunk(b"IDAT", zlib.compress(b"\0\0\0\0\0")) + _png_chunk(b"IEND", b""))
+    _atomic_write(failure_path(path, root), png)
+
+
+def guess_mime(path: str) -> str:
+    mime, _ = mimetypes.guess_type(path, strict=False)
+    return mime or "application/octet-stream"
+
+
+class Thumbnailers:
+    """System thumbnailers from /usr/share/thumbnailers (the same ones file managers use)"""
+
+    def __init__(self, dirs: Optional[List[str]] = None):
+        self.by_mime: Dict[str, str] = {}
+        for directory in dirs or THUMBNAILER_DIRS:
+            for path in sorted(glob.glob(os.path.join(directory, "*.thumbnailer"))):
+                parser = configparser.ConfigParser(interpolation=None)
+                try:
+                    parser.read(path)
+                    section = parser["Thumbnailer Entry"]
+                    command = section.get("Exec") or section.get("TryExec")
+                    mimes = section.get("MimeType", "")
+                except (configparser.Error, KeyError):
+                    continue
+                if not command or not shutil.which(shlex.split(command)[0]):
+                    continue
+                for mime in filter(None, mimes.split(";")):
+                    self.by_mime.setdefault(mime, command)
+
+    def command_for(self, mime: str) -> Optional[str]:
+        return self.by_mime.get(mime)
+
+    def run(self, mime: str, path: str, output: str, size: int, timeout: float = 20) -> bool:
+        command = self.by_mime.get(mime)
+        if not command:
+            return False
+        fields = {"%i": path, "%o": output, "%s": str(size), "%u": file_uri(path), "%%": "%"}
+        argv = [fields.get(arg, arg) for arg in shlex.split(command)]
+        try:
+            subprocess.run(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=timeout, check=True)
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return os.path.exists(output) and os.path.getsize(output) > 0
+
+
+class ThumbnailService:
+    """
+    Looks up and creates thumbnails in the shared ~/.cache/thumbnails cache
+    (freedesktop thumbnail spec), so work done by file managers is reused and
+    ours is reused by them.
+
+    request() never blocks: files go to a small pool of worker threads
+    running at idle I/O priority, and on_ready(path, thumbnail or None) is
+    called from a worker as each one completes. Images are scaled in-process
+    with GdkPixbuf; everything else (PDF, video...) goes through the
+    system's .thumbnailer entries.
+    """
+
+    def __init__(self, on_ready: Callable[[str, Optional[str]], None], size: str = "large",
+                 workers: int = 2, root: Optional[str] = None):
+        self.on_ready = on_ready
+        self.size = size
+        self.pixels = SIZES[size]
+        self.root = root or thumbnail_root()
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._thumbnailers = None
+
+    @property
+    def thumbnailers(self) -> Thumbnailers:
+        if self._thumbnailers is None:
+            self._thumbnailers = Thumbnailers()
+        return self._thumbnailers
+
+    def can_thumbnail(self, mime: str) -> bool:
+        return mime.startswith("image/") or self.thumbnailers.command_for(mime) is not None
+
+    def request(self, paths: List[str]):
+        with self._lock:
+            for path in paths:
+                if path not in self._pending:
+                    self._pending.add(path)
+                    self.queue.put(path)
+            while len(self._threads) < self.workers and len(self._threads) < len(self._pending):
+                thread = threading.Thread(target=self._run, name=f"thumbnailer-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def lookup(self, path: str) -> Optional[str]:
+        """A valid cached thumbnail (ours or another app's), at our size or larger"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        names = list(SIZES)
+        for size in names[names.index(self.size):]:
+            thumb = thumbnail_path(path, size, self.root)
+            if os.path.exists(thumb) and is_valid(thumb, path, int(st.st_mtime), st.st_size):
+                return thumb
+        return None
+
+    def _run(self):
+        set_io_priority(0, "idle")
+        while True:
+            path = self.queue.get()
+            try:
+                thumb = self.lookup(path) or self.generate(path)
+            except Exception as e:
+                print(f"Error creating thumbnail for {path}: {e}")
+                thumb = None
+            with self._lock:
+                self._pending.discard(path)
+            self.on_ready(path, thumb)
+
+    def generate(self, path: str) -> Optional[str]:
+        try:
+            mtime = int(os.stat(path).st_mtime)
+        except OSError:
+            return None
+        fail = failure_path(path, self.root)
+        if os.path.exists(fail) and is_valid(fail, path, mtime):
+            return None
+
+        import gi
+        gi.require_version("GdkPixbuf", "2.0")
+        from gi.repository import GdkPixbuf, GLib
+
+        mime = guess_mime(path)
+        target = thumbnail_path(path, self.size, self.root)
+        pixbuf = None
+        scratch = None
+        try:
+            if mime.startswith("image/"):
+                # Never upscale: small images are stored at their own size
+                info = GdkPixbuf.Pixbuf.get_file_info(path)
+                if info is None or info[0] is None:
+                    raise GLib.Error("unknown image format")
+                width, height = info[1], info[2]
+                edge = min(self.pixels, max(width, height))
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, edge, edge, True)
+            else:
+                fd, scratch = tempfile.mkstemp(suffix=".png")
+                os.close(fd)
+                if self.thumbnailers.run(mime, path, scratch, self.pixels):
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(scratch, self.pixels, self.pixels, True)
+        except GLib.Error:
+            pixbuf = None
+        finally:
+            if scratch:
+                os.unlink(scratch)
+
+        if pixbuf is None:
+            try:
+                record_failure(path, mtime, self.root)
+            except OSError:
+                pass
+            return None
+
+        # Re-saved through GdkPixbuf either way, so the spec's keys are always present
+        os.makedirs(os.path.dirname(target), mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".opendesktop-", suffix=".png")
+        os.close(fd)
+        try:
+            pixbuf.savev(tmp_path, "png",
+                         ["tEXt::Thumb::URI", "tEXt::Thumb::MTime", "tEXt::Thumb::Size", "tEXt::Thumb::Mimetype",
+                          "tEXt::Software"],
+                         [file_uri(path), str(mtime), str(os.path.getsize(path)), mime, "OpenDesktop"])
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, target)
+        except (GLib.Error, OSError) as e:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            print(f"Error saving thumbnail for {path}: {e}")
+            return None
+        return target
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import queue
+import sys
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.launch_profiles import set_io_priority
+from modules.thumbnails import ThumbnailService, file_uri
+
+DEFAULT_FOLDERS = ["~/Pictures/Wallpapers", "~/Pictures", "/usr/share/backgrounds", "/usr/share/wallpapers"]
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+
+# Optimized copies kept around; switching back and forth between a few wallpapers stays instant
+KEEP_OPTIMIZED = 8
+
+
+def wallpaper_cache_dir() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "opendesktop", "wallpapers")
+
+
+def list_folder(folder: str, max_depth: int = 2) -> List[dict]:
+    """Images in folder and its subfolders (themes in /usr/share/backgrounds nest one level), by name"""
+    items = []
+    pending = [(folder, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir():
+                    if depth < max_depth:
+                        pending.append((entry.path, depth + 1))
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            items.append({"path": entry.path, "name": os.path.splitext(entry.name)[0],
+                          "mtime": int(st.st_mtime), "size": st.st_size})
+    items.sort(key=lambda item: (item["name"].casefold(), item["path"]))
+    return items
+
+
+def optimized_path(path: str, screen: Tuple[int, int], cache_dir: Optional[str] = None) -> Optional[str]:
+    """Where the screen-sized copy of path goes; the name changes with the file's mtime and size"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0{screen[0]}x{screen[1]}"
+    digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(cache_dir or wallpaper_cache_dir(), f"{digest}.jpg")
+
+
+def cached_wallpaper(path: str, screen: Tuple[int, int], cache_dir: Optional[str] = None) -> str:
+    """The optimized copy if one was made for this file and screen size, else the file itself"""
+    target = optimized_path(path, screen, cache_dir)
+    return target if target and os.path.exists(target) else path
+
+
+def optimize_wallpaper(path: str, screen: Tuple[int, int], cache_dir: Optional[str] = None) -> str:
+    """
+    A JPEG just large enough to cover the screen, decoded straight at that
+    size. Images that are already no larger, or that have an alpha channel,
+    are used as they are.
+    """
+    import gi
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf, GLib
+
+    target = optimized_path(path, screen, cache_dir)
+    if target is None:
+        return path
+    if os.path.exists(target):
+        os.utime(target)  # most recently used, for pruning
+        return target
+    info = GdkPixbuf.Pixbuf.get_file_info(path)
+    if info is None or info[0] is None:
+        return path
+    width, height = info[1], info[2]
+    # The page shows the wallpaper with background-size: cover, so the smaller side decides
+    scale = max(screen[0] / width, screen[1] / height)
+    if scale >= 1.0:
+        return path
+    try:
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, max(1, round(width * scale)),
+                                                         max(1, round(height * scale)), False)
+    except GLib.Error as e:
+        print(f"Cannot scale wallpaper {path}: {e}")
+        return path
+    if pixbuf.get_has_alpha():
+        return path
+
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".opendesktop-", suffix=".jpg")
+    os.close(fd)
+    try:
+        pixbuf.savev(tmp_path, "jpeg", ["quality"], ["90"])
+        os.replace(tmp_path, target)
+    except (GLib.Error, OSError) as e:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        print(f"Error saving optimized wallpaper for {path}: {e}")
+        return path
+    prune_cache(directory)
+    return target
+
+
+def prune_cache(directory: str, keep: int = KEEP_OPTIMIZED):
+    try:
+        files = [e for e in os.scandir(directory) if e.name.endswith(".jpg") and not e.name.startswith(".")]
+        files.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in files[keep:]:
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+class WallpaperGallery:
+    """
+    Backs the wallpaper gallery in the page. Listing folders and scaling
+    the chosen image run on one background thread; on_listed(folder, items)
+    and on_optimized(path, result) are called from that thread. Tile
+    thumbnails come from the shared ThumbnailService: cached ones are
+    included in the listing, missing ones are generated on request, only
+    for the tiles the page is showing.
+    """
+
+    def __init__(self, thumbnails: ThumbnailService, on_listed: Callable[[str, List[dict]], None],
+                 on_optimized: Callable[[str, str], None], folders: Optional[List[str]] = None,
+                 cache_dir: Optional[str] = None):
+        self.thumbnails = thumbnails
+        self.on_listed = on_listed
+        self.on_optimized = on_optimized
+        self.folders = [os.path.abspath(os.path.expanduser(f)) for f in (folders or DEFAULT_FOLDERS)]
+        self.cache_dir = cache_dir or wallpaper_cache_dir()
+        self.jobs: "queue.Queue[tuple]" = queue.Queue()
+        self.known: Dict[str, int] = {}  # path -> mtime, every image listed so far
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def available_folders(self) -> List[str]:
+        return [folder for folder in self.folders if os.path.isdir(folder)]
+
+    def is_known(self, path: str) -> bool:
+        with self._lock:
+            return path in self.known
+
+    def _submit(self, *job):
+        self.jobs.put(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="wallpapers", daemon=True)
+            self._thread.start()
+
+    def list(self, folder: str):
+        self._submit("list", folder)
+
+    def optimize(self, path: str, screen: Tuple[int, int]):
+        self._submit("optimize", path, screen)
+
+    def request_thumbnails(self, paths: List[str]):
+        self.thumbnails.request([path for path in paths if self.is_known(path)])
+
+    def _run(self):
+        set_io_priority(0, "idle")
+        while True:
+            kind, *args = self.jobs.get()
+            try:
+                if kind == "list":
+                    self._list(*args)
+                else:
+                    path, screen = args
+                    try:
+                        result = optimize_wallpaper(path, screen, self.cache_dir)
+                    except (ImportError, ValueError):
+                        result = path  # no GdkPixbuf: the original file, unscaled
+                    self.on_optimized(path, result)
+            except Exception as e:
+                print(f"Wallpaper gallery: {kind} failed: {e}")
+
+    def _list(self, folder: str):
+        items = list_folder(folder)
+        for item in items:
+            thumb = self.thumbnails.lookup(item["path"])
+            item["thumb"] = file_uri(thumb) if thumb else None
+        with self._lock:
+            self.known.update((item["path"], item["mtime"]) for item in items)
+        self.on_listed(folder, items)
+
+
+if __name__ == "__main__":
+    # python3 -m modules.wallpapers [FOLDER]: what the gallery would list, and how many thumbnails are cached
+    import time
+    started = time.perf_counter()
+    service = ThumbnailService(lambda path, thumb: None)
+    for folder in sys.argv[1:] or DEFAULT_FOLDERS:
+        folder = os.path.expanduser(folder)
+        if not os.path.isdir(folder):
+            continue
+        items = list_folder(folder)
+        cached = sum(1 for item in items if service.lookup(item["path"]))
+        print(f"{folder}: {len(items)} images, {cached} thumbnails cached")
+    print(f"{(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,76 @@
+import os
+from typing import Dict
+
+# WebKit configuration per profile; config.json's "frontend" section picks one
+# ("profile") and may override single keys ("webkit": {...}).
+#
+#   bundle                 load build/desktop.html (python3 -m modules.frontend_bundle)
+#   developer_extras       inspector support; keeps extra bookkeeping alive in the web process
+#   cache_model            document_viewer: smallest memory cache, the page is local and never navigates
+#   hardware_acceleration  on_demand / always / never (on_demand is not in every WebKitGTK build)
+#   page_cache             back/forward cache, useless for a page that never navigates
+#   webgl, media           features the shell does not use
+#   memory_limit_mb        web process memory pressure limit (WebKitGTK 2.34+); 0 leaves WebKit's default.
+#                          A process killed for exceeding it is replaced and restored like a crash.
+WEB_PROFILES: Dict[str, dict] = {
+    "production": {
+        "bundle": True,
+        "developer_extras": False,
+        "cache_model": "document_viewer",
+        "hardware_acceleration": "on_demand",
+        "page_cache": False,
+        "webgl": False,
+        "media": False,
+        "memory_limit_mb": 0,
+    },
+    "development": {
+        "bundle": False,
+        "developer_extras": True,
+        "cache_model": "document_viewer",
+        "hardware_acceleration": "on_demand",
+        "page_cache": False,
+        "webgl": True,
+        "media": True,
+        "memory_limit_mb": 0,
+    },
+}
+
+
+def resolve_profile(config: dict) -> dict:
+    """The WebKit profile for this session; hot reload and OPENDESKTOP_DEV imply "development"."""
+    frontend_cfg = config.get("frontend", {})
+    dev = config.get("dev", {}).get("hot_reload") or os.environ.get("OPENDESKTOP_DEV")
+    name = frontend_cfg.get("profile") or ("development" if dev else "production")
+    if name not in WEB_PROFILES:
+        print(f"Unknown frontend profile '{name}', using production")
+        name = "production"
+    profile = dict(WEB_PROFILES[name], name=name)
+    profile.update({k: v for k, v in frontend_cfg.get("webkit", {}).items() if k in profile})
+    return profile
+
+
+def apply_memory_limit(profile: dict):
+    """Must run before the first WebContext is created; the web process reads it at spawn."""
+    if not profile["memory_limit_mb"]:
+        return
+    from gi.repository import WebKit2
+    try:
+        pressure = WebKit2.MemoryPressureSettings.new()
+        pressure.set_memory_limit(profile["memory_limit_mb"])
+        WebKit2.WebContext.set_memory_pressure_settings(pressure)
+    except AttributeError:
+        print("Web process memory limit needs WebKitGTK 2.34 or newer")
+
+
+def apply_profile(profile: dict, settings, context):
+    from gi.repository import WebKit2
+    settings.set_enable_developer_extras(profile["developer_extras"])
+    settings.set_enable_page_cache(profile["page_cache"])
+    settings.set_enable_webgl(profile["webgl"])
+    settings.set_enable_media(profile["media"])
+    policy = getattr(WebKit2.HardwareAccelerationPolicy, profile["hardware_acceleration"].upper(), None)
+    if policy is not None:
+        settings.set_hardware_acceleration_policy(policy)
+    else:
+        print(f"Hardware acceleration policy '{profile['hardware_acceleration']}' not supported here")
+    context.set_cache_model(getattr(WebKit2.CacheModel, profile["cache_model"].upper()))
@@ -0,0 +1,447 @@
+import struct
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Events delivered to listeners as callback(event, payload):
+#   "opened"  -> WindowInfo      "closed" -> xid
+#   "changed" -> WindowInfo      "active" -> xid (or None)
+EVENT_OPENED = "opened"
+EVENT_CLOSED = "closed"
+EVENT_CHANGED = "changed"
+EVENT_ACTIVE = "active"
+
+
+@dataclass
+class WindowInfo:
+    """Backend-neutral snapshot of one top-level window"""
+    xid: int
+    class_name: str = ""
+    name: str = ""
+    pid: int = 0
+    window_type: str = "normal"
+    startup_id: Optional[str] = None
+    geometry: tuple = (0, 0, 0, 0)
+    active: bool = False
+    skip_taskbar: bool = False
+
+
+def monitor_index(geometry: tuple, monitors: List[tuple]) -> int:
+    """
+    Index of the monitor rect (x, y, width, height) holding the window's
+    centre; windows off every monitor go to the nearest one.
+    """
+    x, y, width, height = geometry
+    cx, cy = x + width / 2, y + height / 2
+    best, best_distance = 0, None
+    for i, (mx, my, mw, mh) in enumerate(monitors):
+        dx = max(mx - cx, 0, cx - (mx + mw))
+        dy = max(my - cy, 0, cy - (my + mh))
+        distance = dx * dx + dy * dy
+        if distance == 0:
+            return i
+        if best_distance is None or distance < best_distance:
+            best, best_distance = i, distance
+    return best
+
+
+class WindowBackend:
+    """
+    Interface every window-tracking backend implements.
+
+    Backends keep their own cache of WindowInfo, updated from X events, so
+    windows() is a cheap read and never does a synchronous round trip.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.listeners: List[Callable[[str, object], None]] = []
+        self.cache: Dict[int, WindowInfo] = {}
+        self.active_xid: Optional[int] = None
+
+    def start(self):
+        """Connect to the display and populate the cache"""
+
+    def connect(self, callback: Callable[[str, object], None]):
+        self.listeners.append(callback)
+
+    def emit(self, event: str, payload):
+        for callback in list(self.listeners):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"Window listener error ({event}): {e}")
+
+    def windows(self) -> List[WindowInfo]:
+        return list(self.cache.values())
+
+    def get(self, xid: int) -> Optional[WindowInfo]:
+        return self.cache.get(xid)
+
+    def activate(self, xid: int, timestamp: int = 0):
+        raise NotImplementedError
+
+    def close(self, xid: int, timestamp: int = 0):
+        raise NotImplementedError
+
+
+class WnckBackend(WindowBackend):
+    """libwnck backend. Wnck already tracks windows from X events; we only mirror its signals."""
+
+    name = "wnck"
+
+    def __init__(self):
+        super().__init__()
+        import gi
+        gi.require_version("Wnck", "3.0")
+        from gi.repository import Wnck
+        self.Wnck = Wnck
+        self.screen = None
+        self.wnck_windows = {}
+
+    def start(self):
+        self.screen = self.Wnck.Screen.get_default()
+        if self.screen is None:
+            raise RuntimeError("Wnck has no default screen (no X display?)")
+        # One synchronous refresh at startup; afterwards Wnck updates from events
+        self.screen.force_update()
+        self.screen.connect("window-opened", self._on_opened)
+        self.screen.connect("window-closed", self._on_closed)
+        self.screen.connect("active-window-changed", self._on_active_changed)
+        for window in self.screen.get_windows():
+            self._track(window)
+        active = self.screen.get_active_window()
+        self.active_xid = active.get_xid() if active else None
+
+    def _snapshot(self, window) -> WindowInfo:
+        Wnck = self.Wnck
+        wtype = window.get_window_type()
+        application = window.get_application()
+        return WindowInfo(
+            xid=window.get_xid(),
+            class_name=(window.get_class_group_name() or "").lower(),
+            name=window.get_name() or "",
+            pid=window.get_pid(),
+            window_type="normal" if wtype == Wnck.WindowType.NORMAL else str(wtype.value_nick),
+            startup_id=application.get_startup_id() if application else None,
+            geometry=tuple(window.get_geometry()),
+            active=window.is_active(),
+            skip_taskbar=window.is_skip_tasklist(),
+        )
+
+    def _track(self, window) -> WindowInfo:
+        info = self._snapshot(window)
+        self.cache[info.xid] = info
+        self.wnck_windows[info.xid] = window
+        for signal in ("name-changed", "class-changed", "geometry-changed", "state-changed"):
+            window.connect(signal, self._on_window_changed)
+        return info
+
+    def _on_opened(self, screen, window):
+        self.emit(EVENT_OPENED, self._track(window))
+
+    def _on_closed(self, screen, window):
+        xid = window.get_xid()
+        self.cache.pop(xid, None)
+        self.wnck_windows.pop(xid, None)
+        self.emit(EVENT_CLOSED, xid)
+
+    def _on_window_changed(self, window, *args):
+        info = self._snapshot(window)
+        self.cache[info.xid] = info
+        self.emit(EVENT_CHANGED, info)
+
+    def _on_active_changed(self, screen, previous):
+        active = screen.get_active_window()
+        self.active_xid = active.get_xid() if active else None
+        for xid, info in self.cache.items():
+            info.active = xid == self.active_xid
+        self.emit(EVENT_ACTIVE, self.active_xid)
+
+    def activate(self, xid, timestamp=0):
+        window = self.wnck_windows.get(xid)
+        if window:
+            window.activate(timestamp)
+
+    def close(self, xid, timestamp=0):
+        window = self.wnck_windows.get(xid)
+        if window:
+            window.close(timestamp)
+
+
+class XcbBackend(WindowBackend):
+    """
+    Direct XCB backend (needs the optional xcffib package).
+
+    Listens for PropertyNotify on the root window's _NET_CLIENT_LIST and
+    _NET_ACTIVE_WINDOW. When the client list changes only the new windows
+    are queried, and all of their properties are requested in one pipelined
+    batch: every cookie is sent before the first reply is read, so a change
+    costs a single round trip no matter how many windows are open.
+    """
+
+    name = "xcb"
+
+    _ATOMS = (
+        "_NET_CLIENT_LIST", "_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "_NET_WM_PID", "_NET_WM_WINDOW_TYPE",
+        "_NET_WM_WINDOW_TYPE_NORMAL", "_NET_WM_STATE", "_NET_WM_STATE_SKIP_TASKBAR", "_NET_STARTUP_ID",
+        "_NET_CLOSE_WINDOW", "UTF8_STRING", "WM_CLASS", "WM_NAME",
+    )
+    # Client properties the cache is built from; changes to any other (_NET_WM_USER_TIME
+    # on every keypress, icons, opacity...) are ignored
+    _CLIENT_PROPS = ("WM_CLASS", "_NET_WM_NAME", "WM_NAME", "_NET_WM_PID", "_NET_WM_WINDOW_TYPE",
+                     "_NET_WM_STATE", "_NET_STARTUP_ID")
+    _TYPE_NAMES = {
+        "_NET_WM_WINDOW_TYPE_DESKTOP": "desktop", "_NET_WM_WINDOW_TYPE_DOCK": "dock",
+        "_NET_WM_WINDOW_TYPE_DIALOG": "dialog", "_NET_WM_WINDOW_TYPE_UTILITY": "utility",
+        "_NET_WM_WINDOW_TYPE_SPLASH": "splash", "_NET_WM_WINDOW_TYPE_TOOLBAR": "toolbar",
+        "_NET_WM_WINDOW_TYPE_MENU": "menu",
+    }
+
+    def __init__(self, display: Optional[str] = None):
+        super().__init__()
+        import xcffib
+        import xcffib.xproto
+        self.xcffib = xcffib
+        self.xproto = xcffib.xproto
+        self.display = display
+        self.conn = None
+        self.root = None
+        self.atoms = {}
+        self.type_atoms = {}
+        self.client_atoms = set()
+        self.watch_id = None
+
+    def start(self):
+        from gi.repository import GLib
+        xproto = self.xproto
+        self.conn = self.xcffib.connect(display=self.display)
+        self.root = self.conn.get_setup().roots[self.conn.pref_screen].root
+
+        # Intern every atom in one batch
+        names = list(self._ATOMS) + list(self._TYPE_NAMES)
+        cookies = [self.conn.core.InternAtom(False, len(n), n) for n in names]
+        for name, cookie in zip(names, cookies):
+            self.atoms[name] = cookie.reply().atom
+        self.type_atoms = {self.atoms[n]: label for n, label in self._TYPE_NAMES.items()}
+        self.type_atoms[self.atoms["_NET_WM_WINDOW_TYPE_NORMAL"]] = "normal"
+        self.client_atoms = {self.atoms[p] for p in self._CLIENT_PROPS}
+
+        self.conn.core.ChangeWindowAttributes(self.root, xproto.CW.EventMask, [xproto.EventMask.PropertyChange])
+        self._sync_client_list()
+        self._sync_active()
+        self.conn.flush()
+        self.watch_id = GLib.io_add_watch(self.conn.get_file_descriptor(), GLib.PRIORITY_DEFAULT,
+                                          GLib.IO_IN, self._on_readable)
+
+    # --- property helpers ---
+    def _get_property(self, window, atom, length=1024):
+        return self.conn.core.GetProperty(False, window, atom, self.xproto.GetPropertyType.Any, 0, length)
+
+    @staticmethod
+    def _cardinals(reply) -> list:
+        if reply is None or reply.format != 32 or not reply.value_len:
+            return []
+        return list(struct.unpack(f"={reply.value_len}I", reply.value.buf()[:reply.value_len * 4]))
+
+    @staticmethod
+    def _text(reply) -> str:
+        if reply is None or not reply.value_len:
+            return ""
+        return reply.value.buf()[:reply.value_len].decode("utf-8", "replace")
+
+    def _safe_reply(self, cookie):
+        try:
+            return cookie.reply()
+        except self.xcffib.xproto.WindowError:
+            return None
+        except self.xcffib.ProtocolException:
+            return None
+
+    def _fetch(self, xids: List[int]) -> Dict[int, WindowInfo]:
+        """Pipelined batch: send every request first, then collect all replies"""
+        a = self.atoms
+        pending = {}
+        for xid in xids:
+            cookies = {p: self._get_property(xid, a[p]) for p in self._CLIENT_PROPS}
+            cookies["geometry"] = self.conn.core.GetGeometry(xid)
+            cookies["translate"] = self.conn.core.TranslateCoordinates(xid, self.root, 0, 0)
+            pending[xid] = cookies
+        self.conn.flush()
+
+        infos = {}
+        for xid, cookies in pending.items():
+            replies = {key: self._safe_reply(cookie) for key, cookie in cookies.items()}
+            if replies["WM_CLASS"] is None and replies["geometry"] is None:
+                continue  # Window vanished meanwhile
+            wm_class = self._text(replies["WM_CLASS"]).split("\0")
+            types = self._cardinals(replies["_NET_WM_WINDOW_TYPE"])
+            state = self._cardinals(replies["_NET_WM_STATE"])
+            pids = self._cardinals(replies["_NET_WM_PID"])
+            geom, origin = replies["geometry"], replies["translate"]
+            infos[xid] = WindowInfo(
+                xid=xid,
+                class_name=(wm_class[1] if len(wm_class) > 1 else wm_class[0]).lower(),
+                name=self._text(replies["_NET_WM_NAME"]) or self._text(replies["WM_NAME"]),
+                pid=pids[0] if pids else 0,
+                window_type=self.type_atoms.get(types[0], "other") if types else "normal",
+                startup_id=self._text(replies["_NET_STARTUP_ID"]) or None,
+                geometry=(origin.dst_x if origin else 0, origin.dst_y if origin else 0,
+                          geom.width if geom else 0, geom.height if geom else 0),
+                active=xid == self.active_xid,
+                skip_taskbar=a["_NET_WM_STATE_SKIP_TASKBAR"] in state,
+            )
+        return infos
+
+    def _sync_client_list(self):
+        reply = self._safe_reply(self._get_property(self.root, self.atoms["_NET_CLIENT_LIST"], 4096))
+        current = set(self._cardinals(reply))
+        known = set(self.cache)
+        for xid in known - current:
+            self.cache.pop(xid, None)
+            self.emit(EVENT_CLOSED, xid)
+        new = [xid for xid in current if xid not in known]
+        if not new:
+            return
+        # Track property and configure changes on the clients themselves
+        mask = self.xproto.EventMask.PropertyChange | self.xproto.EventMask.StructureNotify
+        for xid in new:
+            self.conn.core.ChangeWindowAttributes(xid, self.xproto.CW.EventMask, [mask])
+        for xid, info in self._fetch(new).items():
+            self.cache[xid] = info
+            self.emit(EVENT_OPENED, info)
+
+    def _sync_active(self):
+        reply = self._safe_reply(self._get_property(self.root, self.atoms["_NET_ACTIVE_WINDOW"], 1))
+        values = self._cardinals(reply)
+        active = values[0] if values and values[0] else None
+        if active == self.active_xid:
+            return
+        self.active_xid = active
+        for xid, info in self.cache.items():
+            info.active = xid == active
+        self.emit(EVENT_ACTIVE, active)
+
+    def _refresh(self, xid):
+        info = self._fetch([xid]).get(xid)
+        if info is not None and xid in self.cache:
+            self.cache[xid] = info
+            self.emit(EVENT_CHANGED, info)
+
+    def _on_readable(self, fd, condition):
+        xproto = self.xproto
+        dirty_clients = set()
+        dirty_list = dirty_active = False
+        while True:
+            try:
+                event = self.conn.poll_for_event()
+            except self.xcffib.ProtocolException:
+                continue
+            if event is None:
+                break
+            if isinstance(event, xproto.PropertyNotifyEvent):
+                if event.window == self.root:
+                    if event.atom == self.atoms["_NET_CLIENT_LIST"]:
+                        dirty_list = True
+                    elif event.atom == self.atoms["_NET_ACTIVE_WINDOW"]:
+                        dirty_active = True
+                elif event.window in self.cache and event.atom in self.client_atoms:
+                    dirty_clients.add(event.window)
+            elif isinstance(event, xproto.ConfigureNotifyEvent) and event.window in self.cache:
+                dirty_clients.add(event.window)
+        # Coalesce everything that arrived in this wakeup into one batch
+        if dirty_list:
+            self._sync_client_list()
+        if dirty_active:
+            self._sync_active()
+        changed = [xid for xid in dirty_clients if xid in self.cache]
+        if changed:
+            for xid, info in self._fetch(changed).items():
+                if xid in self.cache:
+                    self.cache[xid] = info
+                    self.emit(EVENT_CHANGED, info)
+        self.conn.flush()
+        return True
+
+    def _client_message(self, xid, atom, data):
+        xproto = self.xproto
+        event = xproto.ClientMessageEvent.synthetic(
+            format=32, window=xid, type=atom,
+            data=xproto.ClientMessageData.synthetic(data + [0] * (5 - len(data)), "I" * 5))
+        mask = xproto.EventMask.SubstructureRedirect | xproto.EventMask.SubstructureNotify
+        self.conn.core.SendEvent(False, self.root, mask, event.pack())
+        self.conn.flush()
+
+    def activate(self, xid, timestamp=0):
+        # Source indication 2 = pager/taskbar, so the WM honours the request
+        self._client_message(xid, self.atoms["_NET_ACTIVE_WINDOW"], [2, timestamp, 0])
+
+    def close(self, xid, timestamp=0):
+        self._client_message(xid, self.atoms["_NET_CLOSE_WINDOW"], [timestamp, 2])
+
+
+class FakeBackend(WindowBackend):
+    """In-memory backend for tests, benchmarks and replays"""
+
+    name = "fake"
+
+    def __init__(self, windows: Optional[List[WindowInfo]] = None):
+        super().__init__()
+        self.actions = []
+        for info in windows or []:
+            self.cache[info.xid] = info
+
+    def add_window(self, info: WindowInfo):
+        self.cache[info.xid] = info
+        self.emit(EVENT_OPENED, info)
+
+    def remove_window(self, xid: int):
+        if self.cache.pop(xid, None) is not None:
+            self.emit(EVENT_CLOSED, xid)
+
+    def update_window(self, xid: int, **changes):
+        info = self.cache.get(xid)
+        if info is not None:
+            info = self.cache[xid] = replace(info, **changes)
+            self.emit(EVENT_CHANGED, info)
+
+    def set_active(self, xid: Optional[int]):
+        self.active_xid = xid
+        for key, info in self.cache.items():
+            info.active = key == xid
+        self.emit(EVENT_ACTIVE, xid)
+
+    def activate(self, xid, timestamp=0):
+        self.actions.append(("activate", xid))
+        self.set_active(xid)
+
+    def close(self, xid, timestamp=0):
+        self.actions.append(("close", xid))
+        self.remove_window(xid)
+
+
+BACKENDS = {"wnck": WnckBackend, "xcb": XcbBackend, "fake": FakeBackend}
+
+
+def create_backend(name: str = "wnck", listeners: Sequence[Callable[[str, object], None]] = ()) -> WindowBackend:
+    """
+    A started backend by name, with listeners connected before its first
+    events. Falls back to Wnck if the backend is unavailable or cannot
+    start (xcffib without a usable display, say).
+    """
+    cls = BACKENDS.get(name, WnckBackend)
+    try:
+        backend = cls()
+        for callback in listeners:
+            backend.connect(callback)
+        backend.start()
+        return backend
+    except Exception as e:
+        if cls is WnckBackend:
+            raise
+        print(f"Window backend '{name}' unavailable ({e}), using wnck")
+    backend = WnckBackend()
+    for callback in listeners:
+        backend.connect(callback)
+    backend.start()
+    return backend
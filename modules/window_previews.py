@@ -0,0 +1,370 @@
+import base64
+import ctypes
+import os
+import queue
+import select
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# System V shared memory, for MIT-SHM captures
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+@dataclass
+class PreviewEntry:
+    xid: int
+    src: str                  # data: URI, ready for an <img>
+    width: int
+    height: int
+    window_size: tuple        # (width, height) of the window when captured
+    captured_at: float
+    stale: bool = False       # damaged/resized since capture; still shown until recaptured
+
+    @property
+    def cost(self) -> int:
+        return len(self.src)
+
+
+class PreviewCache:
+    """
+    Thumbnails per XID, least recently used first out once the total size
+    passes the byte budget. Stale entries are kept: an outdated preview shown
+    instantly beats an empty box while the new capture runs.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.entries: "OrderedDict[int, PreviewEntry]" = OrderedDict()
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def get(self, xid: int) -> Optional[PreviewEntry]:
+        with self._lock:
+            entry = self.entries.get(xid)
+            if entry:
+                self.entries.move_to_end(xid)
+            return entry
+
+    def put(self, entry: PreviewEntry):
+        with self._lock:
+            old = self.entries.pop(entry.xid, None)
+            if old:
+                self.size -= old.cost
+            self.entries[entry.xid] = entry
+            self.size += entry.cost
+            while self.size > self.budget_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.cost
+
+    def invalidate(self, xid: int):
+        with self._lock:
+            entry = self.entries.get(xid)
+            if entry:
+                entry.stale = True
+
+    def forget(self, xid: int):
+        with self._lock:
+            entry = self.entries.pop(xid, None)
+            if entry:
+                self.size -= entry.cost
+
+
+class X11Capturer:
+    """
+    Grabs window contents over its own XCB connection (needs xcffib), so it can
+    live on the preview thread. Uses the composited backing pixmap when a
+    compositor redirects the window, MIT-SHM when the server offers it, and
+    DAMAGE to learn when a cached capture went out of date.
+    """
+
+    def __init__(self, display: Optional[str] = None):
+        import xcffib
+        import xcffib.xproto
+        self.xcffib = xcffib
+        self.xproto = xcffib.xproto
+        self.conn = xcffib.connect(display=display)
+        self.shm = self._extension("shm")
+        self.damage = self._extension("damage", 1, 1)
+        self.composite = self._extension("composite", 0, 2)
+        self.damages: Dict[int, int] = {}
+        self.segment = None  # (shmseg, shmid, address, size)
+        self.libc = None
+        if self.shm:
+            self.libc = ctypes.CDLL(None, use_errno=True)
+            self.libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+            self.libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+            self.libc.shmat.restype = ctypes.c_void_p
+            self.libc.shmdt.argtypes = [ctypes.c_void_p]
+            self.libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _extension(self, name, *version):
+        try:
+            module = __import__(f"xcffib.{name}", fromlist=["key"])
+            ext = self.conn(module.key)
+            ext.QueryVersion(*version).reply()
+            return ext
+        except Exception:
+            return None
+
+    def fileno(self) -> int:
+        return self.conn.get_file_descriptor()
+
+    def _shm_buffer(self, size: int):
+        """A shared segment of at least size bytes, attached on both ends"""
+        if self.segment and self.segment[3] >= size:
+            return self.segment
+        self._release_segment()
+        shmid = self.libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if shmid < 0:
+            return None
+        address = self.libc.shmat(shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(shmid, _IPC_RMID, None)
+            return None
+        shmseg = self.conn.generate_id()
+        try:
+            self.shm.AttachChecked(shmseg, shmid, False).check()
+        except Exception:
+            self.libc.shmdt(address)
+            self.libc.shmctl(shmid, _IPC_RMID, None)
+            self.shm = None  # e.g. a remote display: plain GetImage from now on
+            return None
+        # Marked for removal now; the kernel frees it once both sides detach
+        self.libc.shmctl(shmid, _IPC_RMID, None)
+        self.segment = (shmseg, shmid, address, size)
+        return self.segment
+
+    def _release_segment(self):
+        if self.segment:
+            shmseg, _, address, _ = self.segment
+            self.shm.Detach(shmseg)
+            self.libc.shmdt(address)
+            self.segment = None
+
+    def capture(self, xid: int):
+        """(width, height, depth, BGRX bytes) of the window, or None if it cannot be read (unmapped, gone, odd depth)"""
+        xproto = self.xproto
+        try:
+            geometry = self.conn.core.GetGeometry(xid).reply()
+        except Exception:
+            return None
+        width, height = geometry.width, geometry.height
+        if geometry.depth not in (24, 32) or not width or not height:
+            return None
+
+        drawable, pixmap = xid, None
+        if self.composite:
+            pixmap = self.conn.generate_id()
+            try:
+                self.composite.NameWindowPixmapChecked(xid, pixmap).check()
+                drawable = pixmap
+            except Exception:
+                pixmap = None  # not redirected: read the window itself
+        try:
+            size = width * height * 4
+            segment = self._shm_buffer(size) if self.shm else None
+            if segment:
+                self.shm.GetImage(drawable, 0, 0, width, height, 0xFFFFFFFF,
+                                  xproto.ImageFormat.ZPixmap, segment[0], 0).reply()
+                data = ctypes.string_at(segment[2], size)
+            else:
+                reply = self.conn.core.GetImage(xproto.ImageFormat.ZPixmap, drawable, 0, 0,
+                                                width, height, 0xFFFFFFFF).reply()
+                data = bytes(reply.data.buf())
+        except Exception:
+            return None
+        finally:
+            if pixmap:
+                self.conn.core.FreePixmap(pixmap)
+                self.conn.flush()
+        return width, height, geometry.depth, data
+
+    def watch(self, xid: int):
+        """Report the next change to this window's contents (once, see poll_damaged)"""
+        if self.damage and xid not in self.damages:
+            import xcffib.damage
+            damage_id = self.conn.generate_id()
+            self.damage.Create(damage_id, xid, xcffib.damage.ReportLevel.NonEmpty)
+            self.damages[xid] = damage_id
+            self.conn.flush()
+
+    def unwatch(self, xid: int):
+        damage_id = self.damages.pop(xid, None)
+        if damage_id is not None:
+            self.damage.Destroy(damage_id)
+            self.conn.flush()
+
+    def poll_damaged(self) -> List[int]:
+        """XIDs damaged since the last call. Their DAMAGE objects are dropped, so a
+        window that keeps repainting (a video) costs one event, not a stream.
+        A lost X connection raises (xcffib.ConnectionException)."""
+        import xcffib.damage
+        damaged = []
+        while True:
+            try:
+                event = self.conn.poll_for_event()
+            except self.xcffib.ProtocolException:
+                continue  # errors from windows that vanished mid-request
+            if event is None:
+                break
+            if isinstance(event, xcffib.damage.NotifyEvent):
+                damaged.append(event.drawable)
+        for xid in damaged:
+            self.unwatch(xid)
+        return damaged
+
+    def close(self):
+        if self.shm:
+            self._release_segment()
+        self.conn.disconnect()
+
+
+def encode_thumbnail(data: bytes, width: int, height: int, max_width: int, max_height: int,
+                     quality: int = 80, depth: int = 24):
+    """Downscales a BGRX capture and returns (jpeg bytes, width, height)"""
+    import gi
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf, GLib
+
+    scale = min(max_width / width, max_height / height, 1.0)
+    thumb_width, thumb_height = max(1, int(width * scale)), max(1, int(height * scale))
+    if depth != 32:
+        # The X byte of a depth-24 window is padding, often 0; read as alpha it would
+        # weight every pixel to black when scaling
+        opaque = bytearray(data)
+        opaque[3::4] = b"\xff" * (width * height)
+        data = bytes(opaque)
+    # Scaling treats every channel alike, so the BGRX order is only fixed on the small copy
+    full = GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(data), GdkPixbuf.Colorspace.RGB, True, 8,
+                                           width, height, width * 4)
+    small = full.scale_simple(thumb_width, thumb_height, GdkPixbuf.InterpType.BILINEAR)
+    bgrx = small.get_pixels()
+    stride = small.get_rowstride()
+    rgb = bytearray(thumb_width * thumb_height * 3)
+    for y in range(thumb_height):
+        row = bgrx[y * stride:y * stride + thumb_width * 4]
+        out = y * thumb_width * 3
+        rgb[out:out + thumb_width * 3:3] = row[2::4]
+        rgb[out + 1:out + thumb_width * 3:3] = row[1::4]
+        rgb[out + 2:out + thumb_width * 3:3] = row[0::4]
+    pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(bytes(rgb)), GdkPixbuf.Colorspace.RGB, False, 8,
+                                             thumb_width, thumb_height, thumb_width * 3)
+    ok, buffer = pixbuf.save_to_bufferv("jpeg", ["quality"], [str(quality)])
+    return bytes(buffer), thumb_width, thumb_height
+
+
+class PreviewService:
+    """
+    Hover previews for dock items. request() answers from the cache at once
+    and queues captures for missing or stale windows; a single background
+    thread captures, downscales and calls on_ready(xid, entry) from that
+    thread. Nothing runs, and no DAMAGE is tracked, for windows nobody
+    hovered; the thread sleeps in select() until asked for something.
+    """
+
+    def __init__(self, on_ready: Callable[[int, PreviewEntry], None], budget_mb: float = 16,
+                 max_width: int = 240, max_height: int = 160, capturer_factory=X11Capturer):
+        self.cache = PreviewCache(int(budget_mb * 1024 * 1024))
+        self.on_ready = on_ready
+        self.max_width = max_width
+        self.max_height = max_height
+        self.capturer_factory = capturer_factory
+        self.requests: "queue.Queue[tuple]" = queue.Queue()
+        self._wake_r, self._wake_w = os.pipe()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.available = True
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="window-previews", daemon=True)
+            self._thread.start()
+
+    def _send(self, *request):
+        self.requests.put(request)
+        self._ensure_thread()
+        os.write(self._wake_w, b"x")
+
+    def request(self, xids: List[int]) -> Dict[int, Optional[PreviewEntry]]:
+        """Cached previews (possibly stale, or None); fresh ones arrive through on_ready"""
+        result = {}
+        for xid in xids:
+            entry = self.cache.get(xid)
+            result[xid] = entry
+            if self.available and (entry is None or entry.stale):
+                with self._lock:
+                    if xid in self._pending:
+                        continue
+                    self._pending.add(xid)
+                self._send("capture", xid)
+        return result
+
+    def window_changed(self, xid: int, size: tuple):
+        """Configure event: a resized window's preview is out of date"""
+        entry = self.cache.get(xid)
+        if entry and entry.window_size != tuple(size):
+            self.cache.invalidate(xid)
+
+    def forget(self, xid: int):
+        self.cache.forget(xid)
+        if self._thread is not None and self.available:
+            self._send("forget", xid)
+
+    def _run(self):
+        try:
+            capturer = self.capturer_factory()
+        except Exception as e:
+            print(f"Window previews unavailable: {e}")
+            self.available = False
+            return
+        while True:
+            readable, _, _ = select.select([self._wake_r, capturer.fileno()], [], [])
+            if self._wake_r in readable:
+                os.read(self._wake_r, 4096)
+            try:
+                damaged = capturer.poll_damaged()
+            except Exception as e:
+                # The X connection is gone: cached previews stay, nothing new is captured
+                print(f"Window previews stopped: {e}")
+                self.available = False
+                return
+            for xid in damaged:
+                self.cache.invalidate(xid)
+            while True:
+                try:
+                    kind, xid = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "forget":
+                    capturer.unwatch(xid)
+                    continue
+                try:
+                    self._capture(capturer, xid)
+                finally:
+                    with self._lock:
+                        self._pending.discard(xid)
+
+    def _capture(self, capturer, xid: int):
+        # Watch first, so a repaint racing the capture still marks the result stale
+        capturer.watch(xid)
+        captured = capturer.capture(xid)
+        if captured is None:
+            return  # unmapped or gone: keep whatever is cached
+        width, height, depth, data = captured
+        try:
+            jpeg, thumb_width, thumb_height = encode_thumbnail(data, width, height, self.max_width, self.max_height,
+                                                               depth=depth)
+        except Exception as e:
+            print(f"Error encoding preview for {xid:#x}: {e}")
+            return
+        entry = PreviewEntry(xid=xid, src="data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii"),
+                             width=thumb_width, height=thumb_height, window_size=(width, height),
+                             captured_at=time.time())
+        self.cache.put(entry)
+        self.on_ready(xid, entry)
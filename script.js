@@ -3,6 +3,10 @@ let pinnedApps = [];
 let allApps = [];
 let lastDockDataString = ""; // Stores state to prevent "Dancing Icons"
 let clickLock = false;       // Prevents loop from overwriting clicks
+let lastRunningWindows = [];
+let launchingApps = new Set(); // Apps started from the shell that have not mapped a window yet
+let dockRenderReported = false; // First dock render is a boot milestone
+let performanceTier = "full";   // full | reduced | minimal | suspended, chosen by desktop.py
 
 /* --- BRIDGE --- */
 function sendToPython(data) {
@@ -12,15 +16,32 @@ function sendToPython(data) {
 }
 
 /* --- CLOCK --- */
+let clockTimer = null;
+
 function updateClock() {
     const now = new Date();
     const clockEl = document.getElementById("clock");
     if(clockEl) {
-        clockEl.innerText = now.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', second: '2-digit' });
+        // The minimal tier drops the seconds so the page only wakes once a minute
+        const format = performanceTier === "minimal"
+            ? { hour: '2-digit', minute: '2-digit' }
+            : { hour: '2-digit', minute: '2-digit', second: '2-digit' };
+        clockEl.innerText = now.toLocaleTimeString([], format);
     }
 }
-setInterval(updateClock, 1000);
-updateClock();
+
+function scheduleClock() {
+    clearTimeout(clockTimer);
+    clockTimer = null;
+    if (performanceTier === "suspended") return;
+    updateClock();
+    const now = new Date();
+    const delay = performanceTier === "minimal"
+        ? 60000 - (now.getSeconds() * 1000 + now.getMilliseconds())
+        : 1000 - now.getMilliseconds();
+    clockTimer = setTimeout(scheduleClock, delay);
+}
+scheduleClock();
 
 /* --- START MENU --- */
 function toggleStartMenu() {
@@ -31,19 +52,68 @@ function toggleStartMenu() {
         searchInput.value = ""; 
         renderApps(allApps);
         setTimeout(() => searchInput.focus(), 50); 
+        probeFrames();
     }
 }
 
-document.getElementById('desktop').addEventListener('click', () => {
+document.getElementById('desktop').addEventListener('click', (e) => {
     document.getElementById('start-menu').classList.add('hidden');
+    if (!e.target.closest('.desktop-item')) selectDesktopItem(null);
 });
 
 document.getElementById('start-menu').addEventListener('click', (e) => e.stopPropagation());
 
+// Apps are filtered here at once; Python answers shortly after with apps and
+// indexed files ranked together, which replaces the list if the query is still current
+let searchSeq = 0;
+let searchTimer = null;
+
 function filterApps() {
     const query = document.getElementById('start-search').value.toLowerCase();
     const filtered = allApps.filter(app => app.name.toLowerCase().includes(query));
     renderApps(filtered);
+    clearTimeout(searchTimer);
+    const seq = ++searchSeq;
+    if (query.trim().length >= 2) {
+        searchTimer = setTimeout(() => sendToPython({ action: "search", query: query, seq: seq }), 80);
+    }
+}
+
+function receiveSearchResults(seq, results) {
+    if (seq !== searchSeq) return; // typed on since
+    renderSearchResults(results);
+}
+
+function renderSearchResults(results) {
+    const container = document.getElementById("start-apps-list");
+    if (!container) return;
+    const fragment = document.createDocumentFragment();
+    results.forEach(result => {
+        const item = document.createElement("div");
+        item.className = result.kind === "file" ? "start-app-item search-file" : "start-app-item";
+        const img = document.createElement("img");
+        img.src = result.icon || "assets/generic.png";
+        img.onerror = () => { img.src = "assets/generic.png"; };
+        const text = document.createElement("div");
+        const name = document.createElement("span");
+        name.textContent = result.name;
+        text.appendChild(name);
+        if (result.kind === "file") {
+            const parent = document.createElement("small");
+            parent.textContent = result.parent;
+            text.appendChild(parent);
+        }
+        item.append(img, text);
+        if (result.kind === "app") item.oncontextmenu = (e) => showPinMenu(e, result);
+        item.onclick = (e) => {
+            e.stopPropagation();
+            if (result.kind === "file") sendToPython({ action: "open_path", path: result.path });
+            else sendToPython({ action: "launch_app", command: result.exec });
+            toggleStartMenu();
+        };
+        fragment.appendChild(item);
+    });
+    container.replaceChildren(fragment);
 }
 
 function renderApps(appsToDisplay) {
@@ -54,6 +124,7 @@ function renderApps(appsToDisplay) {
         const item = document.createElement("div");
         item.className = "start-app-item";
         item.innerHTML = `<img src="${app.icon || 'assets/generic.png'}" onerror="this.src='assets/generic.png'"> <span>${app.name}</span>`;
+        item.oncontextmenu = (e) => showPinMenu(e, app);
         item.onclick = (e) => {
             e.stopPropagation();
             sendToPython({ action: "launch_app", command: app.exec });
@@ -66,13 +137,13 @@ function renderApps(appsToDisplay) {
 /* --- PYTHON RECEIVERS --- */
 function receiveDockData(apps) {
     pinnedApps = apps;
-    lastDockDataString = ""; // Force refresh on first load
-    updateRunningIndicators([]); 
+    refreshDock(); // Force refresh with the windows we already know about
 }
 
 function receiveStartMenuApps(apps) {
     allApps = apps;
     renderApps(allApps);
+    sendToPython({ action: "milestone", name: "start-apps-received" });
 }
 
 function applyBackground(path) {
@@ -81,8 +152,514 @@ function applyBackground(path) {
 
 function receiveSavedBackground(path) { applyBackground(path); }
 
+// One batched reply after every (re)load: Python answers from its caches, so a
+// hot reload or web process recovery does not redo icon lookups or the app scan
+function restoreShellState(state) {
+    lastRunningWindows = state.running;
+    receiveDockData(state.dock);
+    if (state.apps) receiveStartMenuApps(state.apps); // null until the first app scan of this install
+    if (state.wallpaper) applyBackground(state.wallpaper);
+    if (state.status) updateStatusIndicators(state.status);
+}
+
+// Hot reload of style.css alone keeps the page (and its state) as it is
+function reloadStylesheet() {
+    const link = document.querySelector('link[rel="stylesheet"]');
+    if (link) link.href = `style.css?v=${Date.now()}`;
+}
+
+/* --- WALLPAPER GALLERY --- */
+// Folders are listed by Python off the main loop. Only the tiles in view exist in
+// the DOM, so folders with thousands of images scroll like short ones; thumbnails
+// missing from the cache are asked for once scrolling settles on them.
+const WALLPAPER_TILE = { width: 168, height: 120, gap: 8 };
+let wallpaperFolder = null;
+let wallpaperItems = [];
+let wallpaperIndex = new Map();   // path -> index in wallpaperItems
+let wallpaperTiles = new Map();   // index -> rendered tile
+let wallpaperCurrent = null;
+let wallpaperColumns = 1;
+let wallpaperRenderQueued = false;
+let wallpaperThumbTimer = null;
+
+function openWallpaperGallery() {
+    document.getElementById('start-menu').classList.add('hidden');
+    document.getElementById('wallpaper-gallery').classList.remove('hidden');
+    queueWallpaperRender();
+    sendToPython({ action: "list_wallpapers", folder: wallpaperFolder });
+}
+
+function closeWallpaperGallery() {
+    const gallery = document.getElementById('wallpaper-gallery');
+    if (gallery.classList.contains('hidden')) return;
+    gallery.classList.add('hidden');
+    clearTimeout(wallpaperThumbTimer);
+    sendToPython({ action: "wallpaper_gallery_close" });
+}
+
+function selectWallpaperFolder(folder) {
+    wallpaperFolder = folder;
+    setWallpaperItems([]);
+    setText('wallpaper-count', "Loading…");
+    sendToPython({ action: "list_wallpapers", folder });
+}
+
+function receiveWallpaperFolders(folders, folder, current) {
+    const select = document.getElementById('wallpaper-folder');
+    select.innerHTML = "";
+    folders.forEach(f => {
+        const option = document.createElement("option");
+        option.value = f;
+        option.textContent = f;
+        select.appendChild(option);
+    });
+    wallpaperCurrent = current;
+    if (folder !== wallpaperFolder || !wallpaperItems.length) {
+        wallpaperFolder = folder;
+        setWallpaperItems([]);
+    }
+    select.value = folder || "";
+    setText('wallpaper-count', folder ? "Loading…" : "No wallpaper folders found");
+}
+
+function receiveWallpapers(folder, items) {
+    if (folder !== wallpaperFolder) return; // another folder was picked meanwhile
+    setWallpaperItems(items);
+    setText('wallpaper-count', `${items.length} image${items.length === 1 ? "" : "s"}`);
+}
+
+function receiveWallpaperThumbnails(thumbs) {
+    thumbs.forEach(({ path, src }) => {
+        const index = wallpaperIndex.get(path);
+        if (index === undefined) return;
+        wallpaperItems[index].thumb = src || false; // false: cannot be thumbnailed
+        const tile = wallpaperTiles.get(index);
+        if (tile) fillWallpaperTile(tile, wallpaperItems[index]);
+    });
+}
+
+function setWallpaperItems(items) {
+    wallpaperItems = items;
+    wallpaperIndex = new Map(items.map((item, i) => [item.path, i]));
+    const grid = document.getElementById('wallpaper-grid');
+    document.getElementById('wallpaper-grid-inner').innerHTML = "";
+    wallpaperTiles.clear();
+    grid.scrollTop = 0;
+    renderWallpaperGrid();
+}
+
+function queueWallpaperRender() {
+    if (wallpaperRenderQueued) return;
+    wallpaperRenderQueued = true;
+    requestAnimationFrame(() => { wallpaperRenderQueued = false; renderWallpaperGrid(); });
+}
+
+function renderWallpaperGrid() {
+    const grid = document.getElementById('wallpaper-grid');
+    const inner = document.getElementById('wallpaper-grid-inner');
+    const { width, height, gap } = WALLPAPER_TILE;
+    const columns = Math.max(1, Math.floor((grid.clientWidth + gap) / (width + gap)));
+    if (columns !== wallpaperColumns) {
+        wallpaperColumns = columns;
+        inner.innerHTML = "";
+        wallpaperTiles.clear();
+    }
+    const rows = Math.ceil(wallpaperItems.length / columns);
+    inner.style.height = `${rows * (height + gap)}px`;
+
+    // Visible rows plus one above and below, so fast scrolling does not show blanks
+    const firstRow = Math.max(0, Math.floor(grid.scrollTop / (height + gap)) - 1);
+    const lastRow = Math.min(rows - 1, Math.ceil((grid.scrollTop + grid.clientHeight) / (height + gap)) + 1);
+    const first = firstRow * columns;
+    const last = Math.min(wallpaperItems.length - 1, (lastRow + 1) * columns - 1);
+
+    wallpaperTiles.forEach((tile, index) => {
+        if (index < first || index > last) {
+            tile.remove();
+            wallpaperTiles.delete(index);
+        }
+    });
+    for (let index = first; index <= last; index++) {
+        if (wallpaperTiles.has(index)) continue;
+        const item = wallpaperItems[index];
+        const tile = document.createElement("div");
+        tile.className = "wallpaper-tile";
+        tile.style.transform = `translate(${(index % columns) * (width + gap)}px, ${Math.floor(index / columns) * (height + gap)}px)`;
+        tile.title = item.name;
+        tile.onclick = () => chooseWallpaper(item.path);
+        fillWallpaperTile(tile, item);
+        inner.appendChild(tile);
+        wallpaperTiles.set(index, tile);
+    }
+
+    clearTimeout(wallpaperThumbTimer);
+    wallpaperThumbTimer = setTimeout(requestVisibleWallpaperThumbs, 150);
+}
+
+function fillWallpaperTile(tile, item) {
+    tile.classList.toggle('selected', item.path === wallpaperCurrent);
+    if (item.thumb) {
+        tile.innerHTML = `<img decoding="async" draggable="false">`;
+        tile.firstChild.src = item.thumb;
+    } else {
+        tile.innerHTML = `<span></span>`;
+        tile.firstChild.textContent = item.name;
+    }
+}
+
+function requestVisibleWallpaperThumbs() {
+    const paths = [];
+    wallpaperTiles.forEach((tile, index) => {
+        const item = wallpaperItems[index];
+        if (item.thumb === null && !item.requested) {
+            item.requested = true;
+            paths.push(item.path);
+        }
+    });
+    if (paths.length) sendToPython({ action: "get_wallpaper_thumbs", paths });
+}
+
+function chooseWallpaper(path) {
+    wallpaperCurrent = path;
+    wallpaperTiles.forEach((tile, index) => {
+        tile.classList.toggle('selected', wallpaperItems[index].path === path);
+    });
+    sendToPython({ action: "set_wallpaper", path });
+}
+
+document.getElementById('wallpaper-grid').addEventListener("scroll", queueWallpaperRender, { passive: true });
+window.addEventListener("resize", () => {
+    if (!document.getElementById('wallpaper-gallery').classList.contains('hidden')) queueWallpaperRender();
+});
+document.addEventListener("keydown", e => { if (e.key === "Escape") closeWallpaperGallery(); });
+
+/* --- ABOUT THIS PC PANEL --- */
+// Data comes from the desktop process; Python only streams stats while the panel is open
+function formatBytes(bytes) {
+    if (!bytes) return "0 B";
+    const units = ["B", "KB", "MB", "GB", "TB"];
+    let i = 0;
+    while (bytes >= 1024 && i < units.length - 1) { bytes /= 1024; i++; }
+    return `${bytes.toFixed(1)} ${units[i]}`;
+}
+
+function setText(id, value) {
+    const el = document.getElementById(id);
+    if (el) el.textContent = value;
+}
+
+function setBar(id, percent) {
+    const el = document.getElementById(id);
+    if (el) el.style.width = `${Math.max(0, Math.min(100, percent))}%`;
+}
+
+function openAboutPanel() {
+    document.getElementById('start-menu').classList.add('hidden');
+    document.getElementById('about-panel').classList.remove('hidden');
+    switchAboutTab('general');
+    sendToPython({ action: "about_panel_open" });
+}
+
+function closeAboutPanel() {
+    document.getElementById('about-panel').classList.add('hidden');
+    sendToPython({ action: "about_panel_close" });
+}
+
+function switchAboutTab(tab) {
+    document.querySelectorAll('.about-tab').forEach(btn => {
+        btn.classList.toggle('active', btn.dataset.tab === tab);
+    });
+    document.getElementById('about-page-general').classList.toggle('hidden', tab !== 'general');
+    document.getElementById('about-page-computer').classList.toggle('hidden', tab !== 'computer');
+}
+
+function receiveSystemInfo(info) {
+    setText('about-system-title', info.system_title);
+    setText('about-version', info.version);
+    setText('about-os', info.os_name);
+    setText('about-model', info.model);
+    setText('about-cpu', info.cpu);
+    setText('about-cpu-cores', `${info.cpu_cores} logical`);
+    setText('about-mem-total', `Total Physical Memory: ${formatBytes(info.memory_total)}`);
+    setText('about-swap-total', formatBytes(info.swap_total));
+    setText('about-fs', info.disk_fstype);
+    setText('about-full-name', info.full_name);
+    setText('about-workgroup', info.workgroup);
+    setText('about-hostname', info.hostname);
+    setText('about-mac', info.mac);
+    setText('about-ifaces', info.interface_count);
+    // Device label is completed once the disk size arrives with the stats
+    document.getElementById('about-disk').dataset.device = info.disk_device;
+}
+
+function receiveSystemStats(stats) {
+    setBar('about-cpu-bar', stats.cpu_percent);
+    setText('about-cpu-freq', stats.cpu_freq_mhz ? `${Math.round(stats.cpu_freq_mhz)} MHz` : "Unknown");
+    setBar('about-mem-bar', stats.memory_percent);
+    setText('about-mem-available', formatBytes(stats.memory_available));
+    setText('about-mem-cached', formatBytes(stats.memory_cached));
+    const diskEl = document.getElementById('about-disk');
+    diskEl.textContent = `${diskEl.dataset.device || ""} (/) - ${formatBytes(stats.disk_total)}`;
+    setBar('about-disk-bar', stats.disk_percent);
+    setText('about-disk-free', formatBytes(stats.disk_free));
+    setText('about-uptime', `System has been running for ${stats.uptime}`);
+    setText('about-boot-time', stats.boot_time);
+    setText('about-ip', stats.ip);
+}
+
+/* --- LAUNCH FEEDBACK --- */
+function refreshDock() {
+    lastDockDataString = "";
+    updateRunningIndicators(lastRunningWindows);
+}
+
+function setAppLaunching(appId) {
+    launchingApps.add(appId);
+    refreshDock();
+}
+
+function onAppLaunched(appId, latencyMs) {
+    launchingApps.delete(appId);
+    refreshDock();
+}
+
+function onAppLaunchFailed(appId) {
+    launchingApps.delete(appId);
+    refreshDock();
+}
+
+function onLaunchResult(ok, error) {
+    if (!ok) console.warn(`Launch failed: ${error}`);
+}
+
+function receiveLaunchLatency(stats) {
+    console.table(stats);
+}
+
+// Diagnostics: window.webkit.messageHandlers.bridge.postMessage({action: "get_memory_usage"})
+function receiveMemoryUsage(report) {
+    console.table(report.components.concat([report.total]).map(c => ({
+        component: c.name,
+        processes: c.pids.length,
+        rss_mb: +(c.rss_kb / 1024).toFixed(1),
+        pss_mb: +(c.pss_kb / 1024).toFixed(1),
+        swap_mb: +(c.swap_kb / 1024).toFixed(1),
+    })));
+}
+
+/* --- STATUS INDICATORS --- */
+// desktop.py pushes only the indicators whose state changed; null hides one
+const STATUS_ORDER = ["disk", "volume", "network", "battery"];
+
+function formatStatusTitle(name, state) {
+    if (name === "battery") {
+        const percent = state.percent === null ? "" : `${state.percent}%`;
+        return `Battery ${percent}${state.charging ? " (charging)" : state.on_battery ? "" : " (plugged in)"}`;
+    }
+    if (name === "network") {
+        if (state.kind === "offline") return "Offline";
+        return `${state.kind === "wifi" ? "Wi-Fi" : "Wired"} (${state.interface})${state.online ? "" : " - no internet"}`;
+    }
+    if (name === "volume") return state.muted ? "Muted" : `Volume ${state.percent}%`;
+    return state.disks.filter(d => d.low).map(d => `Low disk space on ${d.path}: ${formatBytes(d.free_bytes)} free`).join("\n");
+}
+
+function updateStatusIndicators(changed) {
+    const container = document.querySelector("#taskbar-bottom .taskbar-right");
+    if (!container) return;
+    Object.entries(changed).forEach(([name, state]) => {
+        let item = container.querySelector(`.status-item[data-status="${name}"]`);
+        const visible = state && (name !== "disk" || state.low);
+        if (!visible) {
+            if (item) item.remove();
+            return;
+        }
+        if (!item) {
+            item = document.createElement("div");
+            item.className = "status-item";
+            item.dataset.status = name;
+            item.appendChild(document.createElement("img"));
+            if (name === "battery") item.appendChild(document.createElement("span"));
+            const next = STATUS_ORDER.slice(STATUS_ORDER.indexOf(name) + 1)
+                .map(n => container.querySelector(`.status-item[data-status="${n}"]`)).find(Boolean);
+            container.insertBefore(item, next || null);
+        }
+        const img = item.querySelector("img");
+        if (img.getAttribute("src") !== state.icon) img.src = state.icon;
+        item.title = formatStatusTitle(name, state);
+        item.classList.toggle("warning", name === "disk" || (name === "battery" && state.on_battery && state.percent !== null && state.percent <= 15));
+        if (name === "battery") item.querySelector("span").textContent = state.percent === null ? "" : `${state.percent}%`;
+    });
+}
+
+/* --- WINDOW PREVIEWS --- */
+// Hovering a dock item asks Python for thumbnails of its windows. Cached ones come
+// back in the same reply (even if slightly out of date); fresh captures stream in after.
+let previewHideTimer = null;
+
+// Same matching as the dock: supervisor app id first, window class otherwise
+function appWindows(app, runningWindows) {
+    const byApp = runningWindows.filter(w => w.app && (w.app === app.id || w.app === app.exec));
+    if (byApp.length) return byApp;
+    return runningWindows.filter(w =>
+        app.exec.toLowerCase().includes(w.class.toLowerCase()) ||
+        w.class.toLowerCase().includes(app.exec.toLowerCase())
+    );
+}
+
+function showWindowPreviews(anchor, windows) {
+    clearTimeout(previewHideTimer);
+    const panel = document.getElementById("window-previews");
+    if (!panel || !windows.length) { hideWindowPreviews(); return; }
+    panel.innerHTML = "";
+    windows.forEach(win => {
+        const item = document.createElement("div");
+        item.className = "window-preview";
+        item.dataset.xid = win.xid;
+        item.innerHTML = `<div class="window-preview-image"><img class="placeholder" src="${win.icon || 'assets/generic.png'}" onerror="this.src='assets/generic.png'"></div><span></span>`;
+        item.querySelector("span").textContent = win.name;
+        item.onclick = (e) => {
+            e.stopPropagation();
+            sendToPython({ action: "focus_app", xid: win.xid });
+            hideWindowPreviews();
+        };
+        panel.appendChild(item);
+    });
+    const rect = anchor.getBoundingClientRect();
+    panel.style.left = `${rect.left + rect.width / 2}px`;
+    panel.classList.remove("hidden");
+    sendToPython({ action: "get_window_previews", xids: windows.map(w => w.xid) });
+}
+
+function receiveWindowPreviews(previews) {
+    previews.forEach(p => { if (p.src) updateWindowPreview(p.xid, p.src); });
+}
+
+function updateWindowPreview(xid, src) {
+    const img = document.querySelector(`#window-previews .window-preview[data-xid="${xid}"] img`);
+    if (!img) return; // hover moved on; Python keeps the thumbnail cached
+    img.className = "";
+    img.src = src;
+}
+
+function hideWindowPreviewsSoon() {
+    clearTimeout(previewHideTimer);
+    previewHideTimer = setTimeout(hideWindowPreviews, 250);
+}
+
+function hideWindowPreviews() {
+    clearTimeout(previewHideTimer);
+    const panel = document.getElementById("window-previews");
+    if (!panel) return;
+    panel.classList.add("hidden");
+    panel.innerHTML = "";
+}
+
+/* --- DESKTOP ICONS --- */
+// Python lists ~/Desktop in one reply with themed placeholder icons; thumbnails
+// arrive later in batches as its worker pool creates or finds them.
+let desktopElements = new Map(); // path -> icon element
+
+function receiveDesktopItems(items) {
+    const container = document.getElementById("desktop-icons");
+    if (!container) return;
+    const fragment = document.createDocumentFragment();
+    const selected = container.querySelector(".desktop-item.selected");
+    const selectedPath = selected ? selected.dataset.path : null;
+    desktopElements = new Map();
+    items.forEach(item => {
+        const el = document.createElement("div");
+        el.className = "desktop-item";
+        el.dataset.path = item.path;
+        el.title = item.name;
+        const img = document.createElement("img");
+        img.loading = "lazy";
+        img.decoding = "async";
+        img.src = item.thumb || item.icon || "assets/generic.png";
+        if (item.thumb) img.className = "thumb";
+        img.onerror = () => { img.className = ""; img.src = "assets/generic.png"; };
+        const label = document.createElement("span");
+        label.textContent = item.name;
+        el.append(img, label);
+        if (item.path === selectedPath) el.classList.add("selected");
+        el.onclick = () => selectDesktopItem(el);
+        el.ondblclick = () => sendToPython({ action: "open_desktop_item", path: item.path });
+        desktopElements.set(item.path, el);
+        fragment.appendChild(el);
+    });
+    container.replaceChildren(fragment);
+}
+
+function receiveDesktopThumbnails(thumbs) {
+    thumbs.forEach(t => {
+        const el = desktopElements.get(t.path);
+        if (!el) return;
+        const img = el.querySelector("img");
+        img.className = "thumb";
+        img.src = t.src;
+    });
+}
+
+function selectDesktopItem(el) {
+    document.querySelectorAll("#desktop-icons .desktop-item.selected").forEach(i => i.classList.remove("selected"));
+    if (el) el.classList.add("selected");
+}
+
+/* --- PINNING --- */
+// Python owns dock.json; it answers pin/unpin/move with a delta for every monitor's view
+function applyDockDelta(delta) {
+    if (delta.op === "pin") {
+        pinnedApps.splice(delta.index, 0, delta.app);
+    } else if (delta.op === "unpin") {
+        pinnedApps = pinnedApps.filter(app => app.id !== delta.id);
+    } else if (delta.op === "move") {
+        const from = pinnedApps.findIndex(app => app.id === delta.id);
+        if (from < 0) return;
+        const [app] = pinnedApps.splice(from, 1);
+        pinnedApps.splice(delta.index, 0, app);
+    }
+    refreshDock();
+}
+
+function showContextMenu(e, entries) {
+    e.preventDefault();
+    e.stopPropagation();
+    hideContextMenu();
+    const menu = document.createElement("div");
+    menu.id = "context-menu";
+    entries.forEach(entry => {
+        const item = document.createElement("div");
+        item.textContent = entry.label;
+        item.onclick = (ev) => { ev.stopPropagation(); hideContextMenu(); entry.run(); };
+        menu.appendChild(item);
+    });
+    document.body.appendChild(menu);
+    // Keep it on screen: open upwards/leftwards near the edges
+    menu.style.left = `${Math.min(e.clientX, window.innerWidth - menu.offsetWidth - 4)}px`;
+    menu.style.top = `${Math.min(e.clientY, window.innerHeight - menu.offsetHeight - 4)}px`;
+}
+
+function hideContextMenu() {
+    const menu = document.getElementById("context-menu");
+    if (menu) menu.remove();
+}
+
+function showPinMenu(e, app) {
+    if (!app.id) return;
+    const pinned = pinnedApps.some(p => p.id === app.id);
+    showContextMenu(e, [pinned
+        ? { label: "Unpin from dock", run: () => sendToPython({ action: "unpin_app", app_id: app.id }) }
+        : { label: "Pin to dock", run: () => sendToPython({ action: "pin_app", app_id: app.id }) }]);
+}
+
+document.addEventListener("click", hideContextMenu);
+document.addEventListener("keydown", e => { if (e.key === "Escape") hideContextMenu(); });
+
 /* --- THE DOCK LOGIC (FIXED) --- */
 function updateRunningIndicators(runningWindows) {
+    // Python only pushes on change, so keep the latest list even while locked
+    lastRunningWindows = runningWindows;
+
     // 1. If we just clicked, don't let the Python update mess up the UI
     if (clickLock) return;
 
@@ -90,7 +667,7 @@ function updateRunningIndicators(runningWindows) {
     if (!container) return;
 
     // 2. State Check: Only rebuild if windows actually changed (Fixes Dancing/Flicker)
-    const currentStateString = JSON.stringify(runningWindows) + JSON.stringify(pinnedApps);
+    const currentStateString = JSON.stringify(runningWindows) + JSON.stringify(pinnedApps) + [...launchingApps].join();
     if (currentStateString === lastDockDataString) return;
     lastDockDataString = currentStateString;
 
@@ -98,10 +675,12 @@ function updateRunningIndicators(runningWindows) {
 
     // 3. Render Pinned Apps
     pinnedApps.forEach(app => {
-        const win = runningWindows.find(w => 
-            app.exec.toLowerCase().includes(w.class.toLowerCase()) || 
-            w.class.toLowerCase().includes(app.exec.toLowerCase())
-        );
+        // Prefer the supervisor's PID -> app mapping, fall back to class matching
+        const win = runningWindows.find(w => w.app && (w.app === app.id || w.app === app.exec)) ||
+            runningWindows.find(w => 
+                app.exec.toLowerCase().includes(w.class.toLowerCase()) || 
+                w.class.toLowerCase().includes(app.exec.toLowerCase())
+            );
 
         const isRunning = !!win;
         const isFocused = win && win.focused;
@@ -112,12 +691,36 @@ function updateRunningIndicators(runningWindows) {
         let statusClass = "";
         if (isFocused) statusClass = "active";
         else if (isRunning) statusClass = "running";
+        else if (launchingApps.has(app.id) || launchingApps.has(app.exec)) statusClass = "launching";
 
         appEl.className = `app ${statusClass}`;
         appEl.innerHTML = `<img src="${app.icon_path}" onerror="this.src='assets/generic.png'">`;
+        appEl.oncontextmenu = (e) => showPinMenu(e, app);
+        if (win) applyUsageBadge(appEl, win.app || win.class);
+
+        // Drag to reorder; the dock is not rebuilt underneath the drag
+        appEl.draggable = true;
+        appEl.ondragstart = (e) => {
+            hideWindowPreviews();
+            clickLock = true;
+            e.dataTransfer.setData("text/plain", app.id);
+            e.dataTransfer.effectAllowed = "move";
+        };
+        appEl.ondragend = () => { clickLock = false; refreshDock(); };
+        appEl.ondragover = (e) => e.preventDefault();
+        appEl.ondrop = (e) => {
+            e.preventDefault();
+            const draggedId = e.dataTransfer.getData("text/plain");
+            if (draggedId && draggedId !== app.id) {
+                sendToPython({ action: "move_dock_app", app_id: draggedId, index: pinnedApps.findIndex(p => p.id === app.id) });
+            }
+        };
+        appEl.onmouseenter = () => showWindowPreviews(appEl, appWindows(app, runningWindows));
+        appEl.onmouseleave = hideWindowPreviewsSoon;
         
         appEl.onclick = (e) => {
             e.stopPropagation();
+            hideWindowPreviews();
             clickLock = true; // Set lock to prevent flickering during window shift
             
             if (isRunning) {
@@ -131,19 +734,25 @@ function updateRunningIndicators(runningWindows) {
                 }
                 sendToPython({ action: "focus_app_by_command", command: app.exec });
             } else {
-                sendToPython({ action: "launch_app", command: app.exec });
-                appEl.classList.add('running');
+                sendToPython({ action: "launch_app", command: app.exec, app_id: app.id });
+                appEl.classList.add('launching');
             }
 
             // Release lock after 450ms (allows OS to finish window state change)
-            setTimeout(() => { clickLock = false; }, 450);
+            setTimeout(() => { clickLock = false; refreshDock(); }, 450);
         };
         container.appendChild(appEl);
     });
+    probeFrames();
+    if (pinnedApps.length && !dockRenderReported) {
+        dockRenderReported = true;
+        sendToPython({ action: "milestone", name: "dock-render" });
+    }
 
     // 4. Render Unpinned Running Apps
     runningWindows.forEach(win => {
         const isPinned = pinnedApps.some(p => 
+            (win.app && (win.app === p.id || win.app === p.exec)) ||
             p.exec.toLowerCase().includes(win.class.toLowerCase()) || 
             win.class.toLowerCase().includes(p.exec.toLowerCase())
         );
@@ -153,25 +762,241 @@ function updateRunningIndicators(runningWindows) {
             let statusClass = win.focused ? "active" : "running";
             appEl.className = `app unpinned ${statusClass}`;
             appEl.innerHTML = `<img src="${win.icon || 'assets/generic.png'}" onerror="this.src='assets/generic.png'">`;
+            applyUsageBadge(appEl, win.app || win.class);
+            appEl.onmouseenter = () => showWindowPreviews(appEl, [win]);
+            appEl.onmouseleave = hideWindowPreviewsSoon;
             
             appEl.onclick = (e) => {
                 e.stopPropagation();
+                hideWindowPreviews();
                 clickLock = true;
                 sendToPython({ action: "focus_app", xid: win.xid });
-                setTimeout(() => { clickLock = false; }, 450);
+                setTimeout(() => { clickLock = false; refreshDock(); }, 450);
             };
             container.appendChild(appEl);
         }
     });
 }
 
+/* --- USAGE BADGES --- */
+// desktop.py samples each dock app's process tree and sends a badge only when
+// a CPU or memory threshold is crossed; null removes it. Keyed like the dock
+// groups windows: supervisor app id, else window class.
+const usageBadges = {};
+
+function formatUsageBadge(badge) {
+    if (badge.cpu) return `${badge.cpu}%+`;
+    return badge.memory_mb >= 1024 ? `${badge.memory_mb / 1024}G+` : `${badge.memory_mb}M+`;
+}
+
+function applyUsageBadge(appEl, key) {
+    appEl.dataset.usageKey = key;
+    let el = appEl.querySelector(".usage-badge");
+    const badge = usageBadges[key];
+    if (!badge) {
+        if (el) el.remove();
+        return;
+    }
+    if (!el) {
+        el = document.createElement("span");
+        el.className = "usage-badge";
+        appEl.appendChild(el);
+    }
+    el.textContent = formatUsageBadge(badge);
+    el.classList.toggle("alert", !!badge.alert);
+    const parts = [];
+    if (badge.cpu) parts.push(`CPU over ${badge.cpu}%`);
+    if (badge.memory_mb) parts.push(`memory over ${badge.memory_mb} MB`);
+    el.title = `${parts.join(", ")} (${badge.processes} process${badge.processes === 1 ? "" : "es"})`;
+}
+
+function updateUsageBadges(changed) {
+    Object.entries(changed).forEach(([key, badge]) => {
+        if (badge) usageBadges[key] = badge;
+        else delete usageBadges[key];
+    });
+    document.querySelectorAll("#dock-container .app").forEach(appEl => {
+        const key = appEl.dataset.usageKey;
+        if (key && key in changed) applyUsageBadge(appEl, key);
+    });
+}
+
+/* --- PERFORMANCE TIERS --- */
+// desktop.py picks the tier from battery state, screen lock and the frame probes below;
+// style.css keys the blur/transition fallbacks off body[data-tier]
+const FRAME_PROBE_FRAMES = 30;
+const FRAME_PROBE_INTERVAL_MS = 30000;
+let frameProbeEnabled = false;
+let lastFrameProbe = -Infinity;
+
+function setPerformanceTier(tier, probe) {
+    performanceTier = tier;
+    document.body.dataset.tier = tier;
+    frameProbeEnabled = !!probe;
+    scheduleClock();
+}
+
+// Times the frames right after a UI change (dock rebuild, start menu opening),
+// at most once per FRAME_PROBE_INTERVAL_MS, so it never keeps the page awake
+function probeFrames() {
+    const start = performance.now();
+    if (!frameProbeEnabled || document.hidden || start - lastFrameProbe < FRAME_PROBE_INTERVAL_MS) return;
+    lastFrameProbe = start;
+    const intervals = [];
+    let last = null;
+    const step = (now) => {
+        if (last !== null) intervals.push(now - last);
+        last = now;
+        if (intervals.length < FRAME_PROBE_FRAMES) {
+            requestAnimationFrame(step);
+            return;
+        }
+        intervals.sort((a, b) => a - b);
+        const p95 = intervals[Math.floor(0.95 * (intervals.length - 1))];
+        sendToPython({ action: "frame_probe", p95_ms: Math.round(p95 * 10) / 10, frames: intervals.length });
+    };
+    requestAnimationFrame(step);
+}
+
+/* --- FRAME MONITOR (opt-in) --- */
+// Started by Python when "frame_monitor" is enabled in config.json, or by Ctrl+Shift+F,
+// which also toggles the overlay. Costs nothing until then: the render functions
+// are only wrapped once the monitor starts.
+const FRAME_BOUNDS_MS = [8.4, 16.7, 20, 25, 33.4, 50, 100, 250, 1000];
+const RENDER_BOUNDS_MS = [0.5, 1, 2, 4, 8, 16.7, 33.4, 100];
+const INSTRUMENTED_FUNCTIONS = ["updateRunningIndicators", "renderApps", "filterApps", "receiveSystemStats"];
+
+let frameMonitor = null;
+
+function newHistogram(bounds) {
+    return { bounds: bounds, buckets: new Array(bounds.length + 1).fill(0), count: 0, total_ms: 0, max_ms: 0 };
+}
+
+function recordSample(hist, ms) {
+    let i = 0;
+    while (i < hist.bounds.length && ms > hist.bounds[i]) i++;
+    hist.buckets[i]++;
+    hist.count++;
+    hist.total_ms += ms;
+    if (ms > hist.max_ms) hist.max_ms = ms;
+}
+
+function startFrameMonitor(options = {}) {
+    if (frameMonitor) return;
+    frameMonitor = {
+        frames: newHistogram(FRAME_BOUNDS_MS),
+        longTasks: newHistogram(FRAME_BOUNDS_MS),
+        renders: {},
+        lastFrame: null,
+        observer: null,
+        overlay: null,
+        overlayTimer: null,
+    };
+
+    const frameLoop = (now) => {
+        if (!frameMonitor) return;
+        // Hidden pages get no frames; a gap spanning that time is not jank
+        if (frameMonitor.lastFrame !== null && !document.hidden) {
+            recordSample(frameMonitor.frames, now - frameMonitor.lastFrame);
+        }
+        frameMonitor.lastFrame = now;
+        requestAnimationFrame(frameLoop);
+    };
+    requestAnimationFrame(frameLoop);
+
+    // Long tasks are not exposed by every WebKit build; slow frames still show up above
+    if (window.PerformanceObserver && (PerformanceObserver.supportedEntryTypes || []).includes("longtask")) {
+        frameMonitor.observer = new PerformanceObserver(list => {
+            list.getEntries().forEach(entry => recordSample(frameMonitor.longTasks, entry.duration));
+        });
+        frameMonitor.observer.observe({ entryTypes: ["longtask"] });
+    }
+
+    INSTRUMENTED_FUNCTIONS.forEach(name => {
+        const original = window[name];
+        const hist = frameMonitor.renders[name] = newHistogram(RENDER_BOUNDS_MS);
+        window[name] = function (...args) {
+            const t0 = performance.now();
+            try {
+                return original.apply(this, args);
+            } finally {
+                recordSample(hist, performance.now() - t0);
+            }
+        };
+    });
+
+    // Aggregates only, at a low rate, so the monitor barely disturbs what it measures
+    setInterval(reportFrameStats, (options.reportInterval || 10) * 1000);
+}
+
+function reportFrameStats() {
+    if (!frameMonitor || !frameMonitor.frames.count) return;
+    const metrics = { frame: frameMonitor.frames, longtask: frameMonitor.longTasks };
+    Object.entries(frameMonitor.renders).forEach(([name, hist]) => { metrics[`render:${name}`] = hist; });
+    sendToPython({ action: "frame_stats", metrics: metrics });
+
+    frameMonitor.frames = newHistogram(FRAME_BOUNDS_MS);
+    frameMonitor.longTasks = newHistogram(FRAME_BOUNDS_MS);
+    Object.keys(frameMonitor.renders).forEach(name => { frameMonitor.renders[name] = newHistogram(RENDER_BOUNDS_MS); });
+}
+
+function updateFrameOverlay() {
+    const frames = frameMonitor.frames;
+    const missed = frames.buckets.slice(2).reduce((a, b) => a + b, 0); // slower than 16.7 ms
+    const lines = [
+        `frames ${frames.count}  missed ${missed}  worst ${frames.max_ms.toFixed(1)} ms`,
+        `long tasks ${frameMonitor.longTasks.count}`,
+    ];
+    Object.entries(frameMonitor.renders).forEach(([name, hist]) => {
+        if (hist.count) lines.push(`${name} ×${hist.count}  avg ${(hist.total_ms / hist.count).toFixed(2)}  max ${hist.max_ms.toFixed(2)} ms`);
+    });
+    frameMonitor.overlay.textContent = lines.join("\n");
+}
+
+function toggleFrameOverlay() {
+    startFrameMonitor();
+    if (frameMonitor.overlay) {
+        clearInterval(frameMonitor.overlayTimer);
+        frameMonitor.overlay.remove();
+        frameMonitor.overlay = null;
+        return;
+    }
+    // Shows the current reporting window, which restarts after every report
+    frameMonitor.overlay = document.createElement("pre");
+    frameMonitor.overlay.id = "frame-overlay";
+    frameMonitor.overlay.textContent = "collecting…";
+    document.body.appendChild(frameMonitor.overlay);
+    frameMonitor.overlayTimer = setInterval(updateFrameOverlay, 1000);
+}
+
+document.addEventListener('keydown', e => {
+    if (e.ctrlKey && e.shiftKey && e.code === 'KeyF') {
+        e.preventDefault();
+        toggleFrameOverlay();
+    }
+});
+
+// Task manager, as on other desktops
+document.addEventListener('keydown', e => {
+    if (e.ctrlKey && e.shiftKey && e.key === 'Escape') {
+        e.preventDefault();
+        sendToPython({ action: "open_task_manager" });
+    }
+});
+
 /* --- INITIALIZATION --- */
 window.onload = () => {
-    sendToPython({ action: "get_dock_apps" });
-    sendToPython({ action: "get_start_apps" });
-    sendToPython({ action: "get_saved_background" });
+    sendToPython({ action: "get_shell_state" });
+    sendToPython({ action: "get_desktop_items" });
 };
 
+// Keep previews open while the pointer moves from the dock onto them
+const previewPanel = document.getElementById('window-previews');
+if (previewPanel) {
+    previewPanel.addEventListener('mouseenter', () => clearTimeout(previewHideTimer));
+    previewPanel.addEventListener('mouseleave', hideWindowPreviewsSoon);
+}
+
 // Selection Protection
 ['taskbar-top', 'taskbar-bottom'].forEach(id => {
     const el = document.getElementById(id);
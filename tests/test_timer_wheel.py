@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.launch_utils import TimerWheel
+
+
+def fire_ticks(wheel, delay, max_ticks=400):
+    """Number of ticks until a timer scheduled with delay fires, driving the wheel by hand"""
+    fired = []
+    wheel.schedule(delay, fired.append, True)
+    for tick in range(1, max_ticks + 1):
+        wheel._fire(wheel._advance())
+        if fired:
+            return tick
+    return None
+
+
+class TimerWheelTest(unittest.TestCase):
+    def make_wheel(self):
+        wheel = TimerWheel(tick=1.0, slots=64)
+        wheel._ensure_running = lambda: None  # no thread, no GLib: ticks are driven by the test
+        return wheel
+
+    def test_fires_on_time(self):
+        for delay in (1, 2, 63, 64, 65, 127, 128, 129, 200):
+            with self.subTest(delay=delay):
+                self.assertEqual(fire_ticks(self.make_wheel(), delay), delay)
+
+    def test_fires_on_time_after_the_wheel_moved(self):
+        wheel = self.make_wheel()
+        for _ in range(10):
+            wheel._advance()
+        self.assertEqual(fire_ticks(wheel, 64), 64)
+        self.assertEqual(fire_ticks(wheel, 128), 128)
+
+    def test_sub_tick_delay_waits_one_tick(self):
+        self.assertEqual(fire_ticks(self.make_wheel(), 0.2), 1)
+
+    def test_cancel(self):
+        wheel = self.make_wheel()
+        fired = []
+        timer_id = wheel.schedule(5, fired.append, True)
+        self.assertTrue(wheel.cancel(timer_id))
+        for _ in range(10):
+            wheel._fire(wheel._advance())
+        self.assertEqual(fired, [])
+        self.assertEqual(wheel.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()